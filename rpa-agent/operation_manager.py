@@ -2,10 +2,13 @@
 操作の実行管理とディスパッチングを担当するモジュール
 """
 
+import copy
 import json
 import os
 import sys
-from typing import Any, Dict, List, Optional
+import threading
+from collections import ChainMap
+from typing import Any, Callable, Dict, List, Optional
 
 from operations.app_screen import (
     GetWindowNameOperation,
@@ -19,6 +22,14 @@ from operations.app_screen import (
     SwitchWindowByNameOperation,
     TakeScreenshotOperation,
 )
+from operations.csv_file import (
+    CSVAppendOperation,
+    CSVReadLoopOperation,
+    CSVReadOperation,
+    CSVToExcelOperation,
+    CSVWriteOperation,
+    ExcelToCSVOperation,
+)
 from operations.datetime_ops import (
     AddSubtractTimeOperation,
     FormatDateTimeOperation,
@@ -34,17 +45,25 @@ from operations.email import (
 )
 from operations.excel import (
     ExcelCloseOperation,
+    ExcelColumnCalculationOperation,
+    ExcelColumnLoopOperation,
+    ExcelLastColumnOperation,
+    ExcelLastRowOperation,
     ExcelOpenOperation,
     ExcelReadCellOperation,
     ExcelReadRangeOperation,
+    ExcelRowLoopOperation,
     ExcelSaveOperation,
+    ExcelSessionsOperation,
     ExcelWriteCellOperation,
     ExcelWriteRangeOperation,
 )
 from operations.file_folder import (
+    CompressFileFolderOperation,
     CopyFileFolderOperation,
     CreateFolderOperation,
     DeleteFileFolderOperation,
+    ExtractFileFolderOperation,
     FolderLoopOperation,
     GetFileInfoOperation,
     ListFilesOperation,
@@ -53,6 +72,7 @@ from operations.file_folder import (
     OpenFolderOperation,
     ReadFileOperation,
     RenameFileFolderOperation,
+    SyncFolderOperation,
     WriteFileOperation,
 )
 from operations.keyboard import (
@@ -62,6 +82,7 @@ from operations.keyboard import (
 )
 from operations.memory import (
     EnvironmentInfoOperation,
+    FindNewestFileOperation,
     GetStoredValueOperation,
     StoreValueOperation,
 )
@@ -83,6 +104,7 @@ from operations.text import (
     TextTrimOperation,
 )
 from operations.wait import (
+    WaitForFileOperation,
     WaitSecondsOperation,
 )
 from operations.wait_control import (
@@ -99,11 +121,14 @@ from operations.web_browser import (
     WebBrowserClickOperation,
     WebBrowserCloseOperation,
     WebBrowserExecuteJavaScriptOperation,
+    WebBrowserExtractTableOperation,
+    WebBrowserFillFormOperation,
     WebBrowserGetTextOperation,
     WebBrowserInputTextOperation,
     WebBrowserNavigateOperation,
     WebBrowserOpenOperation,
     WebBrowserRefreshOperation,
+    WebBrowserScrapeOperation,
     WebBrowserScrollOperation,
     WebBrowserSelectDropdownOperation,
     WebBrowserSwitchTabOperation,
@@ -115,10 +140,77 @@ from operations.web_browser import (
 class OperationManager:
     """操作の管理とディスパッチングを行うクラス"""
 
-    def __init__(self):
-        """初期化"""
+    def __init__(self, notifier: Optional[Callable[[str, Any], None]] = None):
+        """初期化
+
+        Args:
+            notifier: JSON-RPC通知を送る関数（RPAAgent.send_notification）
+        """
         self.operations = self._initialize_operations()
         self.storage = {}  # 操作間で共有するストレージ
+        self.notifier = notifier
+        # 実行終了時に finish_run() を呼ぶリソース（書き込みキャッシュなど）
+        self.run_resources: Dict[str, Any] = {}
+        self._resource_lock = threading.Lock()
+
+    def log(self, message: str, level: str = "info"):
+        """ログを出力（stdoutはJSON-RPC用のため stderr に出力する）"""
+        print(f"[{level.upper()}] {message}", file=sys.stderr)
+
+    def notify(self, method: str, params: Any = None):
+        """操作からの通知（進捗など）をElectronへ送る"""
+        if self.notifier:
+            self.notifier(method, params)
+
+    def get_run_resource(self, key: str, factory: Callable[[], Any]) -> Any:
+        """実行リソースを取得（なければ factory で作成して登録）"""
+        with self._resource_lock:
+            if key not in self.run_resources:
+                self.run_resources[key] = factory()
+            return self.run_resources[key]
+
+    def finish_run(self):
+        """実行終了時の後処理（バッファの書き出しなど）"""
+        for key, resource in list(self.run_resources.items()):
+            try:
+                resource.finish_run()
+            except Exception as e:
+                self.log(f"Failed to finish run resource '{key}': {e}", "error")
+
+    def close_run_resources(self):
+        """実行リソースを書き出してから閉じ、登録を外す"""
+        self.finish_run()
+        with self._resource_lock:
+            resources = list(self.run_resources.items())
+            self.run_resources.clear()
+        for key, resource in resources:
+            close_all = getattr(resource, "close_all", None)
+            if close_all is None:
+                continue
+            try:
+                close_all()
+            except Exception as e:
+                self.log(f"Failed to close run resource '{key}': {e}", "error")
+
+    def scoped(
+        self, variables: Dict[str, Any], own_resources: bool = False
+    ) -> "OperationManager":
+        """変数スコープを重ねたマネージャーを返す
+
+        ループ本体を並列実行する場合に、反復ごとの変数が他の反復と
+        衝突しないようにするために使う。読み込みは共有ストレージまで
+        透過し、書き込みは反復ローカルのスコープに入る。
+
+        own_resources=True の場合は実行リソースも共有せず、スコープ専用の
+        ものを使う（トリガーからの実行が、同時に動いている別の実行の
+        バッファやブックを書き出したり閉じたりしないようにするため）。
+        """
+        scope = copy.copy(self)
+        scope.storage = ChainMap(dict(variables), self.storage)
+        if own_resources:
+            scope.run_resources = {}
+            scope._resource_lock = threading.Lock()
+        return scope
 
     def _initialize_operations(self) -> Dict[str, Dict]:
         """操作マッピングを初期化"""
@@ -142,6 +234,7 @@ class OperationManager:
             "B_待機・終了・エラー": {
                 "秒": WaitSecondsOperation,
                 "画像出現を待つ": WaitImageOperation,
+                "ファイル出現を待つ": WaitForFileOperation,
                 "続行確認": ContinueConfirmOperation,
                 "タイマー付き続行確認（秒）": TimerContinueConfirmOperation,
                 "コマンド間待機時間を変更": ChangeCommandIntervalOperation,
@@ -189,7 +282,7 @@ class OperationManager:
                 "実行中に入力": StoreValueOperation,
                 "ファイル更新日時": GetCurrentDateTimeOperation,
                 "ファイルサイズ": StoreValueOperation,
-                "最新ファイル・フォルダ": StoreValueOperation,
+                "最新ファイル・フォルダ": FindNewestFileOperation,
                 "日付（今日）": GetCurrentDateTimeOperation,
             },
             "F_文字抽出": {
@@ -232,8 +325,13 @@ class OperationManager:
                 "ファイル・フォルダ名の変更": RenameFileFolderOperation,
                 "ファイル・フォルダをコピー": CopyFileFolderOperation,
                 "ファイル・フォルダを削除": DeleteFileFolderOperation,
+                "ファイル・フォルダを同期": SyncFolderOperation,
                 "ファイル一覧取得": ListFilesOperation,
                 "ファイル情報取得": GetFileInfoOperation,
+                "圧縮・解凍": {
+                    "ファイル・フォルダを圧縮": CompressFileFolderOperation,
+                    "ファイル・フォルダに解凍": ExtractFileFolderOperation,
+                },
             },
             "J_Excel": {
                 "ファイルを開く": ExcelOpenOperation,
@@ -241,11 +339,22 @@ class OperationManager:
                 "セル書き込み": ExcelWriteCellOperation,
                 "範囲読み込み": ExcelReadRangeOperation,
                 "範囲書き込み": ExcelWriteRangeOperation,
+                "行ループ": ExcelRowLoopOperation,
+                "列ループ": ExcelColumnLoopOperation,
+                "列計算": ExcelColumnCalculationOperation,
+                "最終行取得": ExcelLastRowOperation,
+                "最終列取得": ExcelLastColumnOperation,
                 "保存": ExcelSaveOperation,
                 "閉じる": ExcelCloseOperation,
+                "セッション一覧": ExcelSessionsOperation,
             },
             "K_CSV": {
-                # CSV操作は現在未実装
+                "CSV読み込み": CSVReadOperation,
+                "CSV書き込み": CSVWriteOperation,
+                "CSV追記": CSVAppendOperation,
+                "CSV読込ループ": CSVReadLoopOperation,
+                "Excel→CSV変換": ExcelToCSVOperation,
+                "CSV→Excel変換": CSVToExcelOperation,
             },
             "L_ウェブブラウザ": {
                 "ブラウザを開く": WebBrowserOpenOperation,
@@ -254,6 +363,7 @@ class OperationManager:
                 "クリック": WebBrowserClickOperation,
                 "入力": WebBrowserInputTextOperation,
                 "選択": WebBrowserSelectDropdownOperation,
+                "フォーム一括入力": WebBrowserFillFormOperation,
                 "読み取り": WebBrowserGetTextOperation,
                 "待機": WebBrowserWaitForElementOperation,
                 "スクロール": WebBrowserScrollOperation,
@@ -261,6 +371,8 @@ class OperationManager:
                 "JavaScript実行": WebBrowserExecuteJavaScriptOperation,
                 "タブ切り替え": WebBrowserSwitchTabOperation,
                 "更新": WebBrowserRefreshOperation,
+                "一括取得": WebBrowserScrapeOperation,
+                "表取得": WebBrowserExtractTableOperation,
             },
         }
 
@@ -284,7 +396,7 @@ class OperationManager:
                 }
 
             # 操作インスタンスを作成して実行
-            op_instance = operation_class(self.storage)
+            op_instance = operation_class(self)
             result = await op_instance.execute(params)
 
             return {
@@ -375,6 +487,20 @@ class OperationManager:
                     "description": "説明（オプション）"
                 }
 
+        Returns:
+            各ステップの実行結果のリスト
+        """
+        try:
+            return await self.run_steps(steps)
+        finally:
+            self.finish_run()
+
+    async def run_steps(self, steps: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """ステップを順に実行する（ループ本体などの入れ子実行からも使う）
+
+        Args:
+            steps: 実行するステップのリスト（形式は execute_workflow_steps と同じ）
+
         Returns:
             各ステップの実行結果のリスト
         """
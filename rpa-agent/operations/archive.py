@@ -0,0 +1,508 @@
+"""
+ZIP / tar.gz の圧縮・解凍を担当するモジュール
+
+圧縮はプロセスプールで並列に行う。
+- ZIP: ファイルごとに別プロセスで deflate し、メインプロセスは結果を順番に
+  書き込むだけにする（zipfile はメンバーを1つずつ圧縮するため自前で書く）
+- tar.gz: tar のバイト列を一定サイズごとに区切って別々に gzip し、連結する
+  （複数メンバーの gzip は標準の gzip / tarfile でそのまま読める）
+解凍はメンバーを1つずつストリームで書き出し、展開先の外に出るパス
+（zip-slip）は拒否する。
+"""
+
+import contextlib
+import gzip
+import os
+import shutil
+import struct
+import tarfile
+import time
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+# 1タスクにまとめる小さいファイルの合計サイズ
+BATCH_BYTES = 1024 * 1024
+
+# これより大きいファイルはワーカーに送らず、メインプロセスでストリーム圧縮する
+PARALLEL_MEMBER_LIMIT = 32 * 1024 * 1024
+
+# tar.gz で並列に gzip する単位
+GZIP_BLOCK_SIZE = 4 * 1024 * 1024
+
+_STREAM_CHUNK = 1024 * 1024
+_ZIP64_LIMIT = 0xFFFFFFFF
+_ZIP_MAX_ENTRIES = 0xFFFF
+
+
+def iter_sources(
+    source_paths: List[str], exclude: Iterable[str] = ()
+) -> Iterator[Tuple[str, str, bool]]:
+    """圧縮対象を (パス, アーカイブ内の名前, フォルダかどうか) で順に返す
+
+    フォルダはフォルダ名ごと格納する（圧縮ソフトで右クリック圧縮したときと同じ）。
+    exclude のファイル（作成中のアーカイブ自身など）は含めない。
+    """
+    excluded = {os.path.normcase(os.path.abspath(path)) for path in exclude}
+    for source in source_paths:
+        source = os.path.abspath(os.path.expanduser(source))
+        base = os.path.dirname(source)
+        if os.path.isfile(source):
+            if os.path.normcase(source) not in excluded:
+                yield source, os.path.basename(source), False
+            continue
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            rel_root = os.path.relpath(root, base).replace(os.sep, "/")
+            yield root, rel_root + "/", True
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                if os.path.normcase(path) not in excluded:
+                    yield path, f"{rel_root}/{name}", False
+
+
+def _deflate_batch(paths: List[str], level: int) -> List[Tuple[int, int, bytes]]:
+    """ワーカープロセス: ファイルを読み込んで (CRC, 元サイズ, 圧縮データ) を返す"""
+    results = []
+    for path in paths:
+        with open(path, "rb") as f:
+            data = f.read()
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+        compressed = compressor.compress(data) + compressor.flush()
+        results.append((zlib.crc32(data), len(data), compressed))
+    return results
+
+
+def _dos_datetime(mtime: float) -> Tuple[int, int]:
+    t = time.localtime(mtime)
+    year = max(t.tm_year, 1980)
+    date = ((year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+    dos_time = (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2)
+    return date, dos_time
+
+
+class _ZipEntry:
+    def __init__(self, name: str, st: os.stat_result, is_dir: bool):
+        self.name = name.encode("utf-8")
+        self.mode = st.st_mode
+        self.date, self.time = _dos_datetime(st.st_mtime)
+        self.is_dir = is_dir
+        self.method = 0 if is_dir else zipfile.ZIP_DEFLATED
+        self.crc = 0
+        self.size = 0
+        self.compressed_size = 0
+        self.offset = 0
+
+
+class ParallelZipWriter:
+    """ファイル単位で並列に deflate して ZIP を書き出す
+
+    ファイル名は UTF-8 フラグ付きで格納するため、日本語名も文字化けしない。
+    4GB を超えるファイル・アーカイブ、65535 件を超えるエントリーは ZIP64 で書く。
+    """
+
+    def __init__(self, fileobj, level: int = 6):
+        self.fp = fileobj
+        self.level = level
+        self.entries: List[_ZipEntry] = []
+
+    def _write_local_header(self, entry: _ZipEntry, zip64: bool):
+        entry.offset = self.fp.tell()
+        extra = b""
+        size, compressed_size = entry.size, entry.compressed_size
+        if zip64:
+            extra = struct.pack("<HHQQ", 1, 16, size, compressed_size)
+            size = compressed_size = _ZIP64_LIMIT
+        self.fp.write(
+            struct.pack(
+                "<IHHHHHIIIHH",
+                0x04034B50,
+                45 if zip64 else 20,
+                0x800,
+                entry.method,
+                entry.time,
+                entry.date,
+                entry.crc,
+                compressed_size,
+                size,
+                len(entry.name),
+                len(extra),
+            )
+        )
+        self.fp.write(entry.name)
+        self.fp.write(extra)
+
+    def add_compressed(self, entry: _ZipEntry, crc: int, size: int, data: bytes):
+        """圧縮済みのデータをメンバーとして書き込む"""
+        entry.crc, entry.size, entry.compressed_size = crc, size, len(data)
+        self._write_local_header(
+            entry, size >= _ZIP64_LIMIT or len(data) >= _ZIP64_LIMIT
+        )
+        self.fp.write(data)
+        self.entries.append(entry)
+
+    def add_directory(self, entry: _ZipEntry):
+        self._write_local_header(entry, False)
+        self.entries.append(entry)
+
+    def add_streamed(self, entry: _ZipEntry, path: str, expected_size: int):
+        """大きなファイルをメインプロセスで少しずつ圧縮して書き込む
+
+        ヘッダーを先に書き、圧縮後に CRC とサイズを書き戻す。
+        """
+        zip64 = expected_size >= _ZIP64_LIMIT
+        self._write_local_header(entry, zip64)
+        data_start = self.fp.tell()
+
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, -15)
+        crc = size = 0
+        with open(path, "rb") as f:
+            while chunk := f.read(_STREAM_CHUNK):
+                crc = zlib.crc32(chunk, crc)
+                size += len(chunk)
+                self.fp.write(compressor.compress(chunk))
+        self.fp.write(compressor.flush())
+        end = self.fp.tell()
+
+        entry.crc, entry.size, entry.compressed_size = crc, size, end - data_start
+        if not zip64 and (
+            size >= _ZIP64_LIMIT or entry.compressed_size >= _ZIP64_LIMIT
+        ):
+            raise OSError(f"File grew past 4GB while compressing: {path}")
+        self.fp.seek(entry.offset)
+        self._write_local_header(entry, zip64)
+        self.fp.seek(end)
+        self.entries.append(entry)
+
+    def close(self):
+        """セントラルディレクトリと終端レコードを書く"""
+        cd_start = self.fp.tell()
+        for entry in self.entries:
+            extra_values = []
+            size, compressed_size, offset = (
+                entry.size,
+                entry.compressed_size,
+                entry.offset,
+            )
+            if size >= _ZIP64_LIMIT:
+                extra_values.append(size)
+                size = _ZIP64_LIMIT
+            if compressed_size >= _ZIP64_LIMIT:
+                extra_values.append(compressed_size)
+                compressed_size = _ZIP64_LIMIT
+            if offset >= _ZIP64_LIMIT:
+                extra_values.append(offset)
+                offset = _ZIP64_LIMIT
+            extra = b""
+            if extra_values:
+                extra = struct.pack(
+                    f"<HH{len(extra_values)}Q", 1, 8 * len(extra_values), *extra_values
+                )
+            external_attr = (entry.mode & 0xFFFF) << 16
+            if entry.is_dir:
+                external_attr |= 0x10  # MS-DOS のディレクトリ属性
+            self.fp.write(
+                struct.pack(
+                    "<IHHHHHHIIIHHHHHII",
+                    0x02014B50,
+                    (3 << 8) | 45,  # 作成: UNIX, version 4.5
+                    45 if extra else 20,
+                    0x800,
+                    entry.method,
+                    entry.time,
+                    entry.date,
+                    entry.crc,
+                    compressed_size,
+                    size,
+                    len(entry.name),
+                    len(extra),
+                    0,
+                    0,
+                    0,
+                    external_attr,
+                    offset,
+                )
+            )
+            self.fp.write(entry.name)
+            self.fp.write(extra)
+        cd_end = self.fp.tell()
+        cd_size = cd_end - cd_start
+        count = len(self.entries)
+
+        if (
+            count > _ZIP_MAX_ENTRIES
+            or cd_start >= _ZIP64_LIMIT
+            or cd_size >= _ZIP64_LIMIT
+        ):
+            # ZIP64 終端レコードとロケーター
+            self.fp.write(
+                struct.pack(
+                    "<IQHHIIQQQQ",
+                    0x06064B50,
+                    44,
+                    45,
+                    45,
+                    0,
+                    0,
+                    count,
+                    count,
+                    cd_size,
+                    cd_start,
+                )
+            )
+            self.fp.write(struct.pack("<IIQI", 0x07064B50, 0, cd_end, 1))
+            count = min(count, _ZIP_MAX_ENTRIES)
+            cd_size = min(cd_size, _ZIP64_LIMIT)
+            cd_start = min(cd_start, _ZIP64_LIMIT)
+        self.fp.write(
+            struct.pack(
+                "<IHHHHIIH", 0x06054B50, 0, 0, count, count, cd_size, cd_start, 0
+            )
+        )
+
+
+class ArchiveProgress:
+    """処理済み件数を数え、progress_interval 件ごとに通知する"""
+
+    def __init__(self, interval: int, callback: Optional[Callable[[int, int], None]]):
+        self.interval = max(1, int(interval or 1))
+        self.callback = callback
+        self.entries = 0
+        self.bytes = 0
+
+    def add(self, entries: int, size: int):
+        before = self.entries // self.interval
+        self.entries += entries
+        self.bytes += size
+        if self.callback and self.entries // self.interval != before:
+            self.callback(self.entries, self.bytes)
+
+
+def create_zip(
+    source_paths: List[str],
+    archive_path: str,
+    level: int = 6,
+    workers: Optional[int] = None,
+    progress: Optional[ArchiveProgress] = None,
+    exclude: Iterable[str] = (),
+) -> int:
+    """ZIP を作成して格納したエントリー数を返す
+
+    archive_path 自身と exclude のファイルは格納しない（圧縮元のフォルダの中に
+    作る場合に、書きかけのアーカイブを含めないため）。
+    """
+    progress = progress or ArchiveProgress(0, None)
+    exclude = [archive_path, *exclude]
+    with open(archive_path, "wb") as fp, ProcessPoolExecutor(workers) as pool:
+        writer = ParallelZipWriter(fp, level)
+        in_flight = deque()
+        limit = (pool._max_workers or 1) * 2
+        batch: List[Tuple[_ZipEntry, str]] = []
+        batch_bytes = 0
+
+        def drain(until: int):
+            while len(in_flight) > until:
+                kind, payload = in_flight.popleft()
+                if kind == "dir":
+                    writer.add_directory(payload)
+                    progress.add(1, 0)
+                elif kind == "large":
+                    entry, path, size = payload
+                    writer.add_streamed(entry, path, size)
+                    progress.add(1, size)
+                else:
+                    entries, future = payload
+                    for entry, (crc, size, data) in zip(
+                        entries, future.result(), strict=True
+                    ):
+                        writer.add_compressed(entry, crc, size, data)
+                        progress.add(1, size)
+
+        def submit_batch():
+            nonlocal batch, batch_bytes
+            if batch:
+                entries = [entry for entry, _ in batch]
+                future = pool.submit(_deflate_batch, [p for _, p in batch], level)
+                in_flight.append(("batch", (entries, future)))
+                batch, batch_bytes = [], 0
+
+        for path, arcname, is_dir in iter_sources(source_paths, exclude):
+            st = os.stat(path)
+            entry = _ZipEntry(arcname, st, is_dir)
+            if is_dir:
+                submit_batch()
+                in_flight.append(("dir", entry))
+            elif st.st_size > PARALLEL_MEMBER_LIMIT:
+                submit_batch()
+                in_flight.append(("large", (entry, path, st.st_size)))
+            else:
+                batch.append((entry, path))
+                batch_bytes += st.st_size
+                if batch_bytes >= BATCH_BYTES:
+                    submit_batch()
+            drain(limit)
+
+        submit_batch()
+        drain(0)
+        writer.close()
+        return len(writer.entries)
+
+
+class _GzipBlockWriter:
+    """tarfile から受け取ったバイト列をブロックごとに並列 gzip して書き出す"""
+
+    def __init__(self, fp, pool: ProcessPoolExecutor, level: int, limit: int):
+        self.fp = fp
+        self.pool = pool
+        self.level = level
+        self.limit = limit
+        self.buffer = bytearray()
+        self.in_flight = deque()
+
+    def write(self, data: bytes) -> int:
+        self.buffer += data
+        if len(self.buffer) >= GZIP_BLOCK_SIZE:
+            self._submit()
+        return len(data)
+
+    def _submit(self):
+        if self.buffer:
+            block, self.buffer = bytes(self.buffer), bytearray()
+            self.in_flight.append(self.pool.submit(gzip.compress, block, self.level))
+        while len(self.in_flight) > self.limit:
+            self.fp.write(self.in_flight.popleft().result())
+
+    def close(self):
+        self._submit()
+        while self.in_flight:
+            self.fp.write(self.in_flight.popleft().result())
+
+
+def create_tar(
+    source_paths: List[str],
+    archive_path: str,
+    compress: bool = True,
+    level: int = 6,
+    workers: Optional[int] = None,
+    progress: Optional[ArchiveProgress] = None,
+    exclude: Iterable[str] = (),
+) -> int:
+    """tar / tar.gz を作成して格納したエントリー数を返す
+
+    archive_path 自身と exclude のファイルは格納しない。
+    """
+    progress = progress or ArchiveProgress(0, None)
+    exclude = [archive_path, *exclude]
+    count = 0
+    with open(archive_path, "wb") as fp, ProcessPoolExecutor(workers) as pool:
+        sink = (
+            _GzipBlockWriter(fp, pool, level, (pool._max_workers or 1) * 2)
+            if compress
+            else fp
+        )
+        with tarfile.open(fileobj=sink, mode="w|", format=tarfile.PAX_FORMAT) as tar:
+            for path, arcname, is_dir in iter_sources(source_paths, exclude):
+                tar.add(path, arcname=arcname.rstrip("/"), recursive=False)
+                count += 1
+                progress.add(1, 0 if is_dir else os.path.getsize(path))
+        if compress:
+            sink.close()
+    return count
+
+
+def _safe_target(destination: str, name: str) -> str:
+    """展開先の外を指すメンバー名（../ や絶対パス）を拒否する"""
+    target = os.path.realpath(os.path.join(destination, name))
+    root = os.path.realpath(destination)
+    if os.path.commonpath([root, target]) != root:
+        raise ValueError(f"Blocked unsafe path in archive: {name}")
+    return target
+
+
+def _legacy_name(name: str) -> str:
+    """UTF-8 フラグのないメンバー名を復元する
+
+    zipfile はフラグのない名前を CP437 として読む。macOS の Finder や Info-ZIP は
+    フラグなしで UTF-8 の名前を書くため、まず UTF-8 として読み、だめなら
+    Windows で作られた CP932 とみなす。
+    """
+    try:
+        raw = name.encode("cp437")
+    except UnicodeEncodeError:
+        return name
+    for encoding in ("utf-8", "cp932"):
+        with contextlib.suppress(UnicodeDecodeError):
+            return raw.decode(encoding)
+    return name
+
+
+def extract_zip(
+    archive_path: str,
+    destination: str,
+    password: str = "",
+    overwrite: bool = False,
+    progress: Optional[ArchiveProgress] = None,
+) -> int:
+    """ZIP をメンバーごとにストリームで展開して展開数を返す"""
+    progress = progress or ArchiveProgress(0, None)
+    count = 0
+    with zipfile.ZipFile(archive_path) as zf:
+        pwd = password.encode("utf-8") if password else None
+        for info in zf.infolist():
+            name = info.filename
+            if not info.flag_bits & 0x800:
+                name = _legacy_name(name)
+            target = _safe_target(destination, name)
+            if info.is_dir():
+                os.makedirs(target, exist_ok=True)
+                continue
+            if os.path.exists(target) and not overwrite:
+                raise FileExistsError(f"File already exists: {target}")
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with zf.open(info, pwd=pwd) as src, open(target, "wb") as dst:
+                shutil.copyfileobj(src, dst, _STREAM_CHUNK)
+            mtime = time.mktime((*info.date_time, 0, 0, -1))
+            os.utime(target, (mtime, mtime))
+            count += 1
+            progress.add(1, info.file_size)
+    return count
+
+
+def extract_tar(
+    archive_path: str,
+    destination: str,
+    overwrite: bool = False,
+    progress: Optional[ArchiveProgress] = None,
+) -> int:
+    """tar / tar.gz をメンバーごとに展開して展開数を返す"""
+    progress = progress or ArchiveProgress(0, None)
+    count = 0
+    # 並列圧縮した tar.gz は複数メンバーの gzip になる。ストリームモード（r|gz）は
+    # 先頭のメンバーしか読まないため、gzip モジュール経由の r:* で開く
+    with tarfile.open(archive_path, mode="r:*") as tar:
+        for member in tar:
+            target = _safe_target(destination, member.name)
+            if member.isfile() and os.path.exists(target) and not overwrite:
+                raise FileExistsError(f"File already exists: {target}")
+            # "data" フィルターはリンクで展開先の外を指すメンバーなども拒否する
+            tar.extract(member, destination, filter="data")
+            if member.isfile():
+                count += 1
+                progress.add(1, member.size)
+    return count
+
+
+def archive_type(path: str, compression_type: Optional[str] = None) -> str:
+    """圧縮形式を決める（指定がなければ拡張子から判定）"""
+    kind = (compression_type or "").lower()
+    if not kind:
+        lower = path.lower()
+        if lower.endswith((".tar.gz", ".tgz")):
+            kind = "tar.gz"
+        elif lower.endswith(".tar"):
+            kind = "tar"
+        else:
+            kind = "zip"
+    return {"tgz": "tar.gz", "gz": "tar.gz"}.get(kind, kind)
@@ -4,7 +4,7 @@ Base classes for RPA operations
 
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, Optional
 
 
 @dataclass
@@ -34,6 +34,20 @@ class BaseOperation(ABC):
         else:
             print(f"[{level.upper()}] {message}")
 
+    def run_resource(self, key: str, factory: Callable[[], Any]):
+        """実行中に共有するリソース（書き込みキャッシュなど）を取得
+
+        実行終了時に OperationManager が finish_run() を呼び出す。
+        """
+        if self.agent and hasattr(self.agent, "get_run_resource"):
+            return self.agent.get_run_resource(key, factory)
+        return None
+
+    def notify(self, method: str, params: Dict[str, Any]):
+        """進捗などの通知を送信（通知先がない場合は何もしない）"""
+        if self.agent and hasattr(self.agent, "notify"):
+            self.agent.notify(method, params)
+
     def get_storage(self, key: str, default=None):
         """ストレージから値を取得"""
         if self.agent and hasattr(self.agent, "storage"):
@@ -45,6 +59,11 @@ class BaseOperation(ABC):
         if self.agent and hasattr(self.agent, "storage"):
             self.agent.storage[key] = value
 
+    def delete_storage(self, key: str):
+        """ストレージから値を削除"""
+        if self.agent and hasattr(self.agent, "storage"):
+            self.agent.storage.pop(key, None)
+
     @abstractmethod
     async def execute(self, params: Dict[str, Any]) -> OperationResult:
         """
@@ -0,0 +1,413 @@
+"""
+WebDriver のセッションプール
+
+ブラウザの起動（webdriver.Chrome など）には数秒かかるため、閉じたブラウザは
+終了せずに初期化してプールに戻し、次に同じ設定で開くときに使い回す。
+warm_size を指定した設定は、その数だけ起動済みのブラウザを裏のスレッドで
+用意しておく。max_uses 回使ったブラウザは、メモリの増加を抑えるため
+戻さずに終了する。
+
+プールは実行リソースとして OperationManager に登録し、実行をまたいで
+保持する（エージェントの終了時にすべて終了する）。
+
+貸し出しのたびに DevTools プロトコルでブラウザコンテキスト（シークレット
+ウィンドウ相当）を作ってその中でページを開き、返却時にコンテキストごと
+破棄する。訪れたすべてのオリジンの Cookie・ストレージ・キャッシュが
+一緒に消えるため、次の貸し出し先に前回の状態が残らない。コンテキストを
+作れなかったブラウザと、コンテキストの外にタブが開かれたブラウザは、
+消し残しがありうるため戻さずに終了する。DevTools プロトコルを使えない
+Firefox も戻す際に終了する（事前起動は行う）。
+
+起動時の設定（page_load_strategy、画像・フォント・動画の読み込みの停止、
+拡張機能・GPU の無効化）は BrowserConfig にまとめ、同じ設定のブラウザだけを
+使い回す。URL パターンによる読み込みの停止（block_urls）は Chrome の
+DevTools プロトコルで貸し出しのたびに設定する。
+"""
+
+import atexit
+import contextlib
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    from selenium import webdriver
+
+    SELENIUM_AVAILABLE = True
+except ImportError:
+    SELENIUM_AVAILABLE = False
+
+# OperationManager の実行リソースとして登録する際のキー
+BROWSER_POOL_KEY = "web_browser_pool"
+
+BROWSER_TYPES = ("chrome", "firefox")
+
+PAGE_LOAD_STRATEGIES = ("normal", "eager", "none")
+
+# 読み込みを止められるリソースの種類
+RESOURCE_TYPES = ("image", "font", "media")
+
+# Chrome でフォント・動画を止める URL パターン（画像はコンテンツ設定で止める）
+_RESOURCE_URL_PATTERNS = {
+    "font": ("*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot"),
+    "media": ("*.mp4", "*.webm", "*.ogg", "*.mp3", "*.wav", "*.m4a", "*.mov"),
+}
+
+# 1つのブラウザを使い回す回数の既定値（超えたら終了して起動し直す）
+DEFAULT_MAX_USES = 50
+
+# 設定ごとに待機させておくブラウザ数の上限（warm_size がこれより大きければそちら）
+DEFAULT_MAX_IDLE = 2
+
+# warm_size を超えて待機しているブラウザは、この秒数使われなければ実行終了時に終了する
+DEFAULT_IDLE_TIMEOUT = 10 * 60
+
+
+@dataclass(frozen=True)
+class BrowserConfig:
+    """起動時に決まるブラウザの設定（同じ設定のブラウザだけを使い回す）"""
+
+    browser_type: str = "chrome"
+    headless: bool = False
+    page_load_strategy: str = "normal"
+    block_resources: Tuple[str, ...] = ()
+    disable_extensions: bool = False
+    disable_gpu: bool = False
+
+    def __post_init__(self):
+        if self.browser_type not in BROWSER_TYPES:
+            raise ValueError(f"Unsupported browser type: {self.browser_type}")
+        if self.page_load_strategy not in PAGE_LOAD_STRATEGIES:
+            raise ValueError(
+                f"Unknown page_load_strategy: {self.page_load_strategy} "
+                f"(expected one of {', '.join(PAGE_LOAD_STRATEGIES)})"
+            )
+        unknown = set(self.block_resources) - set(RESOURCE_TYPES)
+        if unknown:
+            raise ValueError(
+                f"Unknown resource types: {', '.join(sorted(unknown))} "
+                f"(expected any of {', '.join(RESOURCE_TYPES)})"
+            )
+        # 指定の順序が違うだけの設定を同じものとして扱う
+        object.__setattr__(
+            self, "block_resources", tuple(sorted(set(self.block_resources)))
+        )
+
+    @property
+    def reusable(self) -> bool:
+        return self.browser_type == "chrome"
+
+
+def launch_driver(config: BrowserConfig):
+    """設定に従ってブラウザを起動する"""
+    if config.browser_type == "chrome":
+        options = webdriver.ChromeOptions()
+        options.page_load_strategy = config.page_load_strategy
+        if config.headless:
+            options.add_argument("--headless")
+        if config.disable_extensions:
+            options.add_argument("--disable-extensions")
+        if config.disable_gpu:
+            options.add_argument("--disable-gpu")
+        if "image" in config.block_resources:
+            options.add_experimental_option(
+                "prefs", {"profile.managed_default_content_settings.images": 2}
+            )
+        return webdriver.Chrome(options=options)
+    if config.browser_type == "firefox":
+        options = webdriver.FirefoxOptions()
+        options.page_load_strategy = config.page_load_strategy
+        if config.headless:
+            options.add_argument("--headless")
+        if config.disable_gpu:
+            options.set_preference("layers.acceleration.disabled", True)
+        if "image" in config.block_resources:
+            options.set_preference("permissions.default.image", 2)
+        if "font" in config.block_resources:
+            options.set_preference("gfx.downloadable_fonts.enabled", False)
+        if "media" in config.block_resources:
+            # Firefox は動画・音声の読み込みを止められないため、自動再生を止める
+            options.set_preference("media.autoplay.default", 5)
+        return webdriver.Firefox(options=options)
+    raise ValueError(f"Unsupported browser type: {config.browser_type}")
+
+
+def block_urls(driver, config: BrowserConfig, urls: Iterable[str] = ()):
+    """URL パターン（"*" が任意の文字列）に一致するリクエストを止める（Chrome のみ）
+
+    フォント・動画の読み込みの停止もここで設定する。
+    """
+    urls = list(urls)
+    if config.browser_type != "chrome":
+        if urls:
+            raise ValueError("blocked_urls is only supported in Chrome")
+        return
+    patterns = [
+        pattern
+        for resource in config.block_resources
+        for pattern in _RESOURCE_URL_PATTERNS.get(resource, ())
+    ] + urls
+    if patterns:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+
+
+def _open_tab(driver, context_id: Optional[str] = None) -> str:
+    """空白のタブを開いて切り替え、そのウィンドウハンドルを返す
+
+    context_id を省略すると既定のコンテキストに開く。
+    """
+    before = set(driver.window_handles)
+    target = {"url": "about:blank"}
+    if context_id:
+        target["browserContextId"] = context_id
+    target_id = driver.execute_cdp_cmd("Target.createTarget", target)["targetId"]
+    handles = driver.window_handles
+    if target_id in handles:
+        handle = target_id
+    else:
+        handle = next((h for h in handles if h not in before), None)
+        if handle is None:
+            raise RuntimeError(f"Opened tab not found: {target_id}")
+    driver.switch_to.window(handle)
+    return handle
+
+
+def open_context(driver) -> str:
+    """貸し出し用のブラウザコンテキストを作り、そのタブだけを残して ID を返す"""
+    context_id = driver.execute_cdp_cmd("Target.createBrowserContext", {})[
+        "browserContextId"
+    ]
+    handle = _open_tab(driver, context_id)
+    for other in driver.window_handles:
+        if other != handle:
+            driver.switch_to.window(other)
+            driver.close()
+    driver.switch_to.window(handle)
+    return context_id
+
+
+def reset_driver(driver, context_id: str):
+    """貸し出し用のコンテキストを破棄し、空白のタブ1つの状態に戻す
+
+    コンテキストのタブ・Cookie・ストレージ・キャッシュはオリジンを問わず
+    すべて消える。コンテキストの外に開かれたタブが残っている場合は、
+    その分を消し切れないため例外にする（呼び出し側でブラウザを終了する）。
+    """
+    home = _open_tab(driver)
+    driver.execute_cdp_cmd(
+        "Target.disposeBrowserContext", {"browserContextId": context_id}
+    )
+    stray = [handle for handle in driver.window_handles if handle != home]
+    if stray:
+        raise RuntimeError(f"{len(stray)} tabs were opened outside the lease context")
+    driver.switch_to.window(home)
+
+
+def driver_alive(driver) -> bool:
+    """ブラウザが応答するか（落ちた・閉じられたブラウザは False）"""
+    try:
+        driver.current_url  # noqa: B018
+        return True
+    except Exception:
+        return False
+
+
+def _quit(driver):
+    # すでに落ちているブラウザは終了できなくてもよい
+    with contextlib.suppress(Exception):
+        driver.quit()
+
+
+class _PooledDriver:
+    def __init__(self, driver, config: BrowserConfig):
+        self.driver = driver
+        self.config = config
+        self.uses = 0
+        self.idle_since = time.monotonic()
+        # 貸し出し中のブラウザコンテキスト（作れなかった場合は None）
+        self.context_id: Optional[str] = None
+
+    def alive(self) -> bool:
+        return driver_alive(self.driver)
+
+
+class BrowserPool:
+    """参照IDごとに貸し出したブラウザと、待機中のブラウザを保持する"""
+
+    def __init__(
+        self,
+        max_uses: int = DEFAULT_MAX_USES,
+        max_idle: int = DEFAULT_MAX_IDLE,
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+    ):
+        self.max_uses = max_uses
+        self.max_idle = max_idle
+        self.idle_timeout = idle_timeout
+        self._idle: Dict[BrowserConfig, List[_PooledDriver]] = {}
+        self._leased: Dict[str, _PooledDriver] = {}
+        self._warm: Dict[BrowserConfig, int] = {}
+        self._launching: Dict[BrowserConfig, int] = {}
+        # 初期化してプールに戻す途中のブラウザ数（同時の返却で上限を超えないよう数える）
+        self._returning: Dict[BrowserConfig, int] = {}
+        self._lock = threading.Lock()
+        self.launched = 0
+        self.reused = 0
+        atexit.register(self.close_all)
+
+    def set_warm_size(self, config: BrowserConfig, warm_size: int):
+        """設定ごとに起動済みで待機させておくブラウザ数を変える"""
+        with self._lock:
+            self._warm[config] = max(0, int(warm_size))
+        self._refill(config)
+
+    def acquire(self, reference_id: str, config: BrowserConfig) -> Tuple[Any, bool]:
+        """ブラウザを貸し出し、(driver, 使い回したか) を返す
+
+        同じ参照IDに貸し出し中のブラウザがあれば先に返却する。
+        """
+        self.release(reference_id)
+        pooled = None
+        while pooled is None:
+            with self._lock:
+                idle = self._idle.get(config)
+                candidate = idle.pop() if idle else None
+            if candidate is None:
+                break
+            if candidate.alive():
+                pooled = candidate
+            else:
+                _quit(candidate.driver)
+
+        reused = pooled is not None
+        if pooled is None:
+            pooled = _PooledDriver(launch_driver(config), config)
+        pooled.uses += 1
+        pooled.context_id = None
+        if config.reusable:
+            try:
+                pooled.context_id = open_context(pooled.driver)
+            except Exception:
+                # コンテキストなしでも使えるが、返却時に状態を消し切れないので終了する
+                pooled.context_id = None
+        with self._lock:
+            self._leased[reference_id] = pooled
+            if reused:
+                self.reused += 1
+            else:
+                self.launched += 1
+        self._refill(config)
+        return pooled.driver, reused
+
+    def owns(self, reference_id: str, driver) -> bool:
+        """参照IDに driver を貸し出しているか"""
+        with self._lock:
+            pooled = self._leased.get(reference_id)
+            return pooled is not None and pooled.driver is driver
+
+    def release(self, reference_id: str, quit: bool = False) -> bool:
+        """貸し出したブラウザを返却し、プールに戻したかを返す
+
+        初期化に失敗したブラウザ、使い回さない設定のブラウザ、貸し出し用の
+        コンテキストを作れなかったブラウザ、max_uses 回使ったブラウザ、
+        待機数の上限を超える分は終了する。
+        """
+        with self._lock:
+            pooled = self._leased.pop(reference_id, None)
+            if pooled is None:
+                return False
+            config = pooled.config
+            limit = max(self.max_idle, self._warm.get(config, 0))
+            returning = self._returning.get(config, 0)
+            keep = (
+                not quit
+                and config.reusable
+                and pooled.context_id is not None
+                and pooled.uses < self.max_uses
+                and len(self._idle.get(config, [])) + returning < limit
+            )
+            if keep:
+                self._returning[config] = returning + 1
+        if not keep:
+            _quit(pooled.driver)
+            self._refill(config)
+            return False
+        try:
+            reset_driver(pooled.driver, pooled.context_id)
+        except Exception:
+            keep = False
+        pooled.idle_since = time.monotonic()
+        with self._lock:
+            self._returning[config] -= 1
+            if keep:
+                self._idle.setdefault(config, []).append(pooled)
+        if not keep:
+            _quit(pooled.driver)
+            self._refill(config)
+        return keep
+
+    def _refill(self, config: BrowserConfig):
+        """待機数が warm_size に足りない分を裏のスレッドで起動する"""
+        with self._lock:
+            deficit = (
+                self._warm.get(config, 0)
+                - len(self._idle.get(config, []))
+                - self._launching.get(config, 0)
+            )
+            if deficit <= 0:
+                return
+            self._launching[config] = self._launching.get(config, 0) + deficit
+        for _ in range(deficit):
+            threading.Thread(
+                target=self._launch_idle, args=(config,), daemon=True
+            ).start()
+
+    def _launch_idle(self, config: BrowserConfig):
+        driver = None
+        try:
+            driver = launch_driver(config)
+        except Exception:
+            pass  # 事前起動の失敗は、貸し出し時に起動し直すので無視する
+        finally:
+            with self._lock:
+                self._launching[config] -= 1
+                if driver is not None:
+                    self._idle.setdefault(config, []).append(
+                        _PooledDriver(driver, config)
+                    )
+                    self.launched += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "leased": len(self._leased),
+                "idle": sum(len(idle) for idle in self._idle.values()),
+                "launched": self.launched,
+                "reused": self.reused,
+            }
+
+    def finish_run(self):
+        """実行終了時に、warm_size を超えて放置された待機中のブラウザを終了する"""
+        now = time.monotonic()
+        expired = []
+        with self._lock:
+            for config, idle in self._idle.items():
+                keep = self._warm.get(config, 0)
+                idle.sort(key=lambda pooled: pooled.idle_since)
+                while len(idle) > keep and now - idle[0].idle_since > self.idle_timeout:
+                    expired.append(idle.pop(0))
+        for pooled in expired:
+            _quit(pooled.driver)
+
+    def close_all(self):
+        """貸し出し中を含むすべてのブラウザを終了する"""
+        with self._lock:
+            drivers = [pooled.driver for pooled in self._leased.values()]
+            for idle in self._idle.values():
+                drivers.extend(pooled.driver for pooled in idle)
+            self._leased.clear()
+            self._idle.clear()
+            self._warm.clear()
+        for driver in drivers:
+            _quit(driver)
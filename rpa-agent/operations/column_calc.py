@@ -0,0 +1,227 @@
+"""
+列計算（集計と、列どうしの四則演算）
+
+集計は数値のセルだけを対象にする（Excel の SUM・AVERAGE と同じく文字列や
+空セルは無視する）。式は列全体をまとめて1回で評価し、NumPy がある環境では
+配列演算、ない環境ではコンパイルした式を各行に適用する。
+"""
+
+import ast
+import math
+from typing import Any, Dict, List, Optional
+
+try:
+    import numpy as np
+
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+AGGREGATE_OPERATIONS = ("sum", "average", "count", "counta", "min", "max")
+
+# 別名
+_OPERATION_ALIASES = {"avg": "average", "mean": "average"}
+
+_ALLOWED_NODES = (
+    ast.Expression,
+    ast.BinOp,
+    ast.UnaryOp,
+    ast.Constant,
+    ast.Name,
+    ast.Load,
+    ast.Call,
+    ast.Add,
+    ast.Sub,
+    ast.Mult,
+    ast.Div,
+    ast.FloorDiv,
+    ast.Mod,
+    ast.Pow,
+    ast.USub,
+    ast.UAdd,
+)
+
+_FUNCTIONS = ("abs", "round")
+
+
+def normalize_operation(operation: str) -> str:
+    operation = (operation or "").lower()
+    return _OPERATION_ALIASES.get(operation, operation)
+
+
+def is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def aggregate(values: List[Any], operation: str) -> Optional[float]:
+    """数値のセルを集計する（対象がない場合の average・min・max は None）"""
+    operation = normalize_operation(operation)
+    if operation not in AGGREGATE_OPERATIONS:
+        raise ValueError(
+            f"Unknown operation: {operation} "
+            f"(expected one of {', '.join(AGGREGATE_OPERATIONS)} or expression)"
+        )
+    if operation == "counta":
+        return sum(1 for value in values if value is not None and value != "")
+    # bool を除くため isinstance ではなく型で判定する（関数呼び出しより速い）
+    numbers = [value for value in values if type(value) in (int, float)]
+    if operation == "count":
+        return len(numbers)
+    if operation == "sum":
+        # 浮動小数点の誤差を溜めないよう、小数を含む場合は fsum を使う
+        if all(type(value) is int for value in numbers):
+            return sum(numbers)
+        return math.fsum(numbers)
+    if not numbers:
+        return None
+    if operation == "average":
+        return math.fsum(numbers) / len(numbers)
+    if operation == "min":
+        return min(numbers)
+    return max(numbers)
+
+
+def parse_expression(expression: str, names: List[str]) -> ast.Expression:
+    """四則演算・abs・round と列名だけからなる式を検証して構文木を返す"""
+    tree = ast.parse(expression.strip(), mode="eval")
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise ValueError(f"Unsupported syntax in expression: {expression}")
+        if isinstance(node, ast.Constant) and not is_number(node.value):
+            raise ValueError(f"Only numeric constants are allowed: {expression}")
+        if isinstance(node, ast.Call) and (
+            not isinstance(node.func, ast.Name)
+            or node.func.id not in _FUNCTIONS
+            or node.keywords
+        ):
+            raise ValueError(f"Only abs() and round() can be called: {expression}")
+        if (
+            isinstance(node, ast.Name)
+            and node.id not in names
+            and node.id not in _FUNCTIONS
+        ):
+            raise ValueError(f"Unknown column in expression: {node.id}")
+    return tree
+
+
+def evaluate(expression: str, columns: Dict[str, List[Any]]) -> List[Optional[float]]:
+    """列の辞書（{列名: 値のリスト}）に対して式を行ごとに評価する
+
+    数値でないセルを含む行と、0 除算などで値が求まらない行は None になる。
+    """
+    names = list(columns)
+    tree = parse_expression(expression, names)
+    length = max((len(values) for values in columns.values()), default=0)
+    if NUMPY_AVAILABLE:
+        return _evaluate_numpy(tree, columns, length)
+    return _evaluate_rows(tree, columns, names, length)
+
+
+_NUMPY_OPERATORS = {
+    ast.Add: "add",
+    ast.Sub: "subtract",
+    ast.Mult: "multiply",
+    ast.Div: "true_divide",
+    ast.FloorDiv: "floor_divide",
+    ast.Mod: "mod",
+    ast.Pow: "power",
+}
+
+
+def _evaluate_numpy(tree: ast.Expression, columns: Dict[str, List[Any]], length: int):
+    # 値と「Python で評価した場合に int になるか」を組にして配列で計算し、
+    # 行ごとの評価（_evaluate_rows）と同じ型の結果を返す
+    arrays = {}
+    # どれかの列が数値でない行は、式で使わない列でも None にする
+    valid = np.ones(length, dtype=bool)
+    for name, values in columns.items():
+        array = np.full(length, np.nan)
+        integers = np.zeros(length, dtype=bool)
+        numbers = np.zeros(length, dtype=bool)
+        array[: len(values)] = [
+            value if is_number(value) else np.nan for value in values
+        ]
+        integers[: len(values)] = [type(value) is int for value in values]
+        numbers[: len(values)] = [is_number(value) for value in values]
+        arrays[name] = (array, integers)
+        valid &= numbers
+    with np.errstate(all="ignore"):
+        result, integers = _numpy_node(tree.body, arrays)
+    result = np.broadcast_to(result, (length,)).tolist()
+    integers = np.broadcast_to(integers, (length,)).tolist()
+    return [
+        (int(value) if integer else value) if ok and math.isfinite(value) else None
+        for value, integer, ok in zip(result, integers, valid.tolist(), strict=True)
+    ]
+
+
+def _numpy_node(node: ast.AST, arrays: Dict[str, Any]):
+    """構文木の節を評価し、(値の配列, int になるかの配列) を返す"""
+    if isinstance(node, ast.Constant):
+        return np.float64(node.value), type(node.value) is int
+    if isinstance(node, ast.Name):
+        return arrays[node.id]
+    if isinstance(node, ast.UnaryOp):
+        value, integer = _numpy_node(node.operand, arrays)
+        return (-value if isinstance(node.op, ast.USub) else +value), integer
+    if isinstance(node, ast.BinOp):
+        left, left_integer = _numpy_node(node.left, arrays)
+        right, right_integer = _numpy_node(node.right, arrays)
+        value = getattr(np, _NUMPY_OPERATORS[type(node.op)])(left, right)
+        if isinstance(node.op, ast.Div):
+            return value, False
+        integer = np.logical_and(left_integer, right_integer)
+        if isinstance(node.op, ast.Pow):
+            # 負の指数のべき乗は int どうしでも float になる
+            integer = np.logical_and(integer, right >= 0)
+        return value, integer
+    # abs() と round()（parse_expression で検証済み）
+    value, integer = _numpy_node(node.args[0], arrays)
+    if node.func.id == "abs":
+        return np.abs(value), integer
+    if len(node.args) == 1:
+        # 桁数を省略した round() は常に int を返す
+        return np.round(value), True
+    digits, _ = _numpy_node(node.args[1], arrays)
+    if np.ndim(digits) == 0:
+        return np.round(value, int(digits)), integer
+    # 桁数が列の場合は行ごとに丸める
+    value = np.broadcast_to(value, digits.shape)
+    rounded = [
+        np.round(v, int(d)) if math.isfinite(d) else np.nan
+        for v, d in zip(value.tolist(), digits.tolist(), strict=True)
+    ]
+    return np.array(rounded, dtype=float), integer
+
+
+def _evaluate_rows(
+    tree: ast.Expression, columns: Dict[str, List[Any]], names: List[str], length: int
+):
+    # 式を列名を引数にとる関数にコンパイルし、各行の値を渡す
+    arguments = ast.arguments(
+        posonlyargs=[],
+        args=[ast.arg(arg=name) for name in names],
+        kwonlyargs=[],
+        kw_defaults=[],
+        defaults=[],
+    )
+    lambda_tree = ast.fix_missing_locations(
+        ast.Expression(body=ast.Lambda(args=arguments, body=tree.body))
+    )
+    namespace = {"__builtins__": {}, "abs": abs, "round": round}
+    function = eval(compile(lambda_tree, "<expression>", "eval"), namespace)
+
+    padded = [values + [None] * (length - len(values)) for values in columns.values()]
+    results = []
+    for row in zip(*padded, strict=True):
+        if not all(is_number(value) for value in row):
+            results.append(None)
+            continue
+        try:
+            value = function(*row)
+        except (ArithmeticError, ValueError):
+            value = None
+        if isinstance(value, float) and not math.isfinite(value):
+            value = None
+        results.append(value)
+    return results
@@ -0,0 +1,528 @@
+"""
+K_CSV カテゴリの操作
+"""
+
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Any, Dict
+
+from .base import BaseOperation, OperationResult
+from .csv_stream import (
+    CsvReader,
+    RowCounter,
+    append_encoding,
+    bind_row,
+    column_bindings,
+    csv_writer,
+    detect_format,
+    ends_with_newline,
+    normalize_rows,
+    write_csv,
+)
+from .excel_convert import (
+    DEFAULT_DATE_FORMAT,
+    DEFAULT_DATETIME_FORMAT,
+    csv_to_workbook,
+    sheet_names,
+    sheet_output_path,
+    sheet_to_csv,
+)
+from .excel_range import chunked
+from .loop import LoopBodyRunner
+from .workbook_pool import OPENPYXL_AVAILABLE
+from .write_cache import flush_pending_writes
+
+# 応答に載せる行数の上限（全件は storage_key の変数に入る）
+RESULT_PREVIEW_ROWS = 1000
+
+EXCEL_NOT_AVAILABLE = "Excel support not available. Install openpyxl."
+
+# 複数シートを変換する際のプロセス数の既定値
+DEFAULT_CONVERT_WORKERS = 4
+
+
+def _load_data(op: BaseOperation, params: Dict[str, Any]):
+    """data か data_key（記憶した変数）から書き込むデータを取り出す"""
+    data_key = params.get("data_key", "")
+    if data_key:
+        data = op.get_storage(data_key)
+        if data is None:
+            raise ValueError(f"No data stored under key: {data_key}")
+        return data
+    if params.get("data") is None:
+        raise ValueError("Missing required parameter: data")
+    return params["data"]
+
+
+class CSVReadOperation(BaseOperation):
+    """CSVファイルを読み込む
+
+    encoding・delimiter に "auto" を指定するとファイルから判定する。
+    has_header=True の場合、各行はヘッダー名をキーにした辞書になる
+    （as_dict=False ならリストのまま）。
+    """
+
+    async def execute(self, params: Dict[str, Any]) -> OperationResult:
+        file_path = params.get("file_path", "")
+        encoding = params.get("encoding", "auto")
+        delimiter = params.get("delimiter", "auto")
+        has_header = params.get("has_header", True)
+        as_dict = params.get("as_dict", True)
+        start_row = params.get("start_row", 1)
+        max_rows = params.get("max_rows")
+        storage_key = params.get("storage_key", "")
+
+        error = self.validate_params(params, ["file_path"])
+        if error:
+            return OperationResult(status="failure", data={}, error=error)
+
+        try:
+            file_path = os.path.expanduser(file_path)
+            flush_pending_writes(self.agent, file_path)
+
+            with CsvReader(file_path, encoding, delimiter, has_header) as reader:
+                rows = reader.rows(start_row, max_rows)
+                if has_header and as_dict:
+                    rows = reader.records(rows)
+                data = list(rows)
+
+            if storage_key:
+                self.set_storage(storage_key, data)
+                self.log(f"Stored CSV rows as '{storage_key}'")
+
+            self.log(
+                f"Read {len(data)} rows from CSV: {file_path} "
+                f"(encoding: {reader.encoding}, delimiter: {reader.delimiter!r})"
+            )
+
+            truncated = len(data) > RESULT_PREVIEW_ROWS
+            return OperationResult(
+                status="success",
+                data={
+                    "file_path": file_path,
+                    "encoding": reader.encoding,
+                    "delimiter": reader.delimiter,
+                    "header": reader.header,
+                    "rows": data[:RESULT_PREVIEW_ROWS] if truncated else data,
+                    "row_count": len(data),
+                    "truncated": truncated,
+                },
+            )
+        except Exception as e:
+            return OperationResult(
+                status="failure", data={}, error=f"Failed to read CSV: {str(e)}"
+            )
+
+
+class CSVWriteOperation(BaseOperation):
+    """CSVファイルに書き込む（既存のファイルは置き換える）
+
+    data（または data_key で指定した変数）の行を csv.writer.writerows で
+    まとめて書き込む。書きかけのファイルを他システムが読まないよう、
+    一時ファイルに書いてから置き換える。
+    """
+
+    async def execute(self, params: Dict[str, Any]) -> OperationResult:
+        file_path = params.get("file_path", "")
+        encoding = params.get("encoding", "utf-8")
+        delimiter = params.get("delimiter", ",")
+        header = params.get("header") or None
+        write_header = params.get("write_header", True)
+        quoting = params.get("quoting", "minimal")
+
+        error = self.validate_params(params, ["file_path"])
+        if error:
+            return OperationResult(status="failure", data={}, error=error)
+
+        try:
+            file_path = os.path.expanduser(file_path)
+            header, rows = normalize_rows(_load_data(self, params), header)
+
+            rows_written = write_csv(
+                file_path,
+                header if write_header else None,
+                rows,
+                encoding,
+                delimiter,
+                quoting,
+            )
+
+            self.log(f"Wrote {rows_written} rows to CSV: {file_path}")
+
+            return OperationResult(
+                status="success",
+                data={
+                    "file_path": file_path,
+                    "rows_written": rows_written,
+                    "header": header,
+                    "encoding": encoding,
+                },
+            )
+        except Exception as e:
+            return OperationResult(
+                status="failure", data={}, error=f"Failed to write CSV: {str(e)}"
+            )
+
+
+class CSVAppendOperation(BaseOperation):
+    """CSVファイルの末尾に行を追記する
+
+    既存ファイルの文字コード・区切り文字を判定して合わせる。辞書の行は
+    既存ファイルのヘッダーの列順に並べ替える。ファイルがない（空の）場合は
+    ヘッダーから書き込む。
+    """
+
+    async def execute(self, params: Dict[str, Any]) -> OperationResult:
+        file_path = params.get("file_path", "")
+        encoding = params.get("encoding", "auto")
+        delimiter = params.get("delimiter", "auto")
+        header = params.get("header") or None
+        has_header = params.get("has_header", True)
+        quoting = params.get("quoting", "minimal")
+
+        error = self.validate_params(params, ["file_path"])
+        if error:
+            return OperationResult(status="failure", data={}, error=error)
+
+        try:
+            file_path = os.path.expanduser(file_path)
+            flush_pending_writes(self.agent, file_path)
+            data = _load_data(self, params)
+
+            exists = os.path.exists(file_path) and os.path.getsize(file_path) > 0
+            if exists:
+                encoding, delimiter = detect_format(file_path, encoding, delimiter)
+                if has_header and not header:
+                    with CsvReader(file_path, encoding, delimiter) as reader:
+                        header = reader.header or None
+                encoding = append_encoding(file_path, encoding)
+            else:
+                if encoding == "auto":
+                    encoding = "utf-8"
+                if delimiter == "auto":
+                    delimiter = ","
+            header, rows = normalize_rows(data, header)
+
+            counter = RowCounter(rows)
+            with open(file_path, "a", encoding=encoding, newline="") as f:
+                writer = csv_writer(f, delimiter, quoting)
+                if not exists:
+                    if header and has_header:
+                        writer.writerow(header)
+                elif not ends_with_newline(file_path, encoding):
+                    f.write("\r\n")
+                writer.writerows(counter)
+
+            self.log(f"Appended {counter.count} rows to CSV: {file_path}")
+
+            return OperationResult(
+                status="success",
+                data={
+                    "file_path": file_path,
+                    "rows_written": counter.count,
+                    "encoding": encoding,
+                    "delimiter": delimiter,
+                },
+            )
+        except Exception as e:
+            return OperationResult(
+                status="failure", data={}, error=f"Failed to append CSV: {str(e)}"
+            )
+
+
+class CSVReadLoopOperation(BaseOperation):
+    """CSVファイルを1行（または chunk_size 行）ずつ読み、loop_steps を実行する
+
+    各反復で row_storage_key に行（ヘッダーありなら辞書）を束縛し、
+    row_storage_keys（{列名または列番号: 変数名}）で指定した列を個別の
+    変数にも束縛する。chunk_size が2以上の場合は row_storage_key に行の
+    リストを、row_storage_keys の変数にはその列の値のリストを束縛する。
+    ファイルは読み進めながら処理するため、全行をメモリに載せない。
+    """
+
+    async def execute(self, params: Dict[str, Any]) -> OperationResult:
+        file_path = params.get("file_path", "")
+        encoding = params.get("encoding", "auto")
+        delimiter = params.get("delimiter", "auto")
+        has_header = params.get("has_header", True)
+        start_row = params.get("start_row", 1)
+        max_rows = params.get("max_rows")
+        chunk_size = max(1, int(params.get("chunk_size") or 1))
+        row_storage_key = params.get("row_storage_key") or "current_row"
+        row_storage_keys = params.get("row_storage_keys") or {}
+
+        error = self.validate_params(params, ["file_path", "loop_steps"])
+        if error:
+            return OperationResult(status="failure", data={}, error=error)
+
+        runner = LoopBodyRunner(
+            self.agent,
+            params["loop_steps"],
+            iteration_error=params.get("iteration_error", "stop"),
+            concurrency=params.get("concurrency", 1),
+        )
+        error = runner.validate()
+        if error:
+            return OperationResult(status="failure", data={}, error=error)
+
+        try:
+            file_path = os.path.expanduser(file_path)
+            flush_pending_writes(self.agent, file_path)
+
+            with CsvReader(file_path, encoding, delimiter, has_header) as reader:
+                rows = reader.rows(start_row, max_rows)
+                bindings = column_bindings(reader.header, row_storage_keys)
+                if chunk_size > 1:
+                    items = self._chunk_items(
+                        reader, chunked(rows, chunk_size), row_storage_key, bindings
+                    )
+                else:
+                    items = self._row_items(reader, rows, row_storage_key, bindings)
+                summary = await runner.run(items)
+
+            data = {
+                "file_path": file_path,
+                "encoding": reader.encoding,
+                "delimiter": reader.delimiter,
+                "header": reader.header,
+                "chunk_size": chunk_size,
+                **summary,
+            }
+            if summary["stopped"]:
+                first = summary["errors"][0]
+                return OperationResult(
+                    status="failure",
+                    data=data,
+                    error=f"Loop stopped at row {start_row + first['index'] * chunk_size}: "
+                    f"{first['error']}",
+                )
+            if summary["failed"]:
+                return OperationResult(
+                    status="warning",
+                    data=data,
+                    error=f"{summary['failed']} iterations failed and were skipped",
+                )
+            return OperationResult(status="success", data=data)
+        except Exception as e:
+            return OperationResult(
+                status="failure",
+                data={},
+                error=f"Failed to process CSV read loop: {str(e)}",
+            )
+
+    @staticmethod
+    def _row_items(reader: CsvReader, rows, row_storage_key: str, bindings):
+        header = reader.header
+        width = len(header)
+        for row in rows:
+            variables = bind_row(row, bindings)
+            if header:
+                if len(row) < width:
+                    row = row + [""] * (width - len(row))
+                variables[row_storage_key] = dict(zip(header, row, strict=False))
+            else:
+                variables[row_storage_key] = row
+            yield variables
+
+    @staticmethod
+    def _chunk_items(reader: CsvReader, chunks, row_storage_key: str, bindings):
+        for chunk in chunks:
+            variables = {
+                variable: [row[index] if index < len(row) else "" for row in chunk]
+                for index, variable in bindings
+            }
+            variables[row_storage_key] = (
+                list(reader.records(chunk)) if reader.header else chunk
+            )
+            yield variables
+
+
+class ExcelToCSVOperation(BaseOperation):
+    """Excel のシートを CSV に変換する
+
+    シートを read_only で開いて1行ずつ CSV に書き出すため、値を変数に
+    読み込まない。sheet_names を省略するとアクティブシート、["*"] で
+    全シートを変換する。複数シートの場合、output_path は "{sheet}" を
+    含むパスかフォルダとして扱い、シートごとに別のプロセスで変換する。
+    """
+
+    async def execute(self, params: Dict[str, Any]) -> OperationResult:
+        file_path = params.get("file_path", "")
+        output_path = params.get("output_path", "")
+        names = params.get("sheet_names") or []
+        encoding = params.get("encoding", "utf-8")
+        delimiter = params.get("delimiter", ",")
+        quoting = params.get("quoting", "minimal")
+        date_format = params.get("date_format") or DEFAULT_DATE_FORMAT
+        datetime_format = params.get("datetime_format") or DEFAULT_DATETIME_FORMAT
+        max_workers = int(params.get("max_workers") or DEFAULT_CONVERT_WORKERS)
+
+        error = self.validate_params(params, ["file_path", "output_path"])
+        if error:
+            return OperationResult(status="failure", data={}, error=error)
+
+        if not OPENPYXL_AVAILABLE:
+            return OperationResult(status="failure", data={}, error=EXCEL_NOT_AVAILABLE)
+
+        try:
+            file_path = os.path.expanduser(file_path)
+            output_path = os.path.expanduser(output_path)
+            if not os.path.exists(file_path):
+                return OperationResult(
+                    status="failure",
+                    data={},
+                    error=f"File does not exist: {file_path}",
+                )
+            flush_pending_writes(self.agent, file_path)
+
+            if isinstance(names, str):
+                names = [names]
+            if "*" in names:
+                names = await asyncio.to_thread(sheet_names, file_path)
+
+            options = {
+                "encoding": encoding,
+                "delimiter": delimiter,
+                "quoting": quoting,
+                "date_format": date_format,
+                "datetime_format": datetime_format,
+            }
+            if len(names) > 1 or "{sheet}" in output_path:
+                jobs = [
+                    (file_path, name, sheet_output_path(output_path, name))
+                    for name in names
+                ]
+            else:
+                jobs = [(file_path, names[0] if names else None, output_path)]
+
+            tasks = [partial(sheet_to_csv, *job, **options) for job in jobs]
+            results = await _run_in_processes(tasks, max_workers)
+
+            converted = [result for result in results if isinstance(result, dict)]
+            errors = [
+                {"sheet": job[1], "error": str(result)}
+                for job, result in zip(jobs, results, strict=True)
+                if isinstance(result, BaseException)
+            ]
+            for result in converted:
+                self.log(
+                    f"Converted sheet '{result['sheet']}' to CSV: "
+                    f"{result['output_path']} ({result['rows']} rows)"
+                )
+
+            data = {
+                "file_path": file_path,
+                "converted": converted,
+                "errors": errors,
+                "rows_written": sum(result["rows"] for result in converted),
+            }
+            if errors:
+                return OperationResult(
+                    status="failure",
+                    data=data,
+                    error=f"Failed to convert sheet '{errors[0]['sheet']}': "
+                    f"{errors[0]['error']}",
+                )
+            return OperationResult(status="success", data=data)
+        except Exception as e:
+            return OperationResult(
+                status="failure",
+                data={},
+                error=f"Failed to convert Excel to CSV: {str(e)}",
+            )
+
+
+class CSVToExcelOperation(BaseOperation):
+    """CSV ファイルを Excel のブックに変換する
+
+    file_path にリストを指定すると、各 CSV を1シートずつ（シート名は
+    ファイル名）1つのブックにまとめる。write_only のブックに1行ずつ
+    追記するため、行をメモリにためない。convert_numbers=True なら数値の
+    文字列を数値に、date_format を指定するとその形式の文字列を日時にする。
+    """
+
+    async def execute(self, params: Dict[str, Any]) -> OperationResult:
+        file_paths = params.get("file_path", "")
+        output_path = params.get("output_path", "")
+        sheet_name = params.get("sheet_name", "")
+        encoding = params.get("encoding", "auto")
+        delimiter = params.get("delimiter", "auto")
+        convert_numbers = params.get("convert_numbers", True)
+        date_format = params.get("date_format", "")
+
+        error = self.validate_params(params, ["file_path", "output_path"])
+        if error:
+            return OperationResult(status="failure", data={}, error=error)
+
+        if not OPENPYXL_AVAILABLE:
+            return OperationResult(status="failure", data={}, error=EXCEL_NOT_AVAILABLE)
+
+        try:
+            if isinstance(file_paths, str):
+                file_paths = [file_paths]
+            output_path = os.path.expanduser(output_path)
+
+            sources = []
+            for path in file_paths:
+                path = os.path.expanduser(path)
+                if not os.path.exists(path):
+                    return OperationResult(
+                        status="failure",
+                        data={},
+                        error=f"File does not exist: {path}",
+                    )
+                flush_pending_writes(self.agent, path)
+                name = os.path.splitext(os.path.basename(path))[0]
+                sources.append({"file_path": path, "sheet_name": name})
+            if sheet_name and len(sources) == 1:
+                sources[0]["sheet_name"] = sheet_name
+
+            results = await asyncio.to_thread(
+                csv_to_workbook,
+                sources,
+                output_path,
+                encoding,
+                delimiter,
+                convert_numbers,
+                date_format,
+            )
+
+            self.log(f"Converted {len(results)} CSV files to Excel: {output_path}")
+
+            return OperationResult(
+                status="success",
+                data={
+                    "output_path": output_path,
+                    "converted": results,
+                    "rows_written": sum(result["rows"] for result in results),
+                },
+            )
+        except Exception as e:
+            return OperationResult(
+                status="failure",
+                data={},
+                error=f"Failed to convert CSV to Excel: {str(e)}",
+            )
+
+
+async def _run_in_processes(tasks, max_workers: int):
+    """関数を別プロセスで並列に実行し、結果（失敗は例外）のリストを返す
+
+    1件だけ、または max_workers が1以下の場合はプロセスを起動せず、
+    スレッドで順に実行する。
+    """
+    if len(tasks) <= 1 or max_workers <= 1:
+        results = []
+        for task in tasks:
+            try:
+                results.append(await asyncio.to_thread(task))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    loop = asyncio.get_running_loop()
+    with ProcessPoolExecutor(max_workers=min(max_workers, len(tasks))) as executor:
+        futures = [loop.run_in_executor(executor, task) for task in tasks]
+        return await asyncio.gather(*futures, return_exceptions=True)
@@ -0,0 +1,260 @@
+"""
+CSV ファイルのストリーミング読み書き
+
+行は csv.reader から1行ずつ取り出すため、数GBのファイルでもメモリに
+載るのは読んでいる行（またはチャンク）だけになる。文字コード（CP932 を含む）と
+区切り文字は "auto" を指定するとファイル先頭の一部から判定する。
+"""
+
+import codecs
+import csv
+import os
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .encoding import DETECT_SAMPLE_SIZE, detect_encoding_bytes
+from .tree_copy import PARTIAL_SUFFIX
+
+# 区切り文字の判定候補
+DELIMITER_CANDIDATES = ",\t;|"
+
+# 区切り文字の判定に使う先頭の行数
+DELIMITER_SAMPLE_LINES = 20
+
+# 書き込み時の引用符の付け方
+QUOTING_MODES = {
+    "minimal": csv.QUOTE_MINIMAL,
+    "all": csv.QUOTE_ALL,
+    "nonnumeric": csv.QUOTE_NONNUMERIC,
+    "none": csv.QUOTE_NONE,
+}
+
+
+def detect_delimiter(sample: str, default: str = ",") -> str:
+    """先頭の数行から区切り文字を判定する"""
+    lines = sample.splitlines()[:DELIMITER_SAMPLE_LINES]
+    # サンプル末尾の行は途中で切れている可能性がある
+    if len(lines) > 1 and not sample.endswith(("\n", "\r")):
+        lines = lines[:-1]
+    if not lines:
+        return default
+    try:
+        dialect = csv.Sniffer().sniff("\n".join(lines), DELIMITER_CANDIDATES)
+        return dialect.delimiter
+    except csv.Error:
+        pass
+    # 1列だけのファイルなどは Sniffer が判定できないため、1行目で最も多い候補を使う
+    counts = {d: lines[0].count(d) for d in DELIMITER_CANDIDATES}
+    best = max(counts, key=counts.get)
+    return best if counts[best] else default
+
+
+def _default_delimiter(file_path: str) -> str:
+    return "\t" if file_path.lower().endswith((".tsv", ".tab")) else ","
+
+
+def detect_format(
+    file_path: str, encoding: str = "auto", delimiter: str = "auto"
+) -> Tuple[str, str]:
+    """文字コードと区切り文字を判定して (encoding, delimiter) を返す"""
+    auto_encoding = not encoding or encoding == "auto"
+    auto_delimiter = not delimiter or delimiter == "auto"
+    if not (auto_encoding or auto_delimiter):
+        return encoding, delimiter
+
+    with open(file_path, "rb") as f:
+        sample = f.read(DETECT_SAMPLE_SIZE)
+    if auto_encoding:
+        encoding = detect_encoding_bytes(sample)
+    if auto_delimiter:
+        text = codecs.getincrementaldecoder(encoding)(errors="replace").decode(sample)
+        delimiter = detect_delimiter(text, _default_delimiter(file_path))
+    return encoding, delimiter
+
+
+class CsvReader:
+    """CSV を1行ずつ読み込む（with 文で使う）
+
+    has_header=True の場合は1行目を header として読み飛ばす。
+    文字コードを自動判定した場合、判定に使った先頭より後ろに読めない文字が
+    あっても処理を止めず、置換文字にする。
+    """
+
+    def __init__(
+        self,
+        file_path: str,
+        encoding: str = "auto",
+        delimiter: str = "auto",
+        has_header: bool = True,
+    ):
+        self.file_path = file_path
+        self.errors = "replace" if not encoding or encoding == "auto" else "strict"
+        self.encoding, self.delimiter = detect_format(file_path, encoding, delimiter)
+        self.has_header = has_header
+        self.header: List[str] = []
+        self._file = None
+        self._reader = None
+
+    def __enter__(self) -> "CsvReader":
+        self._file = open(
+            self.file_path, encoding=self.encoding, errors=self.errors, newline=""
+        )
+        self._reader = csv.reader(self._file, delimiter=self.delimiter)
+        if self.has_header:
+            self.header = next(self._reader, [])
+        return self
+
+    def __exit__(self, *exc_info):
+        self._file.close()
+
+    def rows(
+        self, start_row: int = 1, max_rows: Optional[int] = None
+    ) -> Iterator[List[str]]:
+        """データ行（ヘッダーを除いて1始まり）の start_row 行目から返す"""
+        stop = None if max_rows is None else max(start_row, 1) - 1 + max_rows
+        return islice(self._reader, max(start_row, 1) - 1, stop)
+
+    def records(self, rows: Iterable[List[str]]) -> Iterator[Dict[str, str]]:
+        """行をヘッダー名をキーにした辞書にする（足りない列は空文字）"""
+        header = self.header
+        width = len(header)
+        for row in rows:
+            if len(row) < width:
+                row = row + [""] * (width - len(row))
+            yield dict(zip(header, row, strict=False))
+
+
+def column_bindings(
+    header: List[str], mapping: Dict[str, str]
+) -> List[Tuple[int, str]]:
+    """{列: 変数名} を (列番号, 変数名) のリストにする
+
+    列はヘッダー名か、1始まりの列番号（数値または数字の文字列）で指定する。
+    """
+    bindings = []
+    for column, variable in mapping.items():
+        if isinstance(column, int) or str(column).isdigit():
+            index = int(column) - 1
+        elif column in header:
+            index = header.index(column)
+        else:
+            raise ValueError(f"Column not found in header: {column}")
+        bindings.append((index, variable))
+    return bindings
+
+
+def bind_row(row: List[str], bindings: List[Tuple[int, str]]) -> Dict[str, str]:
+    return {
+        variable: row[index] if index < len(row) else "" for index, variable in bindings
+    }
+
+
+def normalize_rows(
+    data: Any, header: Optional[List[str]] = None
+) -> Tuple[List[str], Iterable[Iterable[Any]]]:
+    """書き込むデータを (header, 行の並び) にそろえる
+
+    受け付ける形式:
+        行のリスト: [[1, "a"], [2, "b"]]
+        辞書のリスト: [{"id": 1, "name": "a"}]（header 省略時は1件目のキーの順）
+        列ごとのリストの辞書: {"id": [1, 2], "name": ["a", "b"]}（キーが header）
+    """
+    if isinstance(data, dict):
+        header = header or [str(key) for key in data]
+        width = max((len(values) for values in data.values()), default=0)
+        columns = list(data.values())
+        rows = (
+            [values[i] if i < len(values) else None for values in columns]
+            for i in range(width)
+        )
+        return header, rows
+    if isinstance(data, (str, bytes)) or not isinstance(data, Iterable):
+        raise ValueError(
+            "data must be a list of rows, a list of dicts or a dict of columns"
+        )
+
+    data = list(data) if not isinstance(data, list) else data
+    if data and isinstance(data[0], dict):
+        header = header or list(data[0])
+        return header, ([record.get(key) for key in header] for record in data)
+    return header or [], data
+
+
+def csv_writer(f, delimiter: str = ",", quoting: str = "minimal"):
+    """改行を CRLF にそろえた csv.writer"""
+    if quoting not in QUOTING_MODES:
+        raise ValueError(
+            f"Unknown quoting: {quoting} (expected one of {', '.join(QUOTING_MODES)})"
+        )
+    return csv.writer(
+        f, delimiter=delimiter, quoting=QUOTING_MODES[quoting], lineterminator="\r\n"
+    )
+
+
+class RowCounter:
+    """writerows に渡しながら書き込んだ行数を数える"""
+
+    def __init__(self, rows: Iterable[Iterable[Any]]):
+        self._rows = rows
+        self.count = 0
+
+    def __iter__(self):
+        for row in self._rows:
+            self.count += 1
+            yield row
+
+
+def write_csv(
+    file_path: str,
+    header: Optional[List[str]],
+    rows: Iterable[Iterable[Any]],
+    encoding: str = "utf-8",
+    delimiter: str = ",",
+    quoting: str = "minimal",
+) -> int:
+    """行を CSV に書き出し、書き込んだ行数（ヘッダーを除く）を返す
+
+    書きかけのファイルを他システムが読まないよう、一時ファイルに書いてから
+    置き換える。
+    """
+    directory = os.path.dirname(os.path.abspath(file_path))
+    os.makedirs(directory, exist_ok=True)
+    partial_path = file_path + PARTIAL_SUFFIX
+    counter = RowCounter(rows)
+    try:
+        with open(partial_path, "w", encoding=encoding, newline="") as f:
+            writer = csv_writer(f, delimiter, quoting)
+            if header:
+                writer.writerow(header)
+            writer.writerows(counter)
+        os.replace(partial_path, file_path)
+    except BaseException:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+    return counter.count
+
+
+def append_encoding(file_path: str, encoding: str) -> str:
+    """既存ファイルに追記する際の文字コード（BOM を途中に書かないようにする）"""
+    name = codecs.lookup(encoding).name
+    if name == "utf-8-sig":
+        return "utf-8"
+    if name in ("utf-16", "utf-32") and os.path.getsize(file_path):
+        with open(file_path, "rb") as f:
+            bom = f.read(4)
+        little = bom.startswith((codecs.BOM_UTF32_LE, codecs.BOM_UTF16_LE))
+        return f"{name}-{'le' if little else 'be'}"
+    return encoding
+
+
+def ends_with_newline(file_path: str, encoding: str) -> bool:
+    """ファイルが空か、改行で終わっているか（encoding は append_encoding の結果）"""
+    size = os.path.getsize(file_path)
+    if not size:
+        return True
+    newline = "\n".encode(encoding)
+    with open(file_path, "rb") as f:
+        f.seek(max(size - len(newline), 0))
+        tail = f.read()
+    return tail in (newline, "\r".encode(encoding))
@@ -0,0 +1,156 @@
+"""
+フォルダ内の最新・最古ファイルの検索と、フォルダ一覧のキャッシュ
+
+数秒おきに同じフォルダを確認するワークフローのために、フォルダ内の一覧
+（名前・種別・日時）をプロセス内にキャッシュする。キャッシュは Linux では
+inotify のイベント、それ以外ではフォルダの更新日時で無効化する。
+"""
+
+import fnmatch
+import heapq
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional
+
+from .file_watch import DIRECTORY_CHANGE_MASK, InotifyWatcher, inotify_available
+
+# キャッシュするフォルダ数の上限（inotify のウォッチ数も同じだけ使う）
+MAX_CACHED_DIRECTORIES = 32
+
+# フォルダの更新日時は中のファイルの上書きでは変わらないため、inotify が
+# 使えない環境ではこの秒数を過ぎた一覧を読み直す
+FALLBACK_MAX_AGE = 10.0
+
+
+class ListingEntry(NamedTuple):
+    name: str
+    path: str
+    is_dir: bool
+    mtime: float
+    ctime: float
+
+
+def _created_time(st: os.stat_result) -> float:
+    # macOS 等は st_birthtime が作成日時。Windows の st_ctime は作成日時
+    return getattr(st, "st_birthtime", st.st_ctime)
+
+
+def scan_directory(folder_path: str) -> List[ListingEntry]:
+    """os.scandir 1回でフォルダ内の一覧を作る"""
+    entries = []
+    with os.scandir(folder_path) as it:
+        for entry in it:
+            try:
+                st = entry.stat()
+                is_dir = entry.is_dir()
+            except FileNotFoundError:
+                continue  # 走査中に削除された
+            entries.append(
+                ListingEntry(
+                    entry.name, entry.path, is_dir, st.st_mtime, _created_time(st)
+                )
+            )
+    return entries
+
+
+class _CachedListing:
+    def __init__(self, folder_path: str, watcher: Optional[InotifyWatcher]):
+        self.watcher = watcher
+        self.dir_mtime_ns = os.stat(folder_path).st_mtime_ns
+        self.loaded_at = time.monotonic()
+        self.entries = scan_directory(folder_path)
+
+    def is_valid(self, folder_path: str) -> bool:
+        if self.watcher:
+            return not self.watcher.has_events()
+        if time.monotonic() - self.loaded_at > FALLBACK_MAX_AGE:
+            return False
+        return os.stat(folder_path).st_mtime_ns == self.dir_mtime_ns
+
+    def close(self):
+        if self.watcher:
+            self.watcher.close()
+
+
+class DirectoryListingCache:
+    """フォルダ一覧のキャッシュ（フォルダ数が上限を超えたら古いものから捨てる）"""
+
+    def __init__(self, max_directories: int = MAX_CACHED_DIRECTORIES):
+        self.max_directories = max_directories
+        self.use_inotify = inotify_available()
+        self._listings: OrderedDict[str, _CachedListing] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, folder_path: str) -> List[ListingEntry]:
+        key = os.path.normcase(os.path.abspath(folder_path))
+        with self._lock:
+            cached = self._listings.get(key)
+            if cached and cached.is_valid(folder_path):
+                self._listings.move_to_end(key)
+                return cached.entries
+            if cached:
+                cached.close()
+                del self._listings[key]
+
+            # 監視を先に始めてから走査し、走査中の変更を取りこぼさない
+            watcher = None
+            if self.use_inotify:
+                try:
+                    watcher = InotifyWatcher(folder_path, DIRECTORY_CHANGE_MASK)
+                except OSError:
+                    watcher = None  # ウォッチ数の上限など
+            try:
+                cached = _CachedListing(folder_path, watcher)
+            except BaseException:
+                if watcher:
+                    watcher.close()
+                raise
+            self._listings[key] = cached
+            while len(self._listings) > self.max_directories:
+                _, oldest = self._listings.popitem(last=False)
+                oldest.close()
+            return cached.entries
+
+    def clear(self):
+        with self._lock:
+            for cached in self._listings.values():
+                cached.close()
+            self._listings.clear()
+
+
+# プロセス内で共有するキャッシュ
+directory_cache = DirectoryListingCache()
+
+
+def find_newest(
+    folder_path: str,
+    count: int = 1,
+    pattern: str = "*",
+    target: str = "file",
+    time_field: str = "mtime",
+    oldest: bool = False,
+    use_cache: bool = False,
+) -> List[ListingEntry]:
+    """日時が新しい順（oldest=True なら古い順）に count 件を返す
+
+    一覧全体を並べ替えず、ヒープで上位 count 件だけを取り出す。
+    target は "file" / "dir" / "both"、time_field は "mtime" / "ctime"。
+    """
+    entries = (
+        directory_cache.get(folder_path) if use_cache else scan_directory(folder_path)
+    )
+    include_hidden = pattern.startswith(".")
+    # fnmatch.fnmatch と同じ判定（Windows では大文字小文字を区別しない）を1回だけ変換して使う
+    matches = re.compile(fnmatch.translate(os.path.normcase(pattern))).match
+    candidates = (
+        entry
+        for entry in entries
+        if (target == "both" or entry.is_dir == (target == "dir"))
+        and (include_hidden or not entry.name.startswith("."))
+        and matches(os.path.normcase(entry.name))
+    )
+    select = heapq.nsmallest if oldest else heapq.nlargest
+    return select(count, candidates, key=lambda entry: getattr(entry, time_field))
@@ -0,0 +1,81 @@
+"""
+テキストファイルの文字コード判定
+
+ファイル先頭の一部だけを読んで判定するため、巨大なファイルでも一瞬で終わる。
+国内の取引先から届く Shift_JIS（CP932）・EUC-JP のファイルを想定している。
+"""
+
+import codecs
+from typing import Optional
+
+# 判定に使う先頭のバイト数
+DETECT_SAMPLE_SIZE = 64 * 1024
+
+# BOM と対応する文字コード（長いBOMを先に判定する）
+_BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+
+def _decodes(sample: bytes, encoding: str) -> Optional[str]:
+    """sample が encoding として読めればデコード結果を返す
+
+    サンプル末尾で文字が途切れていてもエラーにしない。
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    try:
+        return decoder.decode(sample, final=False)
+    except UnicodeDecodeError:
+        return None
+
+
+def _halfwidth_kana_ratio(text: str) -> float:
+    if not text:
+        return 0.0
+    kana = sum(1 for ch in text if "｡" <= ch <= "ﾟ")
+    return kana / len(text)
+
+
+def detect_encoding_bytes(sample: bytes) -> str:
+    """バイト列の文字コードを判定する
+
+    判定順: BOM → ASCII/UTF-8 → CP932 → EUC-JP。
+    EUC-JP のファイルは CP932 としてもエラーなく読めてしまうことが多く、
+    その場合は半角カナだらけになるため、半角カナの比率で見分ける。
+    """
+    for bom, encoding in _BOMS:
+        if sample.startswith(bom):
+            return encoding
+
+    if _decodes(sample, "utf-8") is not None:
+        return "utf-8"
+
+    as_cp932 = _decodes(sample, "cp932")
+    as_euc = _decodes(sample, "euc_jp")
+    if as_cp932 is not None:
+        if as_euc is not None and _halfwidth_kana_ratio(as_cp932) > 0.3:
+            return "euc_jp"
+        return "cp932"
+    if as_euc is not None:
+        return "euc_jp"
+
+    # どれにも当てはまらない場合は UTF-8 として読み、壊れた文字は置換させる
+    return "utf-8"
+
+
+def detect_encoding(file_path: str, sample_size: int = DETECT_SAMPLE_SIZE) -> str:
+    """ファイル先頭を読んで文字コードを判定する"""
+    with open(file_path, "rb") as f:
+        sample = f.read(sample_size)
+    return detect_encoding_bytes(sample)
+
+
+def resolve_encoding(file_path: str, encoding: Optional[str]) -> str:
+    """encoding が "auto"（または未指定）の場合は判定結果を返す"""
+    if not encoding or encoding == "auto":
+        return detect_encoding(file_path)
+    return encoding
@@ -1,68 +1,180 @@
 """
 J_Excel カテゴリの操作
+
+開いたブックは WorkbookPool に参照ID（reference_id）ごとに保持する。
+参照IDを省略した操作は、最後に使ったブックを対象にする。
 """
 
-from typing import Any, Dict
+import os
+from typing import Any, Dict, Optional, Tuple
 
 from .base import BaseOperation, OperationResult
-
-# Excel操作ライブラリをオプショナルでインポート
-try:
-    from openpyxl import Workbook, load_workbook
-
-    OPENPYXL_AVAILABLE = True
-except ImportError:
-    OPENPYXL_AVAILABLE = False
+from .column_calc import aggregate, evaluate, normalize_operation
+from .excel_range import (
+    RangeBounds,
+    append_rows,
+    chunked,
+    column_index_from_string,
+    ensure_dimensions,
+    find_last_column,
+    find_last_row,
+    get_column_letter,
+    iter_range_columns,
+    iter_range_values,
+    parse_range,
+    read_columns,
+    rows_from_data,
+    to_columns,
+    until_empty,
+    write_rows,
+)
+from .loop import LoopBodyRunner, PrefetchIterator
+from .workbook_pool import (
+    OPENPYXL_AVAILABLE,
+    WORKBOOK_POOL_KEY,
+    WorkbookPool,
+    WorkbookSession,
+)
+
+EXCEL_NOT_AVAILABLE = "Excel support not available. Install openpyxl."
+
+# 範囲読み込みの応答に含める最大行数（全行は storage_key の変数に入れる）
+RESULT_PREVIEW_ROWS = 1000
+
+# セル読み込みで、バッファに値がないことを表す
+_NOT_BUFFERED = object()
+
+
+def get_workbook_session(
+    operation: BaseOperation, reference_id: str = ""
+) -> Tuple[Optional[WorkbookSession], Optional[OperationResult]]:
+    """参照IDのブックを取得する（開いていなければエラーの結果を返す）"""
+    pool = operation.run_resource(WORKBOOK_POOL_KEY, WorkbookPool)
+    session = pool.get(reference_id) if pool else None
+    if session is None:
+        error = (
+            f"No Excel file is open for reference_id: {reference_id}"
+            if reference_id
+            else "No Excel file is open"
+        )
+        return None, OperationResult(status="failure", data={}, error=error)
+    return session, None
+
+
+def writable_error(session: WorkbookSession) -> Optional[OperationResult]:
+    """読み込み専用で開いたブックへの書き込みを拒否する"""
+    if session.read_only:
+        return OperationResult(
+            status="failure",
+            data={},
+            error=f"Workbook is open in read_only mode: {session.reference_id}",
+        )
+    return None
+
+
+def loop_result(
+    summary: Dict[str, Any], data: Dict[str, Any], describe
+) -> OperationResult:
+    """ループの集計結果を OperationResult にする（describe は反復番号 → 位置の説明）"""
+    if summary["stopped"]:
+        first = summary["errors"][0]
+        return OperationResult(
+            status="failure",
+            data=data,
+            error=f"Loop stopped at {describe(first['index'])}: {first['error']}",
+        )
+    if summary["failed"]:
+        return OperationResult(
+            status="warning",
+            data=data,
+            error=f"{summary['failed']} iterations failed and were skipped",
+        )
+    return OperationResult(status="success", data=data)
+
+
+def cell_access_error(session: WorkbookSession) -> Optional[OperationResult]:
+    """書き込み専用のブックはセル単位で読み書きできない"""
+    if session.write_only:
+        return OperationResult(
+            status="failure",
+            data={},
+            error="Cells cannot be accessed in write_only mode (use range write)",
+        )
+    return None
 
 
 class ExcelOpenOperation(BaseOperation):
-    """Excelファイルを開く"""
+    """Excelファイルを開く
+
+    read_only は読み込み専用のストリーミングモード、write_only は新規出力用の
+    書き込み専用モードで開く。どちらも巨大なブックでメモリを使い切らない。
+    save_interval（秒）を指定すると、その間隔より短い保存要求を1回にまとめる。
+    autosave_interval（秒）を指定すると、変更があればその間隔で自動保存する。
+    save_on_finish=True なら、実行終了時に保存していない変更をすべて保存する
+    （write_only のブックはそこで閉じる）。
+    """
 
     async def execute(self, params: Dict[str, Any]) -> OperationResult:
         file_path = params.get("file_path", "")
+        reference_id = params.get("reference_id", "")
         create_if_not_exists = params.get("create_if_not_exists", False)
+        read_only = params.get("read_only", False)
+        write_only = params.get("write_only", False)
+        data_only = params.get("data_only", False)
+        save_interval = float(params.get("save_interval") or 0)
+        autosave_interval = float(params.get("autosave_interval") or 0)
+        save_on_finish = params.get("save_on_finish", False)
 
         error = self.validate_params(params, ["file_path"])
         if error:
             return OperationResult(status="failure", data={}, error=error)
 
         if not OPENPYXL_AVAILABLE:
+            return OperationResult(status="failure", data={}, error=EXCEL_NOT_AVAILABLE)
+
+        if read_only and write_only:
             return OperationResult(
                 status="failure",
                 data={},
-                error="Excel support not available. Install openpyxl.",
+                error="read_only and write_only cannot be used together",
             )
 
         try:
-            import os
-
             file_path = os.path.expanduser(file_path)
-
-            if os.path.exists(file_path):
-                wb = load_workbook(file_path)
-                self.log(f"Opened Excel file: {file_path}")
-            elif create_if_not_exists:
-                wb = Workbook()
-                wb.save(file_path)
-                self.log(f"Created new Excel file: {file_path}")
-            else:
+            pool = self.run_resource(WORKBOOK_POOL_KEY, WorkbookPool)
+            if pool is None:
                 return OperationResult(
-                    status="failure", data={}, error=f"File does not exist: {file_path}"
+                    status="failure", data={}, error="Workbook sessions are not available"
                 )
 
-            # ワークブックをストレージに保存
-            if self.agent:
-                self.agent.workbook = wb
-                self.agent.workbook_path = file_path
+            mode = "read_only" if read_only else "write_only" if write_only else "edit"
+            existed = os.path.exists(file_path)
+            session = pool.open(
+                file_path,
+                reference_id=reference_id,
+                mode=mode,
+                create_if_not_exists=create_if_not_exists,
+                data_only=data_only,
+                save_interval=save_interval,
+                autosave_interval=autosave_interval,
+                save_on_finish=save_on_finish,
+            )
+            if existed or mode == "write_only":
+                self.log(f"Opened Excel file ({mode}): {file_path}")
+            else:
+                self.log(f"Created new Excel file: {file_path}")
 
             return OperationResult(
                 status="success",
                 data={
                     "file_path": file_path,
-                    "sheet_count": len(wb.sheetnames),
-                    "sheets": wb.sheetnames,
+                    "sheet_count": len(session.workbook.sheetnames),
+                    "sheets": session.workbook.sheetnames,
+                    **session.to_dict(),
                 },
             )
+        except FileNotFoundError as e:
+            return OperationResult(status="failure", data={}, error=str(e))
         except Exception as e:
             return OperationResult(
                 status="failure", data={}, error=f"Failed to open Excel file: {str(e)}"
@@ -73,6 +185,7 @@ class ExcelReadCellOperation(BaseOperation):
     """セルの値を読み取る"""
 
     async def execute(self, params: Dict[str, Any]) -> OperationResult:
+        reference_id = params.get("reference_id", "")
         sheet_name = params.get("sheet_name")
         cell = params.get("cell", "A1")
         storage_key = params.get("storage_key", "")
@@ -82,24 +195,27 @@ class ExcelReadCellOperation(BaseOperation):
             return OperationResult(status="failure", data={}, error=error)
 
         if not OPENPYXL_AVAILABLE:
-            return OperationResult(
-                status="failure",
-                data={},
-                error="Excel support not available. Install openpyxl.",
-            )
+            return OperationResult(status="failure", data={}, error=EXCEL_NOT_AVAILABLE)
 
         try:
             # ワークブックを取得
-            if not hasattr(self.agent, "workbook") or self.agent.workbook is None:
-                return OperationResult(
-                    status="failure", data={}, error="No Excel file is open"
-                )
+            session, error_result = get_workbook_session(self, reference_id)
+            if error_result:
+                return error_result
+            error_result = cell_access_error(session)
+            if error_result:
+                return error_result
 
-            wb = self.agent.workbook
-            ws = wb[sheet_name] if sheet_name else wb.active
+            # 他のセルのバッファは書き込まず、このセルのものだけを読む
+            ws = session.sheet(sheet_name, flush=False)
 
             # セルの値を読み取る
-            value = ws[cell].value
+            from openpyxl.utils import coordinate_to_tuple
+
+            row, col = coordinate_to_tuple(cell)
+            value = session.buffered_value(ws.title, row, col, _NOT_BUFFERED)
+            if value is _NOT_BUFFERED:
+                value = ws[cell].value
 
             if storage_key:
                 self.set_storage(storage_key, value)
@@ -115,9 +231,15 @@ class ExcelReadCellOperation(BaseOperation):
 
 
 class ExcelWriteCellOperation(BaseOperation):
-    """セルに値を書き込む"""
+    """セルに値を書き込む
+
+    値はブックのセッションのシートごとのバッファにためる。シートへは、
+    そのシートを読む操作・保存の前か、バッファが上限に達したときに
+    まとめて反映される。
+    """
 
     async def execute(self, params: Dict[str, Any]) -> OperationResult:
+        reference_id = params.get("reference_id", "")
         sheet_name = params.get("sheet_name")
         cell = params.get("cell", "A1")
         value = params.get("value", "")
@@ -127,24 +249,30 @@ class ExcelWriteCellOperation(BaseOperation):
             return OperationResult(status="failure", data={}, error=error)
 
         if not OPENPYXL_AVAILABLE:
-            return OperationResult(
-                status="failure",
-                data={},
-                error="Excel support not available. Install openpyxl.",
-            )
+            return OperationResult(status="failure", data={}, error=EXCEL_NOT_AVAILABLE)
 
         try:
             # ワークブックを取得
-            if not hasattr(self.agent, "workbook") or self.agent.workbook is None:
-                return OperationResult(
-                    status="failure", data={}, error="No Excel file is open"
-                )
+            session, error_result = get_workbook_session(self, reference_id)
+            if error_result:
+                return error_result
+            error_result = writable_error(session) or cell_access_error(session)
+            if error_result:
+                return error_result
+
+            ws = session.sheet(sheet_name, flush=False)
 
-            wb = self.agent.workbook
-            ws = wb[sheet_name] if sheet_name else wb.active
+            # セルに値を書き込む（シートへの反映はまとめて行う）
+            from openpyxl.cell.cell import MergedCell
+            from openpyxl.utils import coordinate_to_tuple
 
-            # セルに値を書き込む
-            ws[cell] = value
+            row, col = coordinate_to_tuple(cell)
+            if isinstance(ws._cells.get((row, col)), MergedCell):
+                raise ValueError(f"Cell {cell} is part of a merged range")
+            session.buffer_cell(ws, row, col, value)
+            session.record_write(
+                ws.title, row, col, row, col, filled=value is not None and value != ""
+            )
 
             self.log(f"Wrote to cell {cell}: {value}")
 
@@ -158,52 +286,89 @@ class ExcelWriteCellOperation(BaseOperation):
 
 
 class ExcelReadRangeOperation(BaseOperation):
-    """範囲の値を読み取る"""
+    """範囲の値を読み取る
+
+    range に "A2:F" のように終わりの行を省略して指定すると、データのある
+    最終行まで読む。loop_steps を指定した場合は、1行（chunk_size が2以上なら
+    chunk_size 行ずつ）ごとに row_storage_key に束縛して本体を実行するため、
+    全行をメモリに載せずに処理できる。
+    """
 
     async def execute(self, params: Dict[str, Any]) -> OperationResult:
+        reference_id = params.get("reference_id", "")
         sheet_name = params.get("sheet_name")
         start_cell = params.get("start_cell", "A1")
         end_cell = params.get("end_cell", "C10")
+        cell_range = params.get("range") or f"{start_cell}:{end_cell}"
         storage_key = params.get("storage_key", "")
+        layout = params.get("layout", "rows")
+        chunk_size = params.get("chunk_size", 1)
+        loop_steps = params.get("loop_steps", [])
+        row_storage_key = params.get("row_storage_key") or "current_row"
 
-        error = self.validate_params(params, ["start_cell", "end_cell"])
-        if error:
-            return OperationResult(status="failure", data={}, error=error)
+        if not params.get("range"):
+            error = self.validate_params(params, ["start_cell", "end_cell"])
+            if error:
+                return OperationResult(status="failure", data={}, error=error)
 
-        if not OPENPYXL_AVAILABLE:
+        if layout not in ("rows", "columns"):
             return OperationResult(
-                status="failure",
-                data={},
-                error="Excel support not available. Install openpyxl.",
+                status="failure", data={}, error=f"Invalid layout: {layout}"
             )
 
+        if not OPENPYXL_AVAILABLE:
+            return OperationResult(status="failure", data={}, error=EXCEL_NOT_AVAILABLE)
+
         try:
             # ワークブックを取得
-            if not hasattr(self.agent, "workbook") or self.agent.workbook is None:
-                return OperationResult(
-                    status="failure", data={}, error="No Excel file is open"
+            session, error_result = get_workbook_session(self, reference_id)
+            if error_result:
+                return error_result
+            error_result = cell_access_error(session)
+            if error_result:
+                return error_result
+
+            ws = session.sheet(sheet_name)
+            bounds = parse_range(cell_range)
+            rows = iter_range_values(ws, bounds)
+
+            if loop_steps:
+                return await self._run_loop(
+                    params, rows, bounds, cell_range, layout, chunk_size, row_storage_key
                 )
 
-            wb = self.agent.workbook
-            ws = wb[sheet_name] if sheet_name else wb.active
-
-            # 範囲の値を読み取る
-            data = []
-            for row in ws[f"{start_cell}:{end_cell}"]:
-                row_data = [cell.value for cell in row]
-                data.append(row_data)
+            # 範囲の値を読み取る（列ごとの形は行のリストを経由せずに作る）
+            if layout == "columns":
+                value = read_columns(ws, bounds)
+                row_count = max((len(values) for values in value.values()), default=0)
+                column_count = len(value)
+            else:
+                value = [list(row) for row in rows]
+                row_count = len(value)
+                column_count = max((len(row) for row in value), default=0)
 
             if storage_key:
-                self.set_storage(storage_key, data)
+                self.set_storage(storage_key, value)
                 self.log(f"Stored range data as '{storage_key}'")
 
+            # 大きな範囲は変数に入れ、応答には先頭だけを（layout の形のまま）載せる
+            truncated = row_count > RESULT_PREVIEW_ROWS
+            preview = value
+            if truncated and layout == "columns":
+                preview = {
+                    letter: values[:RESULT_PREVIEW_ROWS]
+                    for letter, values in value.items()
+                }
+            elif truncated:
+                preview = value[:RESULT_PREVIEW_ROWS]
             return OperationResult(
                 status="success",
                 data={
-                    "range": f"{start_cell}:{end_cell}",
-                    "data": data,
-                    "rows": len(data),
-                    "columns": len(data[0]) if data else 0,
+                    "range": cell_range,
+                    "data": preview,
+                    "truncated": truncated,
+                    "rows": row_count,
+                    "columns": column_count,
                     "sheet": ws.title,
                 },
             )
@@ -212,56 +377,541 @@ class ExcelReadRangeOperation(BaseOperation):
                 status="failure", data={}, error=f"Failed to read range: {str(e)}"
             )
 
+    async def _run_loop(
+        self, params, rows, bounds, cell_range, layout, chunk_size, row_storage_key
+    ) -> OperationResult:
+        """行（またはチャンク）ごとに loop_steps を実行する"""
+        runner = LoopBodyRunner(
+            self.agent,
+            params["loop_steps"],
+            iteration_error=params.get("iteration_error", "stop"),
+        )
+        error = runner.validate()
+        if error:
+            return OperationResult(status="failure", data={}, error=error)
+
+        chunk_size = max(1, int(chunk_size or 1))
+        if chunk_size == 1:
+            items = ({row_storage_key: list(row)} for row in rows)
+        else:
+            items = (
+                {
+                    row_storage_key: to_columns(chunk, bounds.min_col)
+                    if layout == "columns"
+                    else [list(row) for row in chunk]
+                }
+                for chunk in chunked(rows, chunk_size)
+            )
+        summary = await runner.run(items)
+
+        data = {"range": cell_range, "chunk_size": chunk_size, **summary}
+        return loop_result(
+            summary, data, lambda index: f"row {bounds.min_row + index * chunk_size}"
+        )
 
-class ExcelWriteRangeOperation(BaseOperation):
-    """範囲に値を書き込む"""
+
+class ExcelRowLoopOperation(BaseOperation):
+    """シートの行ごとに loop_steps を実行する
+
+    各反復で row_storage_key に行の値のリストを、column_storage_keys
+    （{列文字: 変数名}）で指定した列を個別の変数に束縛する。end_row を
+    省略すると最初の空行の手前まで（stop_at_empty_row=False ならデータの
+    ある最終行まで）繰り返す。read_only で開いたブックは、本体の実行中に
+    次の prefetch_rows 行を別スレッドで先読みする。
+    """
 
     async def execute(self, params: Dict[str, Any]) -> OperationResult:
+        reference_id = params.get("reference_id", "")
         sheet_name = params.get("sheet_name")
-        start_cell = params.get("start_cell", "A1")
-        data = params.get("data", [])
+        start_row = int(params.get("start_row") or 1)
+        end_row = params.get("end_row")
+        start_column = params.get("start_column") or "A"
+        end_column = params.get("end_column")
+        row_storage_key = params.get("row_storage_key") or "current_row"
+        row_number_storage_key = params.get("row_number_storage_key", "")
+        column_storage_keys = params.get("column_storage_keys") or {}
+        stop_at_empty_row = params.get("stop_at_empty_row", True)
+        prefetch_rows = params.get("prefetch_rows", 500)
+
+        error = self.validate_params(params, ["loop_steps"])
+        if error:
+            return OperationResult(status="failure", data={}, error=error)
+
+        if not OPENPYXL_AVAILABLE:
+            return OperationResult(status="failure", data={}, error=EXCEL_NOT_AVAILABLE)
+
+        runner = LoopBodyRunner(
+            self.agent,
+            params["loop_steps"],
+            iteration_error=params.get("iteration_error", "stop"),
+        )
+        error = runner.validate()
+        if error:
+            return OperationResult(status="failure", data={}, error=error)
+
+        try:
+            session, error_result = get_workbook_session(self, reference_id)
+            if error_result:
+                return error_result
+            error_result = cell_access_error(session)
+            if error_result:
+                return error_result
+
+            ws = session.sheet(sheet_name)
+            bounds = RangeBounds(
+                min_col=column_index_from_string(start_column),
+                min_row=start_row,
+                max_col=column_index_from_string(end_column) if end_column else None,
+                max_row=int(end_row) if end_row else None,
+            )
+            bindings = [
+                (column_index_from_string(column) - bounds.min_col, variable)
+                for column, variable in column_storage_keys.items()
+            ]
+
+            if stop_at_empty_row:
+                ensure_dimensions(ws)
+                rows = until_empty(
+                    ws.iter_rows(
+                        min_row=bounds.min_row,
+                        max_row=bounds.max_row,
+                        min_col=bounds.min_col,
+                        max_col=bounds.max_col or ws.max_column or None,
+                        values_only=True,
+                    )
+                )
+            else:
+                rows = iter_range_values(ws, bounds)
+
+            # edit モードの値はメモリ上にあるため先読みしない
+            prefetcher = None
+            if session.read_only and prefetch_rows:
+                prefetcher = rows = PrefetchIterator(rows, prefetch_rows)
+
+            def items():
+                for row_number, row in enumerate(rows, start=start_row):
+                    variables = {
+                        variable: row[index] if 0 <= index < len(row) else None
+                        for index, variable in bindings
+                    }
+                    variables[row_storage_key] = list(row)
+                    if row_number_storage_key:
+                        variables[row_number_storage_key] = row_number
+                    yield variables
+
+            try:
+                summary = await runner.run(items())
+            finally:
+                if prefetcher:
+                    prefetcher.close()
+
+            data = {"sheet": ws.title, "start_row": start_row, **summary}
+            return loop_result(summary, data, lambda index: f"row {start_row + index}")
+        except Exception as e:
+            return OperationResult(
+                status="failure",
+                data={},
+                error=f"Failed to process row loop: {str(e)}",
+            )
+
+
+class ExcelColumnLoopOperation(BaseOperation):
+    """シートの列ごとに loop_steps を実行する
 
-        error = self.validate_params(params, ["start_cell", "data"])
+    各反復で column_storage_key に列の値（start_row〜end_row）のリストを、
+    column_letter_storage_key に列文字を束縛する。end_column を省略すると
+    最初の空の列の手前まで（stop_at_empty_column=False ならデータのある
+    最終列まで）繰り返す。
+    """
+
+    async def execute(self, params: Dict[str, Any]) -> OperationResult:
+        reference_id = params.get("reference_id", "")
+        sheet_name = params.get("sheet_name")
+        start_column = params.get("start_column") or "A"
+        end_column = params.get("end_column")
+        start_row = int(params.get("start_row") or 1)
+        end_row = params.get("end_row")
+        column_storage_key = params.get("column_storage_key") or "current_column"
+        column_letter_storage_key = params.get("column_letter_storage_key", "")
+        stop_at_empty_column = params.get("stop_at_empty_column", True)
+
+        error = self.validate_params(params, ["loop_steps"])
         if error:
             return OperationResult(status="failure", data={}, error=error)
 
         if not OPENPYXL_AVAILABLE:
+            return OperationResult(status="failure", data={}, error=EXCEL_NOT_AVAILABLE)
+
+        runner = LoopBodyRunner(
+            self.agent,
+            params["loop_steps"],
+            iteration_error=params.get("iteration_error", "stop"),
+        )
+        error = runner.validate()
+        if error:
+            return OperationResult(status="failure", data={}, error=error)
+
+        try:
+            session, error_result = get_workbook_session(self, reference_id)
+            if error_result:
+                return error_result
+            error_result = cell_access_error(session)
+            if error_result:
+                return error_result
+
+            ws = session.sheet(sheet_name)
+            min_col = column_index_from_string(start_column)
+            bounds = RangeBounds(
+                min_col=min_col,
+                min_row=start_row,
+                max_col=column_index_from_string(end_column) if end_column else None,
+                max_row=int(end_row) if end_row else None,
+            )
+            columns = iter_range_columns(ws, bounds)
+            if stop_at_empty_column:
+                columns = until_empty(columns)
+
+            def items():
+                for column_index, values in enumerate(columns, start=min_col):
+                    variables = {column_storage_key: list(values)}
+                    if column_letter_storage_key:
+                        variables[column_letter_storage_key] = get_column_letter(
+                            column_index
+                        )
+                    yield variables
+
+            summary = await runner.run(items())
+
+            data = {"sheet": ws.title, "start_column": start_column, **summary}
+            return loop_result(
+                summary,
+                data,
+                lambda index: f"column {get_column_letter(min_col + index)}",
+            )
+        except Exception as e:
             return OperationResult(
                 status="failure",
                 data={},
-                error="Excel support not available. Install openpyxl.",
+                error=f"Failed to process column loop: {str(e)}",
+            )
+
+
+class ExcelColumnCalculationOperation(BaseOperation):
+    """列の集計、または列どうしの計算を行う
+
+    operation に sum・average・count・counta・min・max を指定すると range の
+    数値を集計して storage_key に入れる。operation="expression" の場合は
+    expression（例: "B * C * 1.1"、"round(x / 1000, 1)"。x は range の先頭列）を
+    行ごとに評価し、output_cell から下へまとめて書き込む。
+    """
+
+    async def execute(self, params: Dict[str, Any]) -> OperationResult:
+        reference_id = params.get("reference_id", "")
+        sheet_name = params.get("sheet_name")
+        cell_range = params.get("range", "A:A")
+        operation = normalize_operation(params.get("operation", "sum"))
+        expression = params.get("expression", "")
+        output_cell = params.get("output_cell", "")
+        storage_key = params.get("storage_key", "")
+
+        error = self.validate_params(params, ["range"])
+        if error:
+            return OperationResult(status="failure", data={}, error=error)
+        if operation == "expression" and not expression:
+            return OperationResult(
+                status="failure", data={}, error="Missing required parameter: expression"
             )
 
+        if not OPENPYXL_AVAILABLE:
+            return OperationResult(status="failure", data={}, error=EXCEL_NOT_AVAILABLE)
+
         try:
-            # ワークブックを取得
-            if not hasattr(self.agent, "workbook") or self.agent.workbook is None:
+            session, error_result = get_workbook_session(self, reference_id)
+            if error_result:
+                return error_result
+            error_result = cell_access_error(session)
+            if error_result:
+                return error_result
+            if operation == "expression" and output_cell:
+                error_result = writable_error(session)
+                if error_result:
+                    return error_result
+
+            ws = session.sheet(sheet_name)
+            bounds = parse_range(cell_range)
+            columns = read_columns(ws, bounds)
+
+            if operation != "expression":
+                values = [value for column in columns.values() for value in column]
+                result = aggregate(values, operation)
+                if storage_key:
+                    self.set_storage(storage_key, result)
+                self.log(f"Calculated {operation} of {cell_range}: {result}")
                 return OperationResult(
-                    status="failure", data={}, error="No Excel file is open"
+                    status="success",
+                    data={
+                        "range": cell_range,
+                        "operation": operation,
+                        "result": result,
+                        "sheet": ws.title,
+                    },
                 )
 
-            wb = self.agent.workbook
-            ws = wb[sheet_name] if sheet_name else wb.active
+            if columns:
+                columns["x"] = next(iter(columns.values()))
+            results = evaluate(expression, columns)
+
+            if output_cell:
+                from openpyxl.utils import coordinate_to_tuple
+
+                out_row, out_col = coordinate_to_tuple(output_cell)
+                _, _, filled = write_rows(
+                    ws, ([value] for value in results), out_row, out_col
+                )
+                session.mark_dirty()
+                session.record_write(
+                    ws.title,
+                    out_row,
+                    out_col,
+                    out_row + len(results) - 1,
+                    out_col,
+                    filled=filled,
+                )
+            if storage_key:
+                self.set_storage(storage_key, results)
+
+            self.log(f"Evaluated '{expression}' over {len(results)} rows of {cell_range}")
+
+            truncated = len(results) > RESULT_PREVIEW_ROWS
+            return OperationResult(
+                status="success",
+                data={
+                    "range": cell_range,
+                    "operation": operation,
+                    "expression": expression,
+                    "output_cell": output_cell,
+                    "rows": len(results),
+                    "result": results[:RESULT_PREVIEW_ROWS],
+                    "truncated": truncated,
+                    "sheet": ws.title,
+                },
+            )
+        except Exception as e:
+            return OperationResult(
+                status="failure",
+                data={},
+                error=f"Failed to calculate column: {str(e)}",
+            )
+
+
+class ExcelLastRowOperation(BaseOperation):
+    """値のある最終行を取得する
+
+    column を省略するとシート全体の最終行を返す。結果はセッションに
+    キャッシュし、このエージェントからの書き込みに合わせて更新するため、
+    「最終行の次に追記」を繰り返しても毎回シートを調べ直さない。
+    """
+
+    async def execute(self, params: Dict[str, Any]) -> OperationResult:
+        reference_id = params.get("reference_id", "")
+        sheet_name = params.get("sheet_name")
+        column = params.get("column", "A")
+        storage_key = params.get("storage_key", "")
+        trust_dimension = params.get("trust_dimension", True)
+
+        if not OPENPYXL_AVAILABLE:
+            return OperationResult(status="failure", data={}, error=EXCEL_NOT_AVAILABLE)
+
+        try:
+            session, error_result = get_workbook_session(self, reference_id)
+            if error_result:
+                return error_result
+            error_result = cell_access_error(session)
+            if error_result:
+                return error_result
+
+            ws = session.sheet(sheet_name)
+            column_index = column_index_from_string(column) if column else 0
+            key = (ws.title, "row", column_index)
+            cached = key in session.last_cells
+            if cached:
+                last_row = session.last_cells[key]
+            else:
+                # read_only のシートも XML の実際の範囲で求めるため、結果を覚えておける
+                last_row = find_last_row(ws, column_index, trust_dimension)
+                session.last_cells[key] = last_row
+
+            if storage_key:
+                self.set_storage(storage_key, last_row)
+                self.log(f"Stored last row as '{storage_key}': {last_row}")
+
+            return OperationResult(
+                status="success",
+                data={
+                    "column": column,
+                    "last_row": last_row,
+                    "next_row": last_row + 1,
+                    "cached": cached,
+                    "sheet": ws.title,
+                },
+            )
+        except Exception as e:
+            return OperationResult(
+                status="failure", data={}, error=f"Failed to get last row: {str(e)}"
+            )
+
+
+class ExcelLastColumnOperation(BaseOperation):
+    """値のある最終列を取得する（row を省略するとシート全体）"""
+
+    async def execute(self, params: Dict[str, Any]) -> OperationResult:
+        reference_id = params.get("reference_id", "")
+        sheet_name = params.get("sheet_name")
+        row = int(params.get("row") or 0)
+        storage_key = params.get("storage_key", "")
+        trust_dimension = params.get("trust_dimension", True)
+
+        if not OPENPYXL_AVAILABLE:
+            return OperationResult(status="failure", data={}, error=EXCEL_NOT_AVAILABLE)
+
+        try:
+            session, error_result = get_workbook_session(self, reference_id)
+            if error_result:
+                return error_result
+            error_result = cell_access_error(session)
+            if error_result:
+                return error_result
+
+            ws = session.sheet(sheet_name)
+            key = (ws.title, "column", row)
+            cached = key in session.last_cells
+            if cached:
+                last_column = session.last_cells[key]
+            else:
+                last_column = find_last_column(ws, row, trust_dimension)
+                session.last_cells[key] = last_column
+
+            if storage_key:
+                self.set_storage(storage_key, last_column)
+                self.log(f"Stored last column as '{storage_key}': {last_column}")
+
+            return OperationResult(
+                status="success",
+                data={
+                    "row": row,
+                    "last_column": last_column,
+                    "last_column_letter": get_column_letter(last_column),
+                    "next_column_letter": get_column_letter(last_column + 1),
+                    "cached": cached,
+                    "sheet": ws.title,
+                },
+            )
+        except Exception as e:
+            return OperationResult(
+                status="failure", data={}, error=f"Failed to get last column: {str(e)}"
+            )
+
+
+class ExcelWriteRangeOperation(BaseOperation):
+    """範囲に値を書き込む
+
+    data には行のリストか、列ごとのリストの辞書を渡す。data_key を指定すると
+    記憶した値（範囲読み込みの結果など）をそのまま書き込む。write_only の
+    ブックは行を一時ファイルへ追記し、それ以外はセルを一括で登録する。
+    """
+
+    async def execute(self, params: Dict[str, Any]) -> OperationResult:
+        reference_id = params.get("reference_id", "")
+        sheet_name = params.get("sheet_name")
+        start_cell = params.get("start_cell", "A1")
+        data = params.get("data")
+        data_key = params.get("data_key", "")
+        create_sheet = params.get("create_sheet", True)
+
+        error = self.validate_params(params, ["start_cell"])
+        if error:
+            return OperationResult(status="failure", data={}, error=error)
+        if data is None and not data_key:
+            return OperationResult(
+                status="failure", data={}, error="Missing required parameter: data"
+            )
+
+        if not OPENPYXL_AVAILABLE:
+            return OperationResult(status="failure", data={}, error=EXCEL_NOT_AVAILABLE)
+
+        try:
+            if data_key:
+                data = self.get_storage(data_key)
+                if data is None:
+                    return OperationResult(
+                        status="failure",
+                        data={},
+                        error=f"No data stored under key: {data_key}",
+                    )
+            rows = rows_from_data(data)
+
+            # ワークブックを取得
+            session, error_result = get_workbook_session(self, reference_id)
+            if error_result:
+                return error_result
+            error_result = writable_error(session)
+            if error_result:
+                return error_result
 
             # 開始セルの座標を取得
             from openpyxl.utils import coordinate_to_tuple
 
             start_row, start_col = coordinate_to_tuple(start_cell)
 
-            # データを書き込む
-            for row_idx, row_data in enumerate(data):
-                for col_idx, value in enumerate(row_data):
-                    ws.cell(
-                        row=start_row + row_idx, column=start_col + col_idx, value=value
+            wb = session.workbook
+            if sheet_name and sheet_name not in wb.sheetnames:
+                if not create_sheet:
+                    return OperationResult(
+                        status="failure",
+                        data={},
+                        error=f"Sheet does not exist: {sheet_name}",
+                    )
+                ws = wb.create_sheet(sheet_name)
+            else:
+                ws = session.sheet(sheet_name)
+
+            if session.write_only:
+                # 書き込み専用ブックは行の追記しかできない。開始行までは空行で
+                # 埋め、追記済みの行より上には書けない
+                next_row = session.appended_rows.get(ws.title, 0) + 1
+                if start_row < next_row:
+                    return OperationResult(
+                        status="failure",
+                        data={},
+                        error=(
+                            f"Cannot write above row {next_row} in write_only mode: "
+                            f"{start_cell}"
+                        ),
                     )
+                rows_written, width = append_rows(
+                    ws, rows, start_col, start_row - next_row
+                )
+                session.appended_rows[ws.title] = start_row + rows_written - 1
+            else:
+                rows_written, width, filled = write_rows(ws, rows, start_row, start_col)
+                session.record_write(
+                    ws.title,
+                    start_row,
+                    start_col,
+                    start_row + rows_written - 1,
+                    start_col + width - 1,
+                    filled=filled,
+                )
+            session.mark_dirty()
 
-            self.log(f"Wrote {len(data)} rows to range starting at {start_cell}")
+            self.log(f"Wrote {rows_written} rows to range starting at {start_cell}")
 
             return OperationResult(
                 status="success",
                 data={
                     "start_cell": start_cell,
-                    "rows_written": len(data),
-                    "columns_written": len(data[0]) if data else 0,
+                    "rows_written": rows_written,
+                    "columns_written": width,
                     "sheet": ws.title,
                 },
             )
@@ -272,44 +922,59 @@ class ExcelWriteRangeOperation(BaseOperation):
 
 
 class ExcelSaveOperation(BaseOperation):
-    """Excelファイルを保存"""
+    """Excelファイルを保存
+
+    変更がない場合は書き込まない。save_interval を指定して開いたブックは、
+    前回の保存から間がなければ保存を後回しにし、ファイルを読む操作の前か
+    実行終了時にまとめて書き出す（force=True ならすぐに保存する）。
+    write_only モードのブックは1回しか保存できないため、保存後に閉じる。
+    """
 
     async def execute(self, params: Dict[str, Any]) -> OperationResult:
+        reference_id = params.get("reference_id", "")
         file_path = params.get("file_path")
+        force = params.get("force", False)
 
         if not OPENPYXL_AVAILABLE:
-            return OperationResult(
-                status="failure",
-                data={},
-                error="Excel support not available. Install openpyxl.",
-            )
+            return OperationResult(status="failure", data={}, error=EXCEL_NOT_AVAILABLE)
 
         try:
             # ワークブックを取得
-            if not hasattr(self.agent, "workbook") or self.agent.workbook is None:
-                return OperationResult(
-                    status="failure", data={}, error="No Excel file is open"
-                )
-
-            wb = self.agent.workbook
+            session, error_result = get_workbook_session(self, reference_id)
+            if error_result:
+                return error_result
+            error_result = writable_error(session)
+            if error_result:
+                return error_result
 
             # 保存先を決定
             if file_path:
-                import os
-
                 file_path = os.path.expanduser(file_path)
-            elif hasattr(self.agent, "workbook_path"):
-                file_path = self.agent.workbook_path
             else:
-                return OperationResult(
-                    status="failure", data={}, error="No file path specified for saving"
-                )
+                file_path = session.file_path
 
-            # ファイルを保存
-            wb.save(file_path)
-            self.log(f"Saved Excel file: {file_path}")
+            # ファイルを保存（別名保存はすぐに書き込む）
+            if os.path.abspath(file_path) == os.path.abspath(session.file_path):
+                save_status = session.request_save(force=force)
+            else:
+                session.save(file_path)
+                save_status = "saved"
+            closed = session.write_only
+            if closed:
+                self.run_resource(WORKBOOK_POOL_KEY, WorkbookPool).close(
+                    session.reference_id
+                )
+            if save_status == "saved":
+                self.log(f"Saved Excel file: {file_path}")
+            elif save_status == "deferred":
+                self.log(f"Deferred saving Excel file: {file_path}")
+            else:
+                self.log(f"No changes to save: {file_path}")
 
-            return OperationResult(status="success", data={"file_path": file_path})
+            return OperationResult(
+                status="success",
+                data={"file_path": file_path, "closed": closed, "save": save_status},
+            )
         except Exception as e:
             return OperationResult(
                 status="failure", data={}, error=f"Failed to save Excel file: {str(e)}"
@@ -320,36 +985,69 @@ class ExcelCloseOperation(BaseOperation):
     """Excelファイルを閉じる"""
 
     async def execute(self, params: Dict[str, Any]) -> OperationResult:
-        save_before_close = params.get("save_before_close", True)
+        reference_id = params.get("reference_id", "")
+        save_before_close = params.get(
+            "save_before_close", params.get("save_changes", True)
+        )
 
         if not OPENPYXL_AVAILABLE:
-            return OperationResult(
-                status="failure",
-                data={},
-                error="Excel support not available. Install openpyxl.",
-            )
+            return OperationResult(status="failure", data={}, error=EXCEL_NOT_AVAILABLE)
 
         try:
             # ワークブックを取得
-            if not hasattr(self.agent, "workbook") or self.agent.workbook is None:
+            pool = self.run_resource(WORKBOOK_POOL_KEY, WorkbookPool)
+            session = pool.get(reference_id) if pool else None
+            if session is None:
                 return OperationResult(
                     status="warning", data={}, error="No Excel file is open"
                 )
 
-            # 保存が必要な場合
-            if save_before_close and hasattr(self.agent, "workbook_path"):
-                self.agent.workbook.save(self.agent.workbook_path)
-                self.log(f"Saved before closing: {self.agent.workbook_path}")
-
-            # ワークブックを閉じる
-            self.agent.workbook.close()
-            self.agent.workbook = None
-            self.agent.workbook_path = None
+            # 変更があれば保存してから閉じる（後回しにした保存は必ず書き出す）
+            saved = session.save_pending or (
+                save_before_close and session.dirty and not session.read_only
+            )
+            pool.close(session.reference_id, save=save_before_close)
+            if saved:
+                self.log(f"Saved before closing: {session.file_path}")
 
-            self.log("Closed Excel file")
+            self.log(f"Closed Excel file: {session.file_path}")
 
-            return OperationResult(status="success", data={"saved": save_before_close})
+            return OperationResult(
+                status="success",
+                data={"reference_id": session.reference_id, "saved": saved},
+            )
         except Exception as e:
             return OperationResult(
                 status="failure", data={}, error=f"Failed to close Excel file: {str(e)}"
             )
+
+
+class ExcelSessionsOperation(BaseOperation):
+    """開いているブックの一覧とメモリ使用量の目安を取得"""
+
+    async def execute(self, params: Dict[str, Any]) -> OperationResult:
+        storage_key = params.get("storage_key", "")
+
+        try:
+            pool = self.run_resource(WORKBOOK_POOL_KEY, WorkbookPool)
+            sessions = pool.sessions() if pool else []
+
+            if storage_key:
+                self.set_storage(storage_key, sessions)
+
+            return OperationResult(
+                status="success",
+                data={
+                    "sessions": sessions,
+                    "count": len(sessions),
+                    "estimated_memory_bytes": sum(
+                        session["estimated_memory_bytes"] for session in sessions
+                    ),
+                },
+            )
+        except Exception as e:
+            return OperationResult(
+                status="failure",
+                data={},
+                error=f"Failed to list Excel sessions: {str(e)}",
+            )
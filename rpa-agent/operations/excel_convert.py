@@ -0,0 +1,218 @@
+"""
+Excel と CSV の相互変換
+
+Excel → CSV は read_only で開いたシートから iter_rows(values_only=True) で
+1行ずつ取り出し、そのまま csv.writer に渡す。CSV → Excel は CsvReader から
+1行ずつ読み、write_only のブックへ追記する。どちらも値を変数に入れず、
+メモリに載るのは読んでいる行だけになる。
+
+関数はプロセスプールのワーカーからも呼べるよう、引数・戻り値を
+pickle できる値だけにしている。
+"""
+
+import csv
+import os
+import re
+from datetime import date, datetime, time
+from typing import Any, Callable, Dict, List, Optional
+
+from .csv_stream import QUOTING_MODES, CsvReader
+from .excel_range import RangeBounds, ensure_dimensions, iter_range_values
+from .tree_copy import PARTIAL_SUFFIX
+from .workbook_pool import OPENPYXL_AVAILABLE, _save_atomic
+
+if OPENPYXL_AVAILABLE:
+    from openpyxl import Workbook, load_workbook
+
+DEFAULT_DATE_FORMAT = "%Y-%m-%d"
+DEFAULT_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# 数値に変換する文字列（先頭が 0 の "00123" などはコードとみなして文字列のまま）
+_NUMBER_PATTERN = re.compile(r"^-?(0|[1-9]\d*)(\.\d+)?([eE][+-]?\d+)?$")
+
+# Excel が誤差なく保持できる整数の桁数
+_MAX_INTEGER_DIGITS = 15
+
+# シート名・ファイル名に使えない文字
+_INVALID_SHEET_CHARS = re.compile(r"[\[\]:*?/\\]")
+_INVALID_FILE_CHARS = re.compile(r'[\\/:*?"<>|]')
+
+# Excel のシート名の最大文字数
+_MAX_SHEET_NAME_LENGTH = 31
+
+
+def value_formatters(
+    date_format: str = DEFAULT_DATE_FORMAT,
+    datetime_format: str = DEFAULT_DATETIME_FORMAT,
+) -> Dict[type, Callable[[Any], Any]]:
+    """セルの型ごとの CSV への書き出し方（ここにない型はそのまま渡す）
+
+    Excel の日付は日時として読み込まれるため、時刻が 0:00 の日時は
+    date_format で書き出す。
+    """
+
+    def format_datetime(value: datetime) -> str:
+        if value.hour == value.minute == value.second == value.microsecond == 0:
+            return value.strftime(date_format)
+        return value.strftime(datetime_format)
+
+    return {
+        datetime: format_datetime,
+        date: lambda value: value.strftime(date_format),
+        time: lambda value: value.isoformat(),
+        bool: lambda value: "TRUE" if value else "FALSE",
+    }
+
+
+def sheet_to_csv(
+    file_path: str,
+    sheet_name: Optional[str],
+    output_path: str,
+    encoding: str = "utf-8",
+    delimiter: str = ",",
+    quoting: str = "minimal",
+    date_format: str = DEFAULT_DATE_FORMAT,
+    datetime_format: str = DEFAULT_DATETIME_FORMAT,
+) -> Dict[str, Any]:
+    """シート（省略時はアクティブシート）を CSV に書き出す
+
+    数式のセルは最後に計算された値を書き出す。末尾の空行（書式だけ設定された
+    行など）は含めない。書きかけのファイルを他システムが読まないよう、
+    一時ファイルに書いてから置き換える。
+    """
+    if quoting not in QUOTING_MODES:
+        raise ValueError(
+            f"Unknown quoting: {quoting} (expected one of {', '.join(QUOTING_MODES)})"
+        )
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        ws = workbook[sheet_name] if sheet_name else workbook.active
+        # dimension が実際より小さいブックでも全行を書き出す
+        ensure_dimensions(ws)
+        formatters = value_formatters(date_format, datetime_format)
+        get = formatters.get
+
+        directory = os.path.dirname(os.path.abspath(output_path))
+        os.makedirs(directory, exist_ok=True)
+        partial_path = output_path + PARTIAL_SUFFIX
+        row_count = 0
+        try:
+            with open(partial_path, "w", encoding=encoding, newline="") as f:
+                writer = csv.writer(
+                    f,
+                    delimiter=delimiter,
+                    quoting=QUOTING_MODES[quoting],
+                    lineterminator="\r\n",
+                )
+                for row in iter_range_values(ws, RangeBounds()):
+                    writer.writerow(
+                        [
+                            value
+                            if (format_value := get(type(value))) is None
+                            else format_value(value)
+                            for value in row
+                        ]
+                    )
+                    row_count += 1
+            os.replace(partial_path, output_path)
+        except BaseException:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            raise
+        return {"sheet": ws.title, "output_path": output_path, "rows": row_count}
+    finally:
+        workbook.close()
+
+
+def sheet_names(file_path: str) -> List[str]:
+    """ブックのシート名の一覧"""
+    workbook = load_workbook(file_path, read_only=True)
+    try:
+        return list(workbook.sheetnames)
+    finally:
+        workbook.close()
+
+
+def sheet_output_path(output_path: str, sheet_name: str) -> str:
+    """複数シートを書き出す場合の、シートごとの CSV のパス
+
+    output_path に "{sheet}" を含む場合はシート名で置き換え、含まない場合は
+    フォルダとみなして "<シート名>.csv" を置く。
+    """
+    safe_name = _INVALID_FILE_CHARS.sub("_", sheet_name)
+    if "{sheet}" in output_path:
+        return output_path.replace("{sheet}", safe_name)
+    return os.path.join(output_path, f"{safe_name}.csv")
+
+
+def csv_value_parser(
+    convert_numbers: bool = True, date_format: str = ""
+) -> Optional[Callable[[str], Any]]:
+    """CSV の文字列をセルの値に変換する関数（変換しない場合は None）"""
+    if not (convert_numbers or date_format):
+        return None
+    match_number = _NUMBER_PATTERN.match
+
+    def parse(text: str) -> Any:
+        if not text:
+            return None
+        if convert_numbers and match_number(text):
+            if text.lstrip("-").isdigit():
+                if len(text.lstrip("-")) <= _MAX_INTEGER_DIGITS:
+                    return int(text)
+                return text
+            return float(text)
+        if date_format:
+            try:
+                return datetime.strptime(text, date_format)
+            except ValueError:
+                pass
+        return text
+
+    return parse
+
+
+def sheet_title(name: str) -> str:
+    """Excel のシート名に使える形にする"""
+    title = _INVALID_SHEET_CHARS.sub("_", name).strip("'")
+    return title[:_MAX_SHEET_NAME_LENGTH] or "Sheet"
+
+
+def csv_to_workbook(
+    sources: List[Dict[str, str]],
+    output_path: str,
+    encoding: str = "auto",
+    delimiter: str = "auto",
+    convert_numbers: bool = True,
+    date_format: str = "",
+) -> List[Dict[str, Any]]:
+    """CSV ファイルを1つずつシートにして、新しいブックに書き出す
+
+    sources は {"file_path": CSVのパス, "sheet_name": シート名} のリスト。
+    write_only のブックに追記するため、書き終えた行は一時ファイルに
+    書き出され、メモリに残らない。
+    """
+    workbook = Workbook(write_only=True)
+    parse = csv_value_parser(convert_numbers, date_format)
+    results = []
+    for source in sources:
+        ws = workbook.create_sheet(sheet_title(source["sheet_name"]))
+        row_count = 0
+        with CsvReader(source["file_path"], encoding, delimiter, False) as reader:
+            for row in reader.rows():
+                ws.append([parse(value) for value in row] if parse else row)
+                row_count += 1
+        results.append(
+            {
+                "file_path": source["file_path"],
+                "sheet": ws.title,
+                "rows": row_count,
+                "encoding": reader.encoding,
+                "delimiter": reader.delimiter,
+            }
+        )
+
+    directory = os.path.dirname(os.path.abspath(output_path))
+    os.makedirs(directory, exist_ok=True)
+    _save_atomic(workbook, output_path)
+    return results
@@ -0,0 +1,497 @@
+"""
+Excel の範囲指定の解釈と、値のストリーミング読み込み・一括書き込み
+
+"A2:F" のように終わりの行を省略した範囲は、データのある最終行までを表す。
+値は iter_rows(values_only=True) で1行ずつ取り出し、Cell オブジェクトを
+作らない。read_only で開いたブックなら、メモリに載るのは読んでいる行だけになる。
+
+書き込みは ws.cell() を値ごとに呼ばず、シートのセル辞書へ直接登録する。
+座標の検証とセルの検索を1値ごとに繰り返さないため、大量の行を書き込むときに
+速い。空のセルに None を書く場合は Cell オブジェクトを作らない。
+"""
+
+import re
+import weakref
+from dataclasses import dataclass
+from itertools import islice, takewhile, zip_longest
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# "A1", "A2:F", "A:C", "2:10", "$A$1:$C$10" などを受け付ける
+_RANGE_PATTERN = re.compile(
+    r"^\$?([A-Za-z]{1,3})?\$?(\d+)?(?::\$?([A-Za-z]{1,3})?\$?(\d+)?)?$"
+)
+
+
+def column_index_from_string(letters: str) -> int:
+    """列文字を列番号に変換する（"A" → 1、"AA" → 27）"""
+    index = 0
+    for ch in letters.upper():
+        index = index * 26 + ord(ch) - ord("A") + 1
+    return index
+
+
+def get_column_letter(index: int) -> str:
+    """列番号を列文字に変換する（1 → "A"、27 → "AA"）"""
+    letters = ""
+    while index > 0:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord("A") + remainder) + letters
+    return letters
+
+
+@dataclass
+class RangeBounds:
+    """範囲の上下左右（None は「データのある最後まで」）"""
+
+    min_col: int = 1
+    min_row: int = 1
+    max_col: Optional[int] = None
+    max_row: Optional[int] = None
+
+    @property
+    def open_ended(self) -> bool:
+        return self.max_row is None
+
+
+def parse_range(range_string: str) -> RangeBounds:
+    """範囲の文字列を解釈する"""
+    text = (range_string or "").strip()
+    match = _RANGE_PATTERN.match(text)
+    if not text or not match:
+        raise ValueError(f"Invalid range: {range_string}")
+    start_col, start_row, end_col, end_row = match.groups()
+    if not (start_col or start_row):
+        raise ValueError(f"Invalid range: {range_string}")
+
+    bounds = RangeBounds(
+        min_col=column_index_from_string(start_col) if start_col else 1,
+        min_row=int(start_row) if start_row else 1,
+    )
+    if ":" not in text:
+        # "B5" は単一セル、"B" は列全体、"5" は行全体
+        bounds.max_col = bounds.min_col if start_col else None
+        bounds.max_row = bounds.min_row if start_row else None
+        return bounds
+    if end_col:
+        bounds.max_col = column_index_from_string(end_col)
+    elif not start_col:
+        bounds.max_col = None  # "2:10" のような行全体の指定
+    else:
+        bounds.max_col = bounds.min_col
+    bounds.max_row = int(end_row) if end_row else None
+    if bounds.max_row is not None and bounds.max_row < bounds.min_row:
+        raise ValueError(f"Invalid range (end row before start row): {range_string}")
+    if bounds.max_col is not None and bounds.max_col < bounds.min_col:
+        raise ValueError(
+            f"Invalid range (end column before start column): {range_string}"
+        )
+    return bounds
+
+
+# シート XML を展開するときの1回あたりの読み込み量
+_XML_CHUNK_SIZE = 1 << 20
+
+# 範囲の境界にあるセルを探すために残しておく XML の末尾の量
+_TAIL_BYTES = 1 << 20
+
+_ROW_TAG_PATTERN = re.compile(rb"<(?:\w+:)?row\b([^>]*)>")
+_ROW_NUMBER_PATTERN = re.compile(rb'\br="(\d+)"')
+_CELL_TAG_PATTERN = re.compile(rb"<(?:\w+:)?c\b")
+_CELL_COLUMN_PATTERN = re.compile(rb'<(?:\w+:)?c\b[^>]*?\br="([A-Z]+)\d+"')
+
+
+@dataclass
+class SheetExtent:
+    """シート XML に実際に書かれている範囲"""
+
+    max_row: int = 0
+    max_column: int = 0
+    # XML の末尾（find_last_row などが最終行・最終列の値を確かめるのに使う）
+    tail: bytes = b""
+
+
+# XML で範囲を確かめた read_only のシート
+_extents: weakref.WeakKeyDictionary[Any, Optional[SheetExtent]] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _scan_extent(ws) -> Optional[SheetExtent]:
+    """シート XML の行・セルの位置から範囲を求める
+
+    位置（r 属性）のない行やセルがある場合は None を返す。
+    """
+    extent = SheetExtent()
+    letters = set()
+    carry = b""
+    with ws._get_source() as source:
+        while True:
+            chunk = source.read(_XML_CHUNK_SIZE)
+            extent.tail = (extent.tail + chunk)[-_TAIL_BYTES:]
+            buffer = carry + chunk
+            # 途中で切れたタグは次の読み込みと合わせて調べる
+            cut = buffer.rfind(b"<") if chunk else len(buffer)
+            complete, carry = buffer[:cut], buffer[cut:]
+            for attributes in _ROW_TAG_PATTERN.findall(complete):
+                number = _ROW_NUMBER_PATTERN.search(attributes)
+                if not number:
+                    return None
+                extent.max_row = max(extent.max_row, int(number.group(1)))
+            columns = _CELL_COLUMN_PATTERN.findall(complete)
+            if len(columns) != len(_CELL_TAG_PATTERN.findall(complete)):
+                return None
+            letters.update(columns)
+            if not chunk:
+                break
+    if letters:
+        extent.max_column = max(
+            column_index_from_string(letter.decode()) for letter in letters
+        )
+    return extent
+
+
+def ensure_dimensions(ws):
+    """read_only のシートの範囲（dimension）を XML の実際の行・列に合わせる
+
+    dimension はブックを書いたアプリが記録した値で、実際より小さいこと（"A1" の
+    ままなど）がある。openpyxl の read_only のシートは dimension の行・列までしか
+    読まないため、最初に読むときに XML を1回走査して範囲を求め直す。
+    """
+    if not hasattr(ws, "_get_source") or ws in _extents:
+        return
+    extent = _scan_extent(ws)
+    _extents[ws] = extent
+    ws.reset_dimensions()
+    if extent is None:
+        ws.calculate_dimension(force=True)
+    else:
+        ws._max_row = max(extent.max_row, 1)
+        ws._max_column = max(extent.max_column, 1)
+
+
+def iter_range_values(ws, bounds: RangeBounds) -> Iterator[Tuple[Any, ...]]:
+    """範囲の値を1行ずつタプルで返す
+
+    終わりの行を省略した範囲では、末尾の空行（書式だけ設定された行など）は
+    返さない。途中の空行は、後ろにデータのある行が現れた時点でまとめて返す。
+    """
+    ensure_dimensions(ws)
+    max_col = bounds.max_col
+    if max_col is None:
+        max_col = ws.max_column or None
+    rows = ws.iter_rows(
+        min_row=bounds.min_row,
+        max_row=bounds.max_row,
+        min_col=bounds.min_col,
+        max_col=max_col,
+        values_only=True,
+    )
+    if not bounds.open_ended:
+        yield from rows
+        return
+
+    pending_empty = 0
+    width = (max_col - bounds.min_col + 1) if max_col else 0
+    for row in rows:
+        if all(value is None for value in row):
+            pending_empty += 1
+            continue
+        for _ in range(pending_empty):
+            yield (None,) * (width or len(row))
+        pending_empty = 0
+        yield row
+
+
+def read_columns(ws, bounds: RangeBounds) -> Dict[str, List[Any]]:
+    """範囲の値を列ごとのリスト（キーは列文字）で返す
+
+    通常モードのシートはセルの辞書から列ごとに直接取り出す（iter_rows と違い、
+    値のないセルに Cell オブジェクトを作らない）。終わりの行を省略した範囲では
+    末尾の空行を含めない。
+    """
+    cells = getattr(ws, "_cells", None)
+    if cells is None:
+        return to_columns(iter_range_values(ws, bounds), bounds.min_col)
+
+    max_col = bounds.max_col or ws.max_column
+    max_row = bounds.max_row or ws.max_row
+    get = cells.get
+    rows = range(bounds.min_row, max_row + 1)
+    columns = {}
+    for col in range(bounds.min_col, max_col + 1):
+        columns[get_column_letter(col)] = [
+            cell.value if (cell := get((row, col))) is not None else None
+            for row in rows
+        ]
+    if bounds.open_ended:
+        length = len(rows)
+        while length and all(values[length - 1] is None for values in columns.values()):
+            length -= 1
+        for values in columns.values():
+            del values[length:]
+    return columns
+
+
+def _has_value(cell) -> bool:
+    return cell is not None and cell.value is not None and cell.value != ""
+
+
+_CELL_PATTERN = re.compile(rb"<(?:\w+:)?c\b([^>]*?)(?:/>|>(.*?)</(?:\w+:)?c>)", re.S)
+_REF_PATTERN = re.compile(rb'\br="([A-Z]+)(\d+)"')
+_TYPE_PATTERN = re.compile(rb'\bt="(\w+)"')
+_VALUE_PATTERN = re.compile(rb"<(?:\w+:)?v>([^<]*)</(?:\w+:)?v>")
+_INLINE_PATTERN = re.compile(rb"<(?:\w+:)?t\b[^>]*>([^<]+)</(?:\w+:)?t>")
+
+
+def _cell_has_value(ws, attributes: bytes, body: Optional[bytes]) -> bool:
+    """XML のセル要素が空でない値を持つか"""
+    if not body:
+        return False
+    inline = _INLINE_PATTERN.search(body)
+    if inline:
+        return True
+    value = _VALUE_PATTERN.search(body)
+    if not value or not value.group(1):
+        return False
+    cell_type = _TYPE_PATTERN.search(attributes)
+    if cell_type and cell_type.group(1) == b"s":
+        try:
+            return ws.parent.shared_strings[int(value.group(1))] not in (None, "")
+        except (AttributeError, IndexError, ValueError):
+            return False
+    return True
+
+
+def _dimension_confirmed(
+    ws, row: Optional[int] = None, column: Optional[int] = None
+) -> bool:
+    """read_only のシートの dimension の境界に値のあるセルがあるか
+
+    row / column に一致するセルの中に、値を持つものが1つでもあれば True。
+    書式だけのセルしかない場合や、XML の末尾に見つからない場合は False。
+    ensure_dimensions を先に呼んでおくこと。
+    """
+    extent = _extents.get(ws)
+    if extent is None:
+        return False
+    for match in _CELL_PATTERN.finditer(extent.tail):
+        ref = _REF_PATTERN.search(match.group(1))
+        if not ref:
+            continue
+        if row is not None and int(ref.group(2)) != row:
+            continue
+        if (
+            column is not None
+            and column_index_from_string(ref.group(1).decode()) != column
+        ):
+            continue
+        if _cell_has_value(ws, match.group(1), match.group(2)):
+            return True
+    return False
+
+
+def find_last_row(ws, column: int = 0, trust_dimension: bool = True) -> int:
+    """値のある最終行を返す（column=0 はシート全体、値がなければ 0）
+
+    書式だけが設定された空の行は数えない。通常モードのシートはセルの辞書を
+    max_row から上へ調べ、read_only のシートは対象の列だけをストリーミングで
+    読む。read_only のシートの範囲は ensure_dimensions で XML の実際の最終行に
+    合わせる（XML の展開は1回必要）。trust_dimension=True の場合、その最終行に
+    値があることを XML の末尾で確かめられれば、セルを読み込まずにその行を
+    返す。確かめられなければ対象の列を読む。
+    """
+    cells = getattr(ws, "_cells", None)
+    if cells is None:
+        ensure_dimensions(ws)
+        if (
+            trust_dimension
+            and ws.max_row
+            and _dimension_confirmed(ws, row=ws.max_row, column=column or None)
+        ):
+            return ws.max_row
+        last = 0
+        rows = ws.iter_rows(
+            min_col=column or 1, max_col=column or None, values_only=True
+        )
+        for row_number, values in enumerate(rows, start=1):
+            if not is_empty(values):
+                last = row_number
+        return last
+
+    get = cells.get
+    columns = [column] if column else range(1, ws.max_column + 1)
+    for row in range(ws.max_row, 0, -1):
+        if any(_has_value(get((row, col))) for col in columns):
+            return row
+    return 0
+
+
+def find_last_column(ws, row: int = 0, trust_dimension: bool = True) -> int:
+    """値のある最終列の番号を返す（row=0 はシート全体、値がなければ 0）
+
+    trust_dimension の扱いは find_last_row と同じで、XML の実際の最終列に
+    値のあるセルが確かめられた場合だけセルの読み込みを省く。
+    """
+    cells = getattr(ws, "_cells", None)
+    if cells is None:
+        ensure_dimensions(ws)
+        if (
+            trust_dimension
+            and ws.max_column
+            and _dimension_confirmed(ws, row=row or None, column=ws.max_column)
+        ):
+            return ws.max_column
+        last = 0
+        rows = ws.iter_rows(min_row=row or 1, max_row=row or None, values_only=True)
+        for values in rows:
+            for col in range(len(values), last, -1):
+                if values[col - 1] is not None and values[col - 1] != "":
+                    last = col
+                    break
+        return last
+
+    get = cells.get
+    rows = [row] if row else range(1, ws.max_row + 1)
+    for col in range(ws.max_column, 0, -1):
+        if any(_has_value(get((r, col))) for r in rows):
+            return col
+    return 0
+
+
+def is_empty(values: Iterable[Any]) -> bool:
+    """すべての値が None か空文字か"""
+    return all(value is None or value == "" for value in values)
+
+
+def until_empty(rows: Iterable[Tuple[Any, ...]]) -> Iterator[Tuple[Any, ...]]:
+    """最初の空の行（列）の手前まで返す"""
+    return takewhile(lambda values: not is_empty(values), rows)
+
+
+def iter_range_columns(ws, bounds: RangeBounds) -> Iterator[Tuple[Any, ...]]:
+    """範囲の値を1列ずつタプルで返す
+
+    read_only のシートは列単位で読めないため、範囲を行ごとに読んでから
+    並べ替える（範囲全体がメモリに載る）。
+    """
+    ensure_dimensions(ws)
+    if hasattr(ws, "iter_cols"):
+        yield from ws.iter_cols(
+            min_col=bounds.min_col,
+            max_col=bounds.max_col or ws.max_column,
+            min_row=bounds.min_row,
+            max_row=bounds.max_row or ws.max_row,
+            values_only=True,
+        )
+        return
+    rows = list(iter_range_values(ws, bounds))
+    yield from zip_longest(*rows)
+
+
+def chunked(rows: Iterable, size: int) -> Iterator[List]:
+    """size 行ずつのリストに区切る"""
+    iterator = iter(rows)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def to_columns(rows: Iterable[Sequence[Any]], min_col: int = 1) -> Dict[str, List[Any]]:
+    """行の並びを列ごとのリスト（キーは列文字）に並べ替える
+
+    行を1回たどるだけで作るため、ストリーミングの行をそのまま渡せる。
+    """
+    columns: List[List[Any]] = []
+    for count, row in enumerate(rows):
+        for i, value in enumerate(row):
+            if i == len(columns):
+                columns.append([None] * count)
+            columns[i].append(value)
+        for values in columns[len(row) :]:
+            values.append(None)
+    return {get_column_letter(min_col + i): values for i, values in enumerate(columns)}
+
+
+def rows_from_data(data: Any) -> Iterable[Iterable[Any]]:
+    """書き込むデータを行の並びにそろえる
+
+    行のリストはそのまま、列ごとのリストの辞書（to_columns の形式）は
+    キーの順に列を並べた行に変換する。
+    """
+    if isinstance(data, dict):
+        return zip_longest(*data.values())
+    if isinstance(data, (str, bytes)) or not isinstance(data, Iterable):
+        raise ValueError("data must be a list of rows or a dict of columns")
+    return data
+
+
+def append_rows(
+    ws, rows: Iterable[Iterable[Any]], min_col: int = 1, blank_rows: int = 0
+) -> Tuple[int, int]:
+    """行の並びを末尾に追記し、(行数, 列数) を返す（write_only のシート用）
+
+    blank_rows を指定すると、先に空行をその数だけ追記して開始行をそろえる。
+    """
+    for _ in range(blank_rows):
+        ws.append([])
+    padding = [None] * (min_col - 1)
+    row_count = width = 0
+    for row_data in rows:
+        row_data = list(row_data)
+        ws.append(padding + row_data)
+        row_count += 1
+        width = max(width, len(row_data))
+    return row_count, width
+
+
+def write_rows(
+    ws, rows: Iterable[Iterable[Any]], min_row: int = 1, min_col: int = 1
+) -> Tuple[int, int, bool]:
+    """行の並びを (min_row, min_col) を左上として書き込み、(行数, 列数, 充填) を返す
+
+    充填は、書き込んだ範囲の全セルが空でない値になったか（行の長さがそろい、
+    None や空文字を含まない）を表す。既存のセルは値だけを置き換え、書式は残す。
+    """
+    from openpyxl.cell.cell import Cell
+
+    cells = ws._cells
+    # 既存データより下に書く場合は既存セルを探す必要がない
+    below_existing = not cells or min_row > ws.max_row
+    row_count = width = 0
+    filled = True
+    shortest = None
+    for row_idx, row_data in enumerate(rows, start=min_row):
+        col_idx = min_col - 1
+        for col_idx, value in enumerate(row_data, start=min_col):
+            if value is None or value == "":
+                filled = False
+            cell = None if below_existing else cells.get((row_idx, col_idx))
+            if cell is not None:
+                cell.value = value
+            elif value is not None:
+                ws._add_cell(Cell(ws, row=row_idx, column=col_idx, value=value))
+        row_count += 1
+        length = col_idx - min_col + 1
+        width = max(width, length)
+        shortest = length if shortest is None else min(shortest, length)
+    filled = filled and row_count > 0 and shortest == width
+    return row_count, width, filled
+
+
+def write_cells(ws, cells: Iterable[Tuple[Tuple[int, int], Any]]) -> int:
+    """((行, 列), 値) の並びを書き込み、書き込んだセル数を返す
+
+    write_rows と同じく既存のセルは値だけを置き換え、空のセルに None を書く
+    場合は Cell オブジェクトを作らない。
+    """
+    from openpyxl.cell.cell import Cell
+
+    existing = ws._cells
+    count = 0
+    for (row, col), value in cells:
+        cell = existing.get((row, col))
+        if cell is not None:
+            cell.value = value
+        elif value is not None:
+            ws._add_cell(Cell(ws, row=row, column=col, value=value))
+        count += 1
+    return count
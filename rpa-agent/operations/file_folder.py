@@ -2,14 +2,49 @@
 I_ファイル・フォルダ カテゴリの操作
 """
 
+import asyncio
+import codecs
+import fnmatch
 import glob
+import itertools
+import mmap
 import os
 import platform
 import shutil
 import subprocess
-from typing import Any, Dict
-
+import tarfile
+import zipfile
+from typing import Any, Dict, Iterator, List
+
+from .archive import (
+    ArchiveProgress,
+    archive_type,
+    create_tar,
+    create_zip,
+    extract_tar,
+    extract_zip,
+)
 from .base import BaseOperation, OperationResult
+from .encoding import resolve_encoding
+from .loop import LoopBodyRunner
+from .sync_index import DEFAULT_INDEX_PATH, sync_folder
+from .tree_copy import PARTIAL_SUFFIX, TreeCopier, TreeCopyStats, move_path
+from .write_cache import (
+    DEFAULT_FLUSH_THRESHOLD,
+    WRITE_CACHE_KEY,
+    WriteHandleCache,
+    flush_pending_writes,
+    release_pending_writes,
+    write_atomic,
+)
+
+# ストリーミング読み込み時の1回あたりのバイト数
+READ_CHUNK_SIZE = 1024 * 1024
+
+# 0x00-0x2F のバイトを 0x00 にする変換表（文字の区切りを探すため）
+# CP932/Shift_JIS・EUC-JP・GBK・Big5 などの2バイト目に 0x2F 以下は
+# 現れないため、これらのバイトの直後は必ず文字の区切りになる
+_BOUNDARY_BYTES = bytes(0 if b <= 0x2F else b for b in range(256))
 
 
 class RenameFileFolderOperation(BaseOperation):
@@ -28,6 +63,7 @@ class RenameFileFolderOperation(BaseOperation):
             # パスを展開
             target_path = os.path.expanduser(target_path)
             new_name = os.path.expanduser(new_name)
+            release_pending_writes(self.agent, target_path)
 
             # 対象が存在するか確認
             if not os.path.exists(target_path):
@@ -68,12 +104,22 @@ class RenameFileFolderOperation(BaseOperation):
 
 
 class CopyFileFolderOperation(BaseOperation):
-    """ファイル・フォルダのコピー"""
+    """ファイル・フォルダのコピー
+
+    フォルダは TreeCopier でスレッドプールを使って並列にコピーする。
+    resume を指定すると、サイズと更新日時が一致するコピー済みファイルを
+    飛ばして途中から再開できる。
+    """
 
     async def execute(self, params: Dict[str, Any]) -> OperationResult:
         source_path = params.get("source_path", "")
         destination_path = params.get("destination_path", "")
         overwrite = params.get("overwrite", False)
+        copy_permissions = params.get("copy_permissions", True)
+        threads = params.get("threads", 0)
+        storage_profile = params.get("storage_profile", "ssd")
+        progress_interval = params.get("progress_interval", 1000)
+        resume = params.get("resume", False)
 
         error = self.validate_params(params, ["source_path", "destination_path"])
         if error:
@@ -84,6 +130,8 @@ class CopyFileFolderOperation(BaseOperation):
             source_path = os.path.expanduser(source_path)
             destination_path = os.path.expanduser(destination_path)
 
+            flush_pending_writes(self.agent)
+
             # ソースが存在するか確認
             if not os.path.exists(source_path):
                 return OperationResult(
@@ -92,26 +140,50 @@ class CopyFileFolderOperation(BaseOperation):
                     error=f"Source does not exist: {source_path}",
                 )
 
-            # 上書き確認
-            if os.path.exists(destination_path) and not overwrite:
+            # 上書き確認（再開時は既存のコピー先に続きを書き込む）
+            if os.path.exists(destination_path) and not (overwrite or resume):
                 return OperationResult(
                     status="failure",
                     data={},
                     error=f"Destination already exists: {destination_path}",
                 )
 
+            copier = TreeCopier(
+                max_workers=threads,
+                storage_profile=storage_profile,
+                preserve_metadata=copy_permissions,
+                resume=resume,
+                progress_interval=progress_interval,
+                on_progress=self._progress_notifier(source_path),
+            )
+
             # コピー実行
             if os.path.isfile(source_path):
-                # ファイルのコピー
+                # ファイルのコピー（コピー先が既存のフォルダならその中へ）
+                if os.path.isdir(destination_path):
+                    destination_path = os.path.join(
+                        destination_path, os.path.basename(source_path)
+                    )
                 dest_dir = os.path.dirname(destination_path)
                 if dest_dir and not os.path.exists(dest_dir):
                     os.makedirs(dest_dir, exist_ok=True)
-                shutil.copy2(source_path, destination_path)
+                copied = copier.copy_file(source_path, destination_path)
+                stats = {"files_copied": 0 if copied is None else 1}
             else:
                 # フォルダのコピー
-                if os.path.exists(destination_path):
+                if os.path.exists(destination_path) and not resume:
                     shutil.rmtree(destination_path)
-                shutil.copytree(source_path, destination_path)
+                result = await asyncio.to_thread(
+                    copier.copy_tree, source_path, destination_path
+                )
+                stats = result.to_dict()
+                if result.errors:
+                    return OperationResult(
+                        status="failure",
+                        data={"source_path": source_path, **stats},
+                        error=f"{len(result.errors)} files failed to copy "
+                        "(run again with resume=True to retry them)",
+                    )
 
             self.log(f"Copied: {source_path} -> {destination_path}")
 
@@ -121,6 +193,7 @@ class CopyFileFolderOperation(BaseOperation):
                     "source_path": source_path,
                     "destination_path": destination_path,
                     "is_directory": os.path.isdir(destination_path),
+                    **stats,
                 },
             )
         except Exception as e:
@@ -128,6 +201,101 @@ class CopyFileFolderOperation(BaseOperation):
                 status="failure", data={}, error=f"Failed to copy: {str(e)}"
             )
 
+    def _progress_notifier(self, source_path: str):
+        def on_progress(stats: TreeCopyStats):
+            self.notify(
+                "task.progress",
+                {
+                    "operation": "copy",
+                    "source_path": source_path,
+                    "files_copied": stats.files_copied,
+                    "files_skipped": stats.files_skipped,
+                    "bytes_copied": stats.bytes_copied,
+                },
+            )
+
+        return on_progress
+
+
+class SyncFolderOperation(BaseOperation):
+    """ファイル・フォルダを同期
+
+    前回の同期結果をインデックスに保存しておき、コピー元の新規・変更ファイル
+    だけをコピーする。mirror_deletions を指定するとコピー元で削除された
+    ファイルをコピー先からも削除する。
+    """
+
+    async def execute(self, params: Dict[str, Any]) -> OperationResult:
+        source_path = params.get("source_path", "")
+        destination_path = params.get("destination_path", "")
+        pattern = params.get("pattern", "*")
+        mirror_deletions = params.get("mirror_deletions", False)
+        use_hash = params.get("use_hash", False)
+        verify_destination = params.get("verify_destination", False)
+        index_path = params.get("index_path", "")
+        threads = params.get("threads", 0)
+        storage_profile = params.get("storage_profile", "ssd")
+        storage_key = params.get("storage_key", "")
+
+        error = self.validate_params(params, ["source_path", "destination_path"])
+        if error:
+            return OperationResult(status="failure", data={}, error=error)
+
+        try:
+            # パスを展開
+            source_path = os.path.expanduser(source_path)
+            destination_path = os.path.expanduser(destination_path)
+
+            if not os.path.isdir(source_path):
+                return OperationResult(
+                    status="failure",
+                    data={},
+                    error=f"Source folder does not exist: {source_path}",
+                )
+
+            flush_pending_writes(self.agent)
+
+            result = await asyncio.to_thread(
+                sync_folder,
+                source_path,
+                destination_path,
+                os.path.expanduser(index_path or DEFAULT_INDEX_PATH),
+                pattern=pattern,
+                mirror_deletions=mirror_deletions,
+                use_hash=use_hash,
+                verify_destination=verify_destination,
+                max_workers=threads,
+                storage_profile=storage_profile,
+            )
+
+            changes = result.to_dict()
+            if storage_key:
+                self.set_storage(storage_key, changes)
+
+            self.log(
+                f"Synced: {source_path} -> {destination_path} "
+                f"(added {len(result.added)}, updated {len(result.updated)}, "
+                f"deleted {len(result.deleted)})"
+            )
+
+            data = {
+                "source_path": source_path,
+                "destination_path": destination_path,
+                **changes,
+            }
+            if result.errors:
+                return OperationResult(
+                    status="failure",
+                    data=data,
+                    error=f"{len(result.errors)} files failed to sync "
+                    "(they will be retried on the next run)",
+                )
+            return OperationResult(status="success", data=data)
+        except Exception as e:
+            return OperationResult(
+                status="failure", data={}, error=f"Failed to sync: {str(e)}"
+            )
+
 
 class DeleteFileFolderOperation(BaseOperation):
     """ファイル・フォルダの削除"""
@@ -150,6 +318,7 @@ class DeleteFileFolderOperation(BaseOperation):
         try:
             # パスを展開
             target_path = os.path.expanduser(target_path)
+            release_pending_writes(self.agent, target_path)
 
             # 対象が存在するか確認
             if not os.path.exists(target_path):
@@ -272,6 +441,7 @@ class GetFileInfoOperation(BaseOperation):
         try:
             # パスを展開
             file_path = os.path.expanduser(file_path)
+            flush_pending_writes(self.agent, file_path)
 
             # ファイルが存在するか確認
             if not os.path.exists(file_path):
@@ -309,12 +479,23 @@ class GetFileInfoOperation(BaseOperation):
 
 
 class ReadFileOperation(BaseOperation):
-    """ファイルの読み込み"""
+    """ファイルの読み込み
+
+    read_mode:
+        text: ファイル全体を文字列として読む
+        lines: start_line から line_count 行を読む（loop_steps を指定すると1行ずつ実行）
+        line_count: 行数だけを数える
+        chunk: offset バイト目から length バイトを読む
+        search: mmap で search を検索し、一致位置と該当行を返す
+    text 以外のモードはファイル全体をメモリに載せない。
+    encoding に "auto" を指定すると先頭の一部から文字コードを判定する。
+    """
 
     async def execute(self, params: Dict[str, Any]) -> OperationResult:
         file_path = params.get("file_path", "")
         encoding = params.get("encoding", "utf-8")
         storage_key = params.get("storage_key", "")
+        read_mode = params.get("read_mode", "text")
 
         error = self.validate_params(params, ["file_path"])
         if error:
@@ -323,36 +504,222 @@ class ReadFileOperation(BaseOperation):
         try:
             # パスを展開
             file_path = os.path.expanduser(file_path)
-
-            # ファイルを読み込み
-            with open(file_path, encoding=encoding) as f:
-                content = f.read()
+            flush_pending_writes(self.agent, file_path)
+            encoding = resolve_encoding(file_path, encoding)
+
+            if read_mode == "text":
+                # ファイルを読み込み
+                with open(file_path, encoding=encoding) as f:
+                    content = f.read()
+                data = {"content": content, "size": len(content)}
+                stored = content
+            elif read_mode == "lines":
+                if params.get("loop_steps"):
+                    return await self._loop_lines(file_path, encoding, params)
+                lines = self._read_lines(file_path, encoding, params)
+                data = {"lines": lines, "count": len(lines)}
+                stored = lines
+            elif read_mode == "line_count":
+                count = self._count_lines(file_path, encoding)
+                data = {"line_count": count}
+                stored = count
+            elif read_mode == "chunk":
+                content = self._read_chunk(file_path, encoding, params)
+                data = {"content": content, "size": len(content)}
+                stored = content
+            elif read_mode == "search":
+                matches = self._search(file_path, encoding, params)
+                data = {"matches": matches, "count": len(matches)}
+                stored = matches
+            else:
+                return OperationResult(
+                    status="failure", data={}, error=f"Unknown read_mode: {read_mode}"
+                )
 
             # ストレージに保存（指定された場合）
             if storage_key:
-                self.set_storage(storage_key, content)
+                self.set_storage(storage_key, stored)
                 self.log(f"Stored file content as '{storage_key}'")
 
-            self.log(f"Read file: {file_path} ({len(content)} characters)")
+            self.log(f"Read file: {file_path} (mode: {read_mode}, encoding: {encoding})")
 
             return OperationResult(
                 status="success",
-                data={"file_path": file_path, "content": content, "size": len(content)},
+                data={"file_path": file_path, "encoding": encoding, **data},
             )
         except Exception as e:
             return OperationResult(
                 status="failure", data={}, error=f"Failed to read file: {str(e)}"
             )
 
+    def _iter_lines(self, file_path: str, encoding: str, start_line: int):
+        """start_line 行目（1始まり）から1行ずつ返す"""
+        with open(file_path, encoding=encoding, errors="replace") as f:
+            for line in itertools.islice(f, max(start_line, 1) - 1, None):
+                yield line.rstrip("\r\n")
+
+    def _read_lines(self, file_path: str, encoding: str, params: Dict[str, Any]):
+        start_line = params.get("start_line", 1)
+        line_count = params.get("line_count")
+        lines = self._iter_lines(file_path, encoding, start_line)
+        if line_count is not None:
+            lines = itertools.islice(lines, line_count)
+        return list(lines)
+
+    async def _loop_lines(
+        self, file_path: str, encoding: str, params: Dict[str, Any]
+    ) -> OperationResult:
+        """1行ずつ loop_steps を実行する"""
+        start_line = params.get("start_line", 1)
+        line_storage_key = params.get("line_storage_key") or "current_line"
+        runner = LoopBodyRunner(
+            self.agent,
+            params["loop_steps"],
+            iteration_error=params.get("iteration_error", "stop"),
+            max_iterations=params.get("line_count"),
+        )
+        error = runner.validate()
+        if error:
+            return OperationResult(status="failure", data={}, error=error)
+
+        summary = await runner.run(
+            {line_storage_key: line}
+            for line in self._iter_lines(file_path, encoding, start_line)
+        )
+        data = {"file_path": file_path, "encoding": encoding, **summary}
+        if summary["stopped"]:
+            first = summary["errors"][0]
+            return OperationResult(
+                status="failure",
+                data=data,
+                error=f"Loop stopped at line {start_line + first['index']}: "
+                f"{first['error']}",
+            )
+        if summary["failed"]:
+            return OperationResult(
+                status="warning",
+                data=data,
+                error=f"{summary['failed']} lines failed and were skipped",
+            )
+        return OperationResult(status="success", data=data)
+
+    def _count_lines(self, file_path: str, encoding: str) -> int:
+        """改行を数える（UTF-8/CP932などはバイト単位で高速に数える）"""
+        if codecs.lookup(encoding).name.startswith(("utf-16", "utf-32")):
+            with open(file_path, encoding=encoding) as f:
+                return sum(1 for _ in f)
+
+        count = 0
+        last = b""
+        with open(file_path, "rb") as f:
+            while chunk := f.read(READ_CHUNK_SIZE):
+                count += chunk.count(b"\n")
+                last = chunk
+        # 最終行が改行で終わっていない場合も1行と数える
+        if last and not last.endswith(b"\n"):
+            count += 1
+        return count
+
+    def _read_chunk(self, file_path: str, encoding: str, params: Dict[str, Any]):
+        offset = params.get("offset", 0)
+        length = params.get("length", READ_CHUNK_SIZE)
+        with open(file_path, "rb") as f:
+            f.seek(offset)
+            data = f.read(length)
+        # 範囲の端で多バイト文字が切れた場合は置換文字になる
+        return data.decode(encoding, errors="replace")
+
+    def _search(self, file_path: str, encoding: str, params: Dict[str, Any]):
+        """mmap で検索し、一致したバイト位置と該当行を返す"""
+        search = params.get("search", "")
+        max_matches = params.get("max_matches", 100)
+        if not search or os.path.getsize(file_path) == 0:
+            return []
+
+        codec_name = codecs.lookup(encoding).name
+        if codec_name.startswith(("utf-16", "utf-32")):
+            raise ValueError("search mode does not support UTF-16/UTF-32 files")
+        needle = search.encode(codec_name.replace("-sig", ""))
+        # UTF-8 以外の多バイト文字コードでは、文字の2バイト目から始まる
+        # 一致（CP932 の「ア」0x83 0x41 の中の "A" など）を除く
+        check_boundary = not codec_name.startswith("utf-8")
+        matches = []
+        with open(file_path, "rb") as f, mmap.mmap(
+            f.fileno(), 0, access=mmap.ACCESS_READ
+        ) as mm:
+            position = mm.find(needle)
+            while position != -1 and len(matches) < max_matches:
+                line_start = mm.rfind(b"\n", 0, position) + 1
+                if check_boundary and not self._on_boundary(
+                    mm, line_start, position, needle, encoding
+                ):
+                    position = mm.find(needle, position + 1)
+                    continue
+                line_end = mm.find(b"\n", position)
+                if line_end == -1:
+                    line_end = len(mm)
+                matches.append(
+                    {
+                        "offset": position,
+                        "line": mm[line_start:line_end]
+                        .decode(encoding, errors="replace")
+                        .rstrip("\r"),
+                    }
+                )
+                position = mm.find(needle, position + len(needle))
+        return matches
+
+    @staticmethod
+    def _on_boundary(mm, line_start: int, position: int, needle: bytes, encoding: str):
+        """position が文字の区切りにあり、needle がそのまま文字として読めるか"""
+        # 確実な区切り（行頭か 0x2F 以下のバイトの直後）から position までを読む
+        start = line_start
+        end = position
+        while end > line_start:
+            begin = max(line_start, end - READ_CHUNK_SIZE)
+            last = mm[begin:end].translate(_BOUNDARY_BYTES).rfind(b"\0")
+            if last != -1:
+                start = begin + last + 1
+                break
+            end = begin
+        prefix = mm[start:position].decode(encoding, errors="replace")
+        text = mm[start : position + len(needle)].decode(encoding, errors="replace")
+        return text == prefix + needle.decode(encoding, errors="replace")
+
 
 class WriteFileOperation(BaseOperation):
-    """ファイルの書き込み"""
+    """ファイルの書き込み
+
+    write_mode:
+        overwrite: 上書き
+        append: 追記（実行中はハンドルを開いたままにし、まとめて書き出す）
+        atomic: 一時ファイルに書いて fsync してからリネーム
+        flush: file_path の追記バッファを書き出す（file_path 省略時はすべて）
+    追記バッファは flush_threshold 文字を超えたとき、flush 指定時、
+    ワークフロー実行の終了時に書き出される。
+    """
 
     async def execute(self, params: Dict[str, Any]) -> OperationResult:
         file_path = params.get("file_path", "")
         content = params.get("content", "")
         encoding = params.get("encoding", "utf-8")
-        append = params.get("append", False)
+        write_mode = params.get("write_mode", "overwrite")
+        if params.get("append", False):
+            write_mode = "append"
+        create_directory = params.get("create_directory", True)
+        flush_threshold = params.get("flush_threshold", DEFAULT_FLUSH_THRESHOLD)
+
+        cache = self.run_resource(
+            WRITE_CACHE_KEY, lambda: WriteHandleCache(flush_threshold=flush_threshold)
+        )
+
+        if write_mode == "flush":
+            if cache:
+                cache.flush(os.path.expanduser(file_path) if file_path else None)
+            self.log(f"Flushed pending writes: {file_path or 'all files'}")
+            return OperationResult(
+                status="success", data={"file_path": file_path, "write_mode": write_mode}
+            )
 
         error = self.validate_params(params, ["file_path", "content"])
         if error:
@@ -364,19 +731,42 @@ class WriteFileOperation(BaseOperation):
 
             # ディレクトリが存在しない場合は作成
             dir_path = os.path.dirname(file_path)
-            if dir_path and not os.path.exists(dir_path):
+            if create_directory and dir_path and not os.path.exists(dir_path):
                 os.makedirs(dir_path, exist_ok=True)
 
             # ファイルに書き込み
-            mode = "a" if append else "w"
-            with open(file_path, mode, encoding=encoding) as f:
-                f.write(content)
+            if write_mode == "append" and cache:
+                cache.append(file_path, content, encoding, flush_threshold)
+            elif write_mode in ("overwrite", "append", "atomic"):
+                # 追記バッファが残っていると順序が入れ替わるため先に書き出す
+                if cache:
+                    cache.release(file_path)
+                if write_mode == "atomic":
+                    write_atomic(file_path, content, encoding)
+                else:
+                    mode = "a" if write_mode == "append" else "w"
+                    with open(file_path, mode, encoding=encoding) as f:
+                        f.write(content)
+            else:
+                return OperationResult(
+                    status="failure",
+                    data={},
+                    error=f"Unknown write_mode: {write_mode}",
+                )
 
-            self.log(f"{'Appended to' if append else 'Wrote'} file: {file_path}")
+            self.log(
+                f"{'Appended to' if write_mode == 'append' else 'Wrote'} file: {file_path}",
+                "debug" if write_mode == "append" else "info",
+            )
 
             return OperationResult(
                 status="success",
-                data={"file_path": file_path, "size": len(content), "append": append},
+                data={
+                    "file_path": file_path,
+                    "size": len(content),
+                    "append": write_mode == "append",
+                    "write_mode": write_mode,
+                },
             )
         except Exception as e:
             return OperationResult(
@@ -458,6 +848,7 @@ class MoveFileOperation(BaseOperation):
             # パスを展開
             source_path = os.path.expanduser(source_path)
             destination_path = os.path.expanduser(destination_path)
+            release_pending_writes(self.agent, source_path, destination_path)
 
             # ソースが存在するか確認
             if not os.path.exists(source_path):
@@ -481,8 +872,14 @@ class MoveFileOperation(BaseOperation):
                 if dest_dir and not os.path.exists(dest_dir):
                     os.makedirs(dest_dir, exist_ok=True)
 
-            # 移動実行
-            shutil.move(source_path, destination_path)
+            # 移動実行（別ドライブへの移動のみ並列コピー＋削除になる）
+            copier = TreeCopier(
+                max_workers=params.get("threads", 0),
+                storage_profile=params.get("storage_profile", "ssd"),
+            )
+            destination_path = await asyncio.to_thread(
+                move_path, source_path, destination_path, copier
+            )
             self.log(f"Moved: {source_path} -> {destination_path}")
 
             return OperationResult(
@@ -549,8 +946,266 @@ class OpenFolderOperation(BaseOperation):
             )
 
 
+class CompressFileFolderOperation(BaseOperation):
+    """ファイル・フォルダを圧縮
+
+    ファイルを1件ずつ読みながら書き出すため、一時フォルダへのコピーは行わない。
+    圧縮はプロセスプールで並列に行い、CPU コア数に応じて速くなる。
+    """
+
+    async def execute(self, params: Dict[str, Any]) -> OperationResult:
+        source_paths = params.get("source_paths", [])
+        archive_path = params.get("archive_path", "")
+        compression_type = params.get("compression_type")
+        compression_level = params.get("compression_level", 6)
+        password = params.get("password", "")
+        workers = params.get("workers", 0)
+        progress_interval = params.get("progress_interval", 100)
+
+        error = self.validate_params(params, ["source_paths", "archive_path"])
+        if error:
+            return OperationResult(status="failure", data={}, error=error)
+
+        if password:
+            return OperationResult(
+                status="failure",
+                data={},
+                error="Password-protected compression is not supported",
+            )
+
+        try:
+            if isinstance(source_paths, str):
+                source_paths = [source_paths]
+            source_paths = [os.path.expanduser(path) for path in source_paths]
+            archive_path = os.path.expanduser(archive_path)
+
+            for path in source_paths:
+                if not os.path.exists(path):
+                    return OperationResult(
+                        status="failure",
+                        data={},
+                        error=f"Source does not exist: {path}",
+                    )
+
+            kind = archive_type(archive_path, compression_type)
+            if kind not in ("zip", "tar.gz", "tar"):
+                return OperationResult(
+                    status="failure",
+                    data={},
+                    error=f"Unsupported compression type: {compression_type}",
+                )
+
+            flush_pending_writes(self.agent)
+
+            archive_dir = os.path.dirname(archive_path)
+            if archive_dir:
+                os.makedirs(archive_dir, exist_ok=True)
+
+            # 書きかけのアーカイブを他のシステムが拾わないよう、別名で作ってから置き換える
+            partial_path = archive_path + PARTIAL_SUFFIX
+            progress = ArchiveProgress(
+                progress_interval, self._progress_notifier(archive_path)
+            )
+            try:
+                if kind == "zip":
+                    entries = await asyncio.to_thread(
+                        create_zip,
+                        source_paths,
+                        partial_path,
+                        compression_level,
+                        workers or None,
+                        progress,
+                        [archive_path],
+                    )
+                else:
+                    entries = await asyncio.to_thread(
+                        create_tar,
+                        source_paths,
+                        partial_path,
+                        kind == "tar.gz",
+                        compression_level,
+                        workers or None,
+                        progress,
+                        [archive_path],
+                    )
+                os.replace(partial_path, archive_path)
+            finally:
+                if os.path.exists(partial_path):
+                    os.remove(partial_path)
+
+            self.log(f"Compressed: {len(source_paths)} sources -> {archive_path}")
+
+            return OperationResult(
+                status="success",
+                data={
+                    "archive_path": archive_path,
+                    "compression_type": kind,
+                    "entries": entries,
+                    "original_size": progress.bytes,
+                    "archive_size": os.path.getsize(archive_path),
+                },
+            )
+        except Exception as e:
+            return OperationResult(
+                status="failure", data={}, error=f"Failed to compress: {str(e)}"
+            )
+
+    def _progress_notifier(self, archive_path: str):
+        def on_progress(entries: int, size: int):
+            self.notify(
+                "task.progress",
+                {
+                    "operation": "compress",
+                    "archive_path": archive_path,
+                    "entries": entries,
+                    "bytes_processed": size,
+                },
+            )
+
+        return on_progress
+
+
+class ExtractFileFolderOperation(BaseOperation):
+    """ファイル・フォルダに解凍
+
+    メンバーを1件ずつストリームで書き出すため、巨大なアーカイブでもメモリを
+    使い切らない。展開先の外に書き込もうとするメンバーがあれば中断する。
+    """
+
+    async def execute(self, params: Dict[str, Any]) -> OperationResult:
+        archive_path = params.get("archive_path", "")
+        destination_path = params.get("destination_path", "")
+        password = params.get("password", "")
+        create_folder = params.get("create_folder", True)
+        overwrite = params.get("overwrite", False)
+        progress_interval = params.get("progress_interval", 100)
+
+        error = self.validate_params(params, ["archive_path", "destination_path"])
+        if error:
+            return OperationResult(status="failure", data={}, error=error)
+
+        try:
+            archive_path = os.path.expanduser(archive_path)
+            destination_path = os.path.expanduser(destination_path)
+
+            if not os.path.isfile(archive_path):
+                return OperationResult(
+                    status="failure",
+                    data={},
+                    error=f"Archive does not exist: {archive_path}",
+                )
+
+            kind = archive_type(archive_path)
+            if kind == "zip" and not zipfile.is_zipfile(archive_path):
+                kind = "tar.gz" if tarfile.is_tarfile(archive_path) else kind
+
+            # アーカイブ名のフォルダを作ってその中に展開する
+            if create_folder:
+                name = os.path.basename(archive_path)
+                for suffix in (".tar.gz", ".tgz", ".tar", ".zip"):
+                    if name.lower().endswith(suffix):
+                        name = name[: -len(suffix)]
+                        break
+                destination_path = os.path.join(destination_path, name)
+            os.makedirs(destination_path, exist_ok=True)
+
+            progress = ArchiveProgress(
+                progress_interval, self._progress_notifier(archive_path)
+            )
+            if kind == "zip":
+                files = await asyncio.to_thread(
+                    extract_zip,
+                    archive_path,
+                    destination_path,
+                    password,
+                    overwrite,
+                    progress,
+                )
+            else:
+                files = await asyncio.to_thread(
+                    extract_tar, archive_path, destination_path, overwrite, progress
+                )
+
+            self.log(f"Extracted: {archive_path} -> {destination_path}")
+
+            return OperationResult(
+                status="success",
+                data={
+                    "archive_path": archive_path,
+                    "destination_path": destination_path,
+                    "files_extracted": files,
+                    "extracted_size": progress.bytes,
+                },
+            )
+        except Exception as e:
+            return OperationResult(
+                status="failure", data={}, error=f"Failed to extract: {str(e)}"
+            )
+
+    def _progress_notifier(self, archive_path: str):
+        def on_progress(entries: int, size: int):
+            self.notify(
+                "task.progress",
+                {
+                    "operation": "extract",
+                    "archive_path": archive_path,
+                    "entries": entries,
+                    "bytes_processed": size,
+                },
+            )
+
+        return on_progress
+
+
+def iter_folder_files(
+    folder_path: str, pattern: str = "*", recursive: bool = False
+) -> Iterator[os.DirEntry]:
+    """フォルダ内のファイルを os.scandir で逐次列挙する
+
+    glob と同じく、パターンが "." で始まらない限り隠しファイル・隠しフォルダは
+    対象外とする。一覧を作らずに1件ずつ返すため、大量のファイルがあっても
+    最初のファイルからすぐに処理を始められる。
+    """
+    include_hidden = pattern.startswith(".")
+    stack = [folder_path]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    if entry.name.startswith(".") and not include_hidden:
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive:
+                            stack.append(entry.path)
+                        continue
+                    if entry.is_file() and fnmatch.fnmatch(entry.name, pattern):
+                        yield entry
+        except (PermissionError, FileNotFoundError):
+            # 列挙中に消えた・読めないフォルダは飛ばす
+            continue
+
+
+def folder_entry_info(entry: os.DirEntry) -> Dict[str, Any]:
+    """DirEntry からファイル情報の辞書を作る"""
+    return {
+        "path": entry.path,
+        "name": entry.name,
+        "directory": os.path.dirname(entry.path),
+        "size": entry.stat().st_size,
+        "extension": os.path.splitext(entry.name)[1],
+    }
+
+
 class FolderLoopOperation(BaseOperation):
-    """フォルダ内のファイルをループ処理"""
+    """フォルダ内のファイルをループ処理
+
+    loop_steps が指定された場合は、ファイルごとに file_storage_key /
+    path_storage_key へ名前とパスを束縛して loop_steps を実行する。
+    loop_steps のパラメータでは "{{current_path}}" のように変数を参照できる。
+    loop_steps が空の場合は従来どおりファイル一覧を返し、最初のファイルを
+    ストレージに設定する。
+    """
 
     async def execute(self, params: Dict[str, Any]) -> OperationResult:
         folder_path = params.get("folder_path", "")
@@ -558,6 +1213,9 @@ class FolderLoopOperation(BaseOperation):
         include_subfolders = params.get("include_subfolders", False)
         file_storage_key = params.get("file_storage_key", "current_file")
         path_storage_key = params.get("path_storage_key", "current_path")
+        loop_steps = params.get("loop_steps", [])
+        concurrency = params.get("concurrency", 1)
+        iteration_error = params.get("iteration_error", "stop")
 
         error = self.validate_params(params, ["folder_path"])
         if error:
@@ -575,30 +1233,26 @@ class FolderLoopOperation(BaseOperation):
                     error=f"Folder does not exist: {folder_path}",
                 )
 
-            # ファイルリストを取得
-            if include_subfolders:
-                search_pattern = os.path.join(folder_path, "**", pattern)
-                files = glob.glob(search_pattern, recursive=True)
-            else:
-                search_pattern = os.path.join(folder_path, pattern)
-                files = glob.glob(search_pattern)
-
-            # ファイルのみをフィルタリング
-            files = [f for f in files if os.path.isfile(f)]
-
-            self.log(f"Found {len(files)} files in {folder_path} matching '{pattern}'")
+            entries = iter_folder_files(folder_path, pattern, include_subfolders)
+
+            if loop_steps:
+                return await self._run_loop(
+                    entries,
+                    folder_path,
+                    pattern,
+                    loop_steps,
+                    file_storage_key or "current_file",
+                    path_storage_key or "current_path",
+                    concurrency,
+                    iteration_error,
+                )
 
             # 各ファイルの情報を収集
-            file_list = []
-            for file_path in files:
-                file_info = {
-                    "path": file_path,
-                    "name": os.path.basename(file_path),
-                    "directory": os.path.dirname(file_path),
-                    "size": os.path.getsize(file_path),
-                    "extension": os.path.splitext(file_path)[1],
-                }
-                file_list.append(file_info)
+            file_list = [folder_entry_info(entry) for entry in entries]
+
+            self.log(
+                f"Found {len(file_list)} files in {folder_path} matching '{pattern}'"
+            )
 
             # 最初のファイルをストレージに設定（ループ処理の準備）
             if file_list and file_storage_key:
@@ -621,3 +1275,53 @@ class FolderLoopOperation(BaseOperation):
                 data={},
                 error=f"Failed to process folder loop: {str(e)}",
             )
+
+    async def _run_loop(
+        self,
+        entries: Iterator[os.DirEntry],
+        folder_path: str,
+        pattern: str,
+        loop_steps: List[Dict[str, Any]],
+        file_storage_key: str,
+        path_storage_key: str,
+        concurrency: int,
+        iteration_error: str,
+    ) -> OperationResult:
+        """ファイルごとに loop_steps を実行する"""
+        runner = LoopBodyRunner(
+            self.agent,
+            loop_steps,
+            iteration_error=iteration_error,
+            concurrency=concurrency,
+        )
+        error = runner.validate()
+        if error:
+            return OperationResult(status="failure", data={}, error=error)
+
+        variables = (
+            {file_storage_key: entry.name, path_storage_key: entry.path}
+            for entry in entries
+        )
+        summary = await runner.run(variables)
+
+        self.log(
+            f"Folder loop finished: {summary['succeeded']}/{summary['iterations']} "
+            f"files succeeded in {folder_path}"
+        )
+
+        data = {"folder_path": folder_path, "pattern": pattern, **summary}
+        if summary["stopped"]:
+            first = summary["errors"][0]
+            return OperationResult(
+                status="failure",
+                data=data,
+                error=f"Loop stopped at file {first['variables'][path_storage_key]}: "
+                f"{first['error']}",
+            )
+        if summary["failed"]:
+            return OperationResult(
+                status="warning",
+                data=data,
+                error=f"{summary['failed']} files failed and were skipped",
+            )
+        return OperationResult(status="success", data=data)
@@ -0,0 +1,263 @@
+"""
+フォルダへのファイル到着を検知するモジュール
+
+Linux では inotify でイベントを受け取り、ディスクをポーリングしない。
+それ以外の環境では os.scandir による定期スキャンに切り替える。
+どちらの場合も、書き込み途中のファイルを拾わないようにサイズが一定時間
+変わらなくなるまで待ってから通知する。
+"""
+
+import ctypes
+import ctypes.util
+import fnmatch
+import os
+import select
+import struct
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .tree_copy import PARTIAL_SUFFIX
+
+# inotify のイベント種別（linux/inotify.h）
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_EVENT_HEADER = struct.Struct("iIII")
+_READ_SIZE = 64 * 1024
+
+# 通知済みとして覚えておくファイル数の上限（常駐トリガーでの肥大化を防ぐ）
+_MAX_DELIVERED = 10000
+
+# 自分たちが書き込み途中に使う一時ファイル（コピー・原子的書き込み）。
+# 他のアプリが使う *.tmp などは利用者のパターンに任せる
+IGNORED_SUFFIXES = (PARTIAL_SUFFIX,)
+
+_libc = None
+
+
+def _load_libc():
+    global _libc
+    if _libc is None:
+        _libc = ctypes.CDLL(
+            ctypes.util.find_library("c") or "libc.so.6", use_errno=True
+        )
+    return _libc
+
+
+def inotify_available() -> bool:
+    """inotify が使えるかどうか"""
+    if not sys.platform.startswith("linux"):
+        return False
+    try:
+        return hasattr(_load_libc(), "inotify_init1")
+    except OSError:
+        return False
+
+
+class InotifyWatcher:
+    """inotify で書き込み完了（close_write）と移動してきたファイルを受け取る"""
+
+    def __init__(self, folder_path: str, mask: int = IN_CLOSE_WRITE | IN_MOVED_TO):
+        libc = _load_libc()
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        wd = libc.inotify_add_watch(self.fd, os.fsencode(folder_path), mask)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch failed: {folder_path}")
+
+    def read(self, timeout: float) -> List[str]:
+        """timeout 秒までイベントを待ち、対象になったファイル名を返す"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            buffer = os.read(self.fd, _READ_SIZE)
+        except BlockingIOError:
+            return []
+
+        names = []
+        offset = 0
+        while offset < len(buffer):
+            _, _, _, length = _EVENT_HEADER.unpack_from(buffer, offset)
+            offset += _EVENT_HEADER.size
+            name = buffer[offset : offset + length].rstrip(b"\0")
+            offset += length
+            if name:
+                names.append(os.fsdecode(name))
+        return names
+
+    def has_events(self) -> bool:
+        """前回以降にイベントがあったか（溜まっているイベントは読み捨てる）"""
+        changed = False
+        while True:
+            try:
+                buffer = os.read(self.fd, _READ_SIZE)
+            except BlockingIOError:
+                return changed
+            if not buffer:
+                return changed
+            changed = True
+
+    def close(self):
+        os.close(self.fd)
+
+
+# フォルダ内容の変化（追加・削除・名前変更・書き込み）を表すイベント
+DIRECTORY_CHANGE_MASK = (
+    IN_MODIFY
+    | IN_ATTRIB
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+)
+
+
+class PollingWatcher:
+    """inotify が使えない環境向けに、定期的にフォルダをスキャンする"""
+
+    def __init__(self, folder_path: str, interval: float = 1.0):
+        self.folder_path = folder_path
+        self.interval = interval
+        self._seen: Dict[str, Tuple[int, float]] = self._snapshot()
+
+    def _snapshot(self) -> Dict[str, Tuple[int, float]]:
+        snapshot = {}
+        with os.scandir(self.folder_path) as it:
+            for entry in it:
+                if entry.is_file():
+                    st = entry.stat()
+                    snapshot[entry.name] = (st.st_size, st.st_mtime)
+        return snapshot
+
+    def read(self, timeout: float) -> List[str]:
+        """前回のスキャンから新しく現れた・変更されたファイル名を返す"""
+        time.sleep(min(timeout, self.interval))
+        current = self._snapshot()
+        changed = [name for name, sig in current.items() if self._seen.get(name) != sig]
+        self._seen = current
+        return changed
+
+    def close(self):
+        pass
+
+
+class FileArrivalWatcher:
+    """パターンに一致するファイルの到着を1件ずつ返す
+
+    inotify の close_write は書き込み側がファイルを閉じた時点で届くが、
+    書き込みを分けて行うアプリもあるため、stable_seconds の間サイズと更新日時
+    が変わらないことを確認してから返す。
+    """
+
+    def __init__(
+        self,
+        folder_path: str,
+        pattern: str = "*",
+        stable_seconds: float = 0.5,
+        include_existing: bool = False,
+        use_inotify: Optional[bool] = None,
+        poll_interval: float = 1.0,
+    ):
+        self.folder_path = folder_path
+        self.pattern = pattern
+        self.stable_seconds = stable_seconds
+        if use_inotify is None:
+            use_inotify = inotify_available()
+        self.backend = (
+            InotifyWatcher(folder_path)
+            if use_inotify
+            else PollingWatcher(folder_path, poll_interval)
+        )
+        self.mode = "inotify" if use_inotify else "polling"
+
+        # 安定待ちのファイル: 名前 -> (サイズ, 更新日時, 最後に変化を見た時刻)
+        self._settling: Dict[str, Tuple[int, float, float]] = {}
+        self._delivered: Dict[str, Tuple[int, float]] = {}
+        if include_existing:
+            with os.scandir(folder_path) as it:
+                for entry in it:
+                    if entry.is_file():
+                        self._track(entry.name)
+
+    def _matches(self, name: str) -> bool:
+        if name.endswith(IGNORED_SUFFIXES):
+            return False
+        if name.startswith(".") and not self.pattern.startswith("."):
+            return False
+        return fnmatch.fnmatch(name, self.pattern)
+
+    def _track(self, name: str):
+        if not self._matches(name):
+            return
+        try:
+            st = os.stat(os.path.join(self.folder_path, name))
+        except FileNotFoundError:
+            self._settling.pop(name, None)
+            return
+        signature = (st.st_size, st.st_mtime)
+        previous = self._settling.get(name)
+        if previous is None:
+            # 最終更新から時間が経っているファイルは、その分だけ待ち時間を短くする
+            age = max(0.0, time.time() - st.st_mtime)
+            since = time.monotonic() - min(age, self.stable_seconds)
+            self._settling[name] = (*signature, since)
+        elif previous[:2] != signature:
+            self._settling[name] = (*signature, time.monotonic())
+
+    def _pop_stable(self) -> Optional[str]:
+        now = time.monotonic()
+        for name, (size, mtime, since) in list(self._settling.items()):
+            if now - since < self.stable_seconds:
+                continue
+            self._track(name)  # 最新の状態を確認
+            current = self._settling.get(name)
+            if current is None or current[2] != since:
+                continue
+            del self._settling[name]
+            if self._delivered.get(name) == (size, mtime):
+                continue
+            self._delivered[name] = (size, mtime)
+            if len(self._delivered) > _MAX_DELIVERED:
+                del self._delivered[next(iter(self._delivered))]
+            return os.path.join(self.folder_path, name)
+        return None
+
+    def next(self, timeout: Optional[float] = None) -> Optional[str]:
+        """次に到着したファイルのパスを返す（timeout 秒で None）"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            path = self._pop_stable()
+            if path:
+                return path
+
+            wait = 1.0
+            if self._settling:
+                wait = self.stable_seconds / 2 or 0.05
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                wait = min(wait, remaining)
+
+            for name in self.backend.read(wait):
+                self._track(name)
+
+    def close(self):
+        self.backend.close()
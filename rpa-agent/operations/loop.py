@@ -0,0 +1,284 @@
+"""
+ループ本体（loop_steps）の実行を担当するモジュール
+
+フォルダループ・CSV読込ループ・行ループなど、反復ごとに入れ子のステップを
+実行する操作が共通で使う。
+"""
+
+import asyncio
+import queue
+import re
+import threading
+from itertools import islice
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Union
+
+# loop_steps のパラメータ内で反復変数を参照するための書式（例: "{{current_path}}"）
+PLACEHOLDER_PATTERN = re.compile(r"\{\{\s*([^{}]+?)\s*\}\}")
+
+# 反復ごとのエラー処理方針
+ITERATION_ERROR_POLICIES = ("stop", "skip")
+
+# ブックのセッション（ロックなしで共有される）を使う操作のカテゴリ
+WORKBOOK_CATEGORY = "J_Excel"
+
+
+def resolve_placeholders(value: Any, lookup) -> Any:
+    """パラメータ内の {{変数名}} を値に置き換える
+
+    文字列全体が1つのプレースホルダーの場合は値の型をそのまま保つ。
+    見つからない変数はそのまま残す（内側のループで束縛される変数のため）。
+    """
+    if isinstance(value, str):
+        match = PLACEHOLDER_PATTERN.fullmatch(value)
+        if match:
+            key = match.group(1)
+            return lookup(key) if _has_key(lookup, key) else value
+
+        def replace(m):
+            key = m.group(1)
+            return str(lookup(key)) if _has_key(lookup, key) else m.group(0)
+
+        return PLACEHOLDER_PATTERN.sub(replace, value)
+    if isinstance(value, dict):
+        return {k: resolve_placeholders(v, lookup) for k, v in value.items()}
+    if isinstance(value, list):
+        return [resolve_placeholders(v, lookup) for v in value]
+    return value
+
+
+_MISSING = object()
+
+
+def _has_key(lookup, key: str) -> bool:
+    return lookup(key, _MISSING) is not _MISSING
+
+
+def uses_workbook_session(steps: List[Dict[str, Any]]) -> bool:
+    """ステップ（入れ子の loop_steps を含む）がブックのセッションを使うか"""
+    for step in steps:
+        if step.get("category") == WORKBOOK_CATEGORY:
+            return True
+        nested = (step.get("params") or {}).get("loop_steps")
+        if nested and uses_workbook_session(nested):
+            return True
+    return False
+
+
+def step_failed(result: Dict[str, Any]) -> bool:
+    """ステップ結果が失敗かどうかを判定する"""
+    if result.get("status") == "error":
+        return True
+    return result.get("result", {}).get("status") == "failure"
+
+
+def step_error(result: Dict[str, Any]) -> Optional[str]:
+    """ステップ結果からエラーメッセージを取り出す"""
+    if result.get("status") == "error":
+        return result.get("error")
+    return result.get("result", {}).get("error")
+
+
+class LoopBodyRunner:
+    """反復ごとに変数を束縛して loop_steps を実行する
+
+    concurrency が 1 の場合は共有ストレージに変数を書き込んで順番に実行する。
+    2 以上の場合は反復ごとに変数スコープを分け、ワーカースレッドで最大
+    concurrency 件の本体を同時に実行する（ファイル変換・コピー・アップロードなど
+    I/O 中心の本体向け）。ただし本体が Excel の操作を含む場合は、ロックの
+    ないブックのセッションを共有するため順番に実行する。反復は items から
+    逐次取り出すため、全件を事前にリスト化しない。
+    """
+
+    def __init__(
+        self,
+        agent,
+        loop_steps: List[Dict[str, Any]],
+        iteration_error: str = "stop",
+        concurrency: int = 1,
+        max_iterations: Optional[int] = None,
+    ):
+        self.agent = agent
+        self.loop_steps = loop_steps
+        self.iteration_error = iteration_error
+        self.concurrency = max(1, int(concurrency or 1))
+        self.max_iterations = max_iterations
+
+        self.iterations = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.errors: List[Dict[str, Any]] = []
+        self.stopped = False
+
+    def validate(self) -> Optional[str]:
+        """実行前のチェック（問題がない場合はNone）"""
+        if self.iteration_error not in ITERATION_ERROR_POLICIES:
+            return (
+                f"Unknown iteration_error: {self.iteration_error} "
+                f"(expected one of {', '.join(ITERATION_ERROR_POLICIES)})"
+            )
+        if not self.agent or not hasattr(self.agent, "run_steps"):
+            return "Nested step execution is not available"
+        return None
+
+    async def run(
+        self, items: Union[Iterable[Dict[str, Any]], AsyncIterator[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """全反復を実行して集計結果を返す
+
+        Args:
+            items: 反復ごとに束縛する変数の辞書を返すイテラブル
+
+        Returns:
+            反復数・成功数・失敗数・エラー一覧の辞書
+        """
+        if self.concurrency > 1 and uses_workbook_session(self.loop_steps):
+            self.agent.log(
+                "loop_steps use workbook sessions; running iterations sequentially",
+                "warning",
+            )
+            self.concurrency = 1
+        if self.concurrency == 1:
+            await self._run_sequential(items)
+        else:
+            await self._run_concurrent(items)
+        return self.summary()
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "iterations": self.iterations,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "stopped": self.stopped,
+            "errors": self.errors,
+        }
+
+    async def _iterate(self, items):
+        """同期・非同期のどちらのイテラブルからも反復を取り出す"""
+        if hasattr(items, "__aiter__"):
+            async for variables in items:
+                yield variables
+        else:
+            for variables in items:
+                yield variables
+
+    def _limit_reached(self) -> bool:
+        return (
+            self.max_iterations is not None and self.iterations >= self.max_iterations
+        )
+
+    async def _run_sequential(self, items):
+        async for variables in self._iterate(items):
+            if self.stopped or self._limit_reached():
+                break
+            index = self.iterations
+            self.iterations += 1
+
+            for key, value in variables.items():
+                self.agent.storage[key] = value
+            results = await self.agent.run_steps(
+                self._resolve_steps(self.agent.storage.get)
+            )
+            self._record(index, variables, results)
+
+    async def _run_concurrent(self, items):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        pending = set()
+
+        async def run_one(index, variables):
+            try:
+                scope = self.agent.scoped(variables)
+                steps = self._resolve_steps(scope.storage.get)
+                results = await asyncio.to_thread(asyncio.run, scope.run_steps(steps))
+                self._record(index, variables, results)
+            finally:
+                semaphore.release()
+
+        async for variables in self._iterate(items):
+            await semaphore.acquire()
+            if self.stopped or self._limit_reached():
+                semaphore.release()
+                break
+            index = self.iterations
+            self.iterations += 1
+            task = asyncio.create_task(run_one(index, variables))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+
+        if pending:
+            await asyncio.gather(*pending)
+
+    def _resolve_steps(self, lookup) -> List[Dict[str, Any]]:
+        return [
+            {**step, "params": resolve_placeholders(step.get("params", {}), lookup)}
+            for step in self.loop_steps
+        ]
+
+    def _record(self, index: int, variables: Dict[str, Any], results: List[Dict]):
+        failures = [r for r in results if step_failed(r)]
+        if not failures:
+            self.succeeded += 1
+            return
+
+        self.failed += 1
+        self.errors.append(
+            {
+                "index": index,
+                "variables": variables,
+                "step_id": failures[0].get("id"),
+                "error": step_error(failures[0]),
+            }
+        )
+        if self.iteration_error == "stop":
+            self.stopped = True
+
+
+_PREFETCH_DONE = object()
+
+
+class PrefetchIterator:
+    """items を別スレッドで chunk_size 件ずつ先読みしながら返す
+
+    ストリーミング読み込みのように取り出しに時間がかかる反復で、本体の実行中に
+    次のチャンクを読んでおく。先読みは depth チャンクまで。途中で反復をやめる
+    場合は close() を呼んでスレッドを止める。
+    """
+
+    def __init__(self, items: Iterable, chunk_size: int = 500, depth: int = 2):
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, depth))
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._produce, args=(iter(items), max(1, chunk_size)), daemon=True
+        )
+        self._thread.start()
+
+    def _produce(self, iterator, chunk_size: int):
+        try:
+            while chunk := list(islice(iterator, chunk_size)):
+                if not self._put(chunk):
+                    return
+        except Exception as e:
+            self._put(e)
+            return
+        self._put(_PREFETCH_DONE)
+
+    def _put(self, item) -> bool:
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def __iter__(self):
+        while True:
+            item = self._queue.get()
+            if item is _PREFETCH_DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield from item
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
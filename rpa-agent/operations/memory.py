@@ -9,6 +9,7 @@ import socket
 from typing import Any, Dict
 
 from .base import BaseOperation, OperationResult
+from .dir_listing import find_newest
 
 
 class EnvironmentInfoOperation(BaseOperation):
@@ -290,3 +291,101 @@ class AppendToListOperation(BaseOperation):
             return OperationResult(
                 status="failure", data={}, error=f"Failed to append to list: {str(e)}"
             )
+
+
+class FindNewestFileOperation(BaseOperation):
+    """フォルダ内の最新（または最古）のファイル・フォルダを検索して記憶
+
+    number は何番目に新しいものを記憶するか（1 が最新）。use_cache を指定
+    すると、同じフォルダを繰り返し確認するときに一覧をキャッシュから返す。
+    """
+
+    # スキーマの日本語の選択肢と内部の値の対応
+    TARGETS = {
+        "file": "file",
+        "ファイル": "file",
+        "dir": "dir",
+        "フォルダ": "dir",
+        "both": "both",
+        "両方": "both",
+    }
+    TIME_FIELDS = {
+        "更新日時": "mtime",
+        "modified": "mtime",
+        "作成日時": "ctime",
+        "created": "ctime",
+    }
+
+    async def execute(self, params: Dict[str, Any]) -> OperationResult:
+        variable = params.get("variable", "")
+        folder_path = params.get("path", "")
+        file_or_dir = params.get("file_or_dir", "file")
+        date_check = params.get("date_check", "更新日時")
+        number = params.get("number", 1)
+        pattern = params.get("pattern", "*")
+        order = params.get("order", "newest")
+        use_cache = params.get("use_cache", False)
+
+        error = self.validate_params(params, ["variable", "path"])
+        if error:
+            return OperationResult(status="failure", data={}, error=error)
+
+        target = self.TARGETS.get(file_or_dir)
+        time_field = self.TIME_FIELDS.get(date_check)
+        if target is None or time_field is None:
+            return OperationResult(
+                status="failure",
+                data={},
+                error=f"Invalid file_or_dir or date_check: {file_or_dir}, {date_check}",
+            )
+
+        try:
+            folder_path = os.path.expanduser(folder_path)
+            number = max(1, int(number))
+            if not os.path.isdir(folder_path):
+                return OperationResult(
+                    status="failure",
+                    data={},
+                    error=f"Folder does not exist: {folder_path}",
+                )
+
+            entries = find_newest(
+                folder_path,
+                count=number,
+                pattern=pattern or "*",
+                target=target,
+                time_field=time_field,
+                oldest=order == "oldest",
+                use_cache=use_cache,
+            )
+            found = [
+                {
+                    "path": entry.path,
+                    "name": entry.name,
+                    time_field: getattr(entry, time_field),
+                }
+                for entry in entries
+            ]
+
+            if len(entries) < number:
+                self.set_storage(variable, "")
+                return OperationResult(
+                    status="warning",
+                    data={"storage_key": variable, "value": "", "found": found},
+                    error=f"Only {len(entries)} matching entries in {folder_path}",
+                )
+
+            value = entries[-1].path
+            self.set_storage(variable, value)
+            self.log(f"Stored {order} entry as '{variable}': {value}")
+
+            return OperationResult(
+                status="success",
+                data={"storage_key": variable, "value": value, "found": found},
+            )
+        except Exception as e:
+            return OperationResult(
+                status="failure",
+                data={},
+                error=f"Failed to find newest file: {str(e)}",
+            )
@@ -0,0 +1,280 @@
+"""
+フォルダ同期と同期状態のインデックスを担当するモジュール
+
+前回同期したときのコピー元ファイルの状態（サイズ・更新日時・ハッシュ）を
+SQLite に保存しておき、次回はコピー元を1回走査するだけで新規・変更・削除
+されたファイルを判定する。コピー先は変更のあったファイルしか触らない。
+"""
+
+import fnmatch
+import os
+import sqlite3
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .tree_copy import PARTIAL_SUFFIX, TreeCopier, file_hash
+
+# インデックスの既定の保存先
+DEFAULT_INDEX_PATH = os.path.join(
+    os.path.expanduser("~"), ".rpa-agent", "sync_index.sqlite3"
+)
+
+# (サイズ, 更新日時[ns], ハッシュ)
+FileState = Tuple[int, int, Optional[str]]
+
+
+class SyncIndex:
+    """同期元・同期先の組ごとにファイルの状態を保存する SQLite のインデックス"""
+
+    def __init__(self, db_path: str = DEFAULT_INDEX_PATH):
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS files (
+                source_root TEXT NOT NULL,
+                dest_root TEXT NOT NULL,
+                rel_path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                hash TEXT,
+                PRIMARY KEY (source_root, dest_root, rel_path)
+            )
+            """
+        )
+        self.conn.commit()
+
+    def load(self, source_root: str, dest_root: str) -> Dict[str, FileState]:
+        rows = self.conn.execute(
+            "SELECT rel_path, size, mtime_ns, hash FROM files "
+            "WHERE source_root = ? AND dest_root = ?",
+            (source_root, dest_root),
+        )
+        return {rel: (size, mtime_ns, digest) for rel, size, mtime_ns, digest in rows}
+
+    def apply(
+        self,
+        source_root: str,
+        dest_root: str,
+        upserts: Dict[str, FileState],
+        deletes: List[str],
+    ):
+        """変更を1トランザクションで反映する"""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    (source_root, dest_root, rel, size, mtime_ns, digest)
+                    for rel, (size, mtime_ns, digest) in upserts.items()
+                ),
+            )
+            self.conn.executemany(
+                "DELETE FROM files WHERE source_root = ? AND dest_root = ? "
+                "AND rel_path = ?",
+                ((source_root, dest_root, rel) for rel in deletes),
+            )
+
+    def close(self):
+        self.conn.close()
+
+
+@dataclass
+class SyncResult:
+    """同期の結果"""
+
+    added: List[str] = field(default_factory=list)
+    updated: List[str] = field(default_factory=list)
+    deleted: List[str] = field(default_factory=list)
+    unchanged: int = 0
+    bytes_copied: int = 0
+    errors: List[Dict[str, str]] = field(default_factory=list)
+
+    def to_dict(self) -> Dict:
+        return {
+            "added": self.added,
+            "updated": self.updated,
+            "deleted": self.deleted,
+            "unchanged": self.unchanged,
+            "bytes_copied": self.bytes_copied,
+            "errors": self.errors,
+        }
+
+
+def _walk(root: str, pattern: str) -> Iterator[Tuple[str, os.DirEntry]]:
+    """root 以下のファイルを (相対パス, DirEntry) で返す
+
+    フォルダへのシンボリックリンクはたどらない（循環するリンクで無限に
+    降りないように）。ファイルへのリンクはリンク先の内容を同期する。
+    """
+    stack = [("", root)]
+    while stack:
+        rel_dir, directory = stack.pop()
+        with os.scandir(directory) as it:
+            for entry in it:
+                rel = f"{rel_dir}{entry.name}"
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append((rel + "/", entry.path))
+                elif not entry.is_file(follow_symlinks=True):
+                    # フォルダへのリンク・リンク切れ・特殊ファイル
+                    continue
+                elif entry.name.endswith(PARTIAL_SUFFIX):
+                    continue
+                elif fnmatch.fnmatch(entry.name, pattern):
+                    yield rel, entry
+
+
+def _remove_empty_parents(path: str, stop: str):
+    directory = os.path.dirname(path)
+    while os.path.normcase(directory) != os.path.normcase(stop):
+        try:
+            os.rmdir(directory)
+        except OSError:
+            return
+        directory = os.path.dirname(directory)
+
+
+class FolderSyncer:
+    """インデックスを使ってコピー元の変更分だけをコピー先に反映する
+
+    インデックスと一致するファイルはコピー先を確認せずに飛ばすため、
+    変更がなければコピー元の走査1回で終わる。コピーに失敗したファイルは
+    インデックスを更新しないので、次回の同期で再度コピーされる。
+    """
+
+    def __init__(
+        self,
+        index: SyncIndex,
+        pattern: str = "*",
+        mirror_deletions: bool = False,
+        use_hash: bool = False,
+        verify_destination: bool = False,
+        max_workers: Optional[int] = None,
+        storage_profile: str = "ssd",
+    ):
+        self.index = index
+        # 新規ファイルでもコピー先に同じもの（サイズ・更新日時が一致）があれば
+        # コピーしない。インデックスがない状態での初回同期が速くなる
+        self.copier = TreeCopier(
+            max_workers=max_workers, storage_profile=storage_profile, resume=True
+        )
+        self.pattern = pattern or "*"
+        self.mirror_deletions = mirror_deletions
+        self.use_hash = use_hash
+        self.verify_destination = verify_destination
+
+    def sync(self, source_root: str, dest_root: str) -> SyncResult:
+        source_root = os.path.abspath(source_root)
+        dest_root = os.path.abspath(dest_root)
+        known = self.index.load(source_root, dest_root)
+        result = SyncResult()
+        upserts: Dict[str, FileState] = {}
+        seen = set()
+
+        os.makedirs(dest_root, exist_ok=True)
+        pending = {}
+        in_flight_limit = self.copier.max_workers * 4
+
+        with ThreadPoolExecutor(max_workers=self.copier.max_workers) as executor:
+            for rel, entry in _walk(source_root, self.pattern):
+                seen.add(rel)
+                st = entry.stat()
+                previous = known.get(rel)
+                target = os.path.join(dest_root, *rel.split("/"))
+                if self._unchanged(previous, st, entry.path, target, upserts, rel):
+                    result.unchanged += 1
+                    continue
+
+                if len(pending) >= in_flight_limit:
+                    pending = self._collect(pending, FIRST_COMPLETED, result, upserts)
+                future = executor.submit(self._copy, entry.path, target, st)
+                pending[future] = (rel, st, previous is None)
+
+            self._collect(pending, ALL_COMPLETED, result, upserts)
+
+        # パターンを変えた場合に対象外になったファイルは削除扱いにしない
+        removed = [
+            rel
+            for rel in known
+            if rel not in seen and fnmatch.fnmatch(rel.rsplit("/", 1)[-1], self.pattern)
+        ]
+        if self.mirror_deletions:
+            removed = [rel for rel in removed if self._delete(dest_root, rel, result)]
+        # ミラーしない場合も、コピー元から消えたファイルはインデックスから外す
+        self.index.apply(source_root, dest_root, upserts, removed)
+
+        for name in ("added", "updated", "deleted"):
+            getattr(result, name).sort()
+        return result
+
+    def _delete(self, dest_root: str, rel: str, result: SyncResult) -> bool:
+        """コピー先のファイルを削除する（失敗時はインデックスに残して次回再試行）"""
+        target = os.path.join(dest_root, *rel.split("/"))
+        try:
+            if os.path.lexists(target):
+                os.remove(target)
+                _remove_empty_parents(target, dest_root)
+        except OSError as e:
+            result.errors.append({"path": rel, "error": str(e)})
+            return False
+        result.deleted.append(rel)
+        return True
+
+    def _unchanged(self, previous, st, src, target, upserts, rel) -> bool:
+        if previous is None:
+            return False
+        size, mtime_ns, digest = previous
+        if size == st.st_size and mtime_ns == st.st_mtime_ns:
+            return not self.verify_destination or os.path.exists(target)
+        # 更新日時だけ変わった（内容は同じ）ファイルはコピーしない
+        if (
+            self.use_hash
+            and digest
+            and size == st.st_size
+            and file_hash(src) == digest
+            and os.path.exists(target)
+        ):
+            upserts[rel] = (st.st_size, st.st_mtime_ns, digest)
+            return True
+        return False
+
+    def _copy(self, src: str, dst: str, st: os.stat_result):
+        """コピーして (コピーしたバイト数, ハッシュ) を返す（コピー不要なら None, ハッシュ）"""
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        copied = self.copier.copy_file(src, dst, st)
+        digest = file_hash(src) if self.use_hash else None
+        return copied, digest
+
+    def _collect(self, pending, return_when, result: SyncResult, upserts):
+        done, _ = wait(pending, return_when=return_when)
+        for future in done:
+            rel, st, is_new = pending.pop(future)
+            try:
+                copied, digest = future.result()
+            except OSError as e:
+                result.errors.append({"path": rel, "error": str(e)})
+                continue
+            if copied is None:
+                result.unchanged += 1
+            else:
+                (result.added if is_new else result.updated).append(rel)
+                result.bytes_copied += copied
+            upserts[rel] = (st.st_size, st.st_mtime_ns, digest)
+        return pending
+
+
+def sync_folder(
+    source_root: str, dest_root: str, index_path: str = DEFAULT_INDEX_PATH, **options
+) -> SyncResult:
+    """インデックスを開いて同期し、閉じる
+
+    SQLite の接続は作成したスレッドでしか使えないため、接続から同期までを
+    同じスレッドで行う。options は FolderSyncer の引数。
+    """
+    index = SyncIndex(index_path)
+    try:
+        return FolderSyncer(index, **options).sync(source_root, dest_root)
+    finally:
+        index.close()
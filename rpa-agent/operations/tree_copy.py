@@ -0,0 +1,288 @@
+"""
+フォルダツリーの並列コピーを担当するモジュール
+
+ファイル・フォルダのコピーや、別ドライブへの移動で使う。ファイル本体の
+コピーはカーネルのコピー機能（copy_file_range / sendfile）を優先して使い、
+ユーザー空間にデータを読み込まずに済ませる。
+"""
+
+import errno
+import hashlib
+import os
+import shutil
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+# 保存先の種類ごとの既定スレッド数
+# HDD はシークが増えると遅くなるため少なく、ネットワークドライブは
+# 往復待ちを隠すために多めにする
+WORKERS_BY_STORAGE = {
+    "ssd": 8,
+    "hdd": 2,
+    "network": 16,
+}
+
+# コピー途中のファイルに付ける拡張子（完了後にリネームする）
+PARTIAL_SUFFIX = ".rpa-partial"
+
+# copy_file_range 1回あたりの最大バイト数
+_CHUNK_SIZE = 64 * 1024 * 1024
+
+# ハッシュ計算時の1回あたりの読み込みサイズ
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def copy_file_fast(src: str, dst: str) -> int:
+    """ファイル本体をコピーしてコピーしたバイト数を返す
+
+    Linux では os.copy_file_range を使う（対応ファイルシステムでは reflink や
+    NFS のサーバー側コピーになる）。使えない場合は shutil.copyfile に任せる
+    （Linux では sendfile、macOS では fcopyfile が使われる）。
+    """
+    if hasattr(os, "copy_file_range"):
+        try:
+            return _copy_file_range(src, dst)
+        except OSError as e:
+            if e.errno not in (
+                errno.EXDEV,
+                errno.ENOSYS,
+                errno.EINVAL,
+                errno.EOPNOTSUPP,
+            ):
+                raise
+    shutil.copyfile(src, dst)
+    return os.path.getsize(dst)
+
+
+def _copy_file_range(src: str, dst: str) -> int:
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        infd, outfd = fsrc.fileno(), fdst.fileno()
+        total = 0
+        while True:
+            copied = os.copy_file_range(infd, outfd, _CHUNK_SIZE)
+            if copied == 0:
+                break
+            total += copied
+        return total
+
+
+def file_hash(path: str) -> str:
+    """ファイル内容のハッシュ（BLAKE2b）を返す"""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        while chunk := f.read(_HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def is_up_to_date(src: str, src_stat: os.stat_result, dst: str) -> bool:
+    """コピー先がコピー元と同じ内容か
+
+    サイズと更新日時（ナノ秒）が一致すれば同じとみなす。更新日時が秒までしか
+    一致しない場合（更新日時の精度が粗いファイルシステムへのコピーなど）は、
+    内容のハッシュを比べて確かめる。
+    """
+    try:
+        dst_stat = os.stat(dst)
+    except FileNotFoundError:
+        return False
+    if dst_stat.st_size != src_stat.st_size:
+        return False
+    if dst_stat.st_mtime_ns == src_stat.st_mtime_ns:
+        return True
+    if int(dst_stat.st_mtime) != int(src_stat.st_mtime):
+        return False
+    return file_hash(src) == file_hash(dst)
+
+
+@dataclass
+class TreeCopyStats:
+    """ツリーコピーの集計結果"""
+
+    files_copied: int = 0
+    files_skipped: int = 0
+    bytes_copied: int = 0
+    directories: int = 0
+    errors: List[Dict[str, str]] = field(default_factory=list)
+
+    def to_dict(self) -> Dict:
+        return {
+            "files_copied": self.files_copied,
+            "files_skipped": self.files_skipped,
+            "bytes_copied": self.bytes_copied,
+            "directories": self.directories,
+            "errors": self.errors,
+        }
+
+
+class TreeCopier:
+    """フォルダツリーをスレッドプールで並列コピーする
+
+    ディレクトリの走査は呼び出し元スレッドで行い、ファイルのコピーだけを
+    ワーカーに渡す。未完了のコピーは max_workers の数倍までに抑えるため、
+    数万ファイルのツリーでもキューが膨らまない。
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        storage_profile: str = "ssd",
+        preserve_metadata: bool = True,
+        resume: bool = False,
+        progress_interval: int = 1000,
+        on_progress: Optional[Callable[[TreeCopyStats], None]] = None,
+    ):
+        self.max_workers = max_workers or WORKERS_BY_STORAGE.get(
+            storage_profile, WORKERS_BY_STORAGE["ssd"]
+        )
+        self.preserve_metadata = preserve_metadata
+        self.resume = resume
+        self.progress_interval = max(1, int(progress_interval or 1))
+        self.on_progress = on_progress
+        self.stats = TreeCopyStats()
+        self._next_progress = self.progress_interval
+
+    def copy_file(self, src: str, dst: str, src_stat: Optional[os.stat_result] = None):
+        """1ファイルをコピーする（途中のファイルは .rpa-partial として書く）
+
+        Returns:
+            コピーしたバイト数（最新のためスキップした場合は None）
+        """
+        src_stat = src_stat or os.stat(src)
+        if self.resume and is_up_to_date(src, src_stat, dst):
+            return None
+
+        partial = dst + PARTIAL_SUFFIX
+        try:
+            copied = copy_file_fast(src, partial)
+            if self.preserve_metadata:
+                shutil.copystat(src, partial)
+            os.replace(partial, dst)
+        except BaseException:
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+        return copied
+
+    def copy_tree(self, src: str, dst: str) -> TreeCopyStats:
+        """src 以下を dst にコピーする
+
+        コピーできなかったファイル・読めなかったフォルダは stats.errors に
+        記録し、残りのコピーを続ける。
+        """
+        pending = {}
+        directories = []
+        in_flight_limit = self.max_workers * 4
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            stack = [(src, dst)]
+            while stack:
+                src_dir, dst_dir = stack.pop()
+                try:
+                    os.makedirs(dst_dir, exist_ok=True)
+                    it = os.scandir(src_dir)
+                except OSError as e:
+                    # 読めないフォルダ（アクセス権がないなど）は記録して続ける
+                    self.stats.errors.append({"path": src_dir, "error": str(e)})
+                    continue
+                directories.append((src_dir, dst_dir))
+                self.stats.directories += 1
+
+                with it:
+                    for entry in it:
+                        target = os.path.join(dst_dir, entry.name)
+                        try:
+                            # フォルダへのシンボリックリンクはたどらず、リンクとして
+                            # コピーする（循環するリンクで無限に降りないように）
+                            if entry.is_symlink():
+                                self._copy_symlink(entry.path, target)
+                                continue
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append((entry.path, target))
+                                continue
+                            entry_stat = entry.stat()
+                        except OSError as e:
+                            self.stats.errors.append(
+                                {"path": entry.path, "error": str(e)}
+                            )
+                            continue
+                        if len(pending) >= in_flight_limit:
+                            pending = self._collect(pending, FIRST_COMPLETED)
+                        future = executor.submit(
+                            self.copy_file, entry.path, target, entry_stat
+                        )
+                        pending[future] = entry.path
+
+            self._collect(pending, ALL_COMPLETED)
+
+        # ファイルを書き込むとフォルダの更新日時が変わるため、最後に深い順で設定する
+        if self.preserve_metadata:
+            for src_dir, dst_dir in reversed(directories):
+                try:
+                    shutil.copystat(src_dir, dst_dir)
+                except OSError as e:
+                    self.stats.errors.append({"path": src_dir, "error": str(e)})
+
+        if self.on_progress:
+            self.on_progress(self.stats)
+        return self.stats
+
+    def _copy_symlink(self, src: str, dst: str):
+        if os.path.lexists(dst):
+            os.remove(dst)
+        os.symlink(os.readlink(src), dst)
+        self.stats.files_copied += 1
+
+    def _collect(self, pending, return_when):
+        """完了したコピーを集計し、未完了のものを返す"""
+        done, _ = wait(pending, return_when=return_when)
+
+        for future in done:
+            src = pending.pop(future)
+            try:
+                copied = future.result()
+            except OSError as e:
+                self.stats.errors.append({"path": src, "error": str(e)})
+                continue
+            if copied is None:
+                self.stats.files_skipped += 1
+            else:
+                self.stats.files_copied += 1
+                self.stats.bytes_copied += copied
+
+        processed = self.stats.files_copied + self.stats.files_skipped
+        if self.on_progress and processed >= self._next_progress:
+            self.on_progress(self.stats)
+            self._next_progress = processed + self.progress_interval
+        return pending
+
+
+def move_path(src: str, dst: str, copier: TreeCopier) -> str:
+    """ファイル・フォルダを移動して移動先のパスを返す
+
+    同じドライブ内はリネームで済ませる。別ドライブの場合だけ copier で並列
+    コピーし、すべて成功したときにコピー元を削除する。移動先が既存のフォルダ
+    の場合は shutil.move と同じくその中へ移動する。
+    """
+    if os.path.isdir(dst):
+        dst = os.path.join(dst, os.path.basename(src.rstrip(os.sep)))
+
+    try:
+        os.replace(src, dst)
+        return dst
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+
+    if os.path.isdir(src) and not os.path.islink(src):
+        stats = copier.copy_tree(src, dst)
+        if stats.errors:
+            raise OSError(
+                f"{len(stats.errors)} files failed to copy; source was kept: {src}"
+            )
+        shutil.rmtree(src)
+    else:
+        copier.copy_file(src, dst)
+        os.remove(src)
+    return dst
@@ -4,10 +4,12 @@ F_待機 カテゴリの操作
 
 import asyncio
 import contextlib
+import os
 import time
 from typing import Any, Dict
 
 from .base import BaseOperation, OperationResult
+from .file_watch import FileArrivalWatcher
 
 
 class WaitSecondsOperation(BaseOperation):
@@ -174,6 +176,76 @@ class WaitForConditionOperation(BaseOperation):
             )
 
 
+class WaitForFileOperation(BaseOperation):
+    """ファイル出現を待つ
+
+    Linux では inotify のイベントで待つため、ファイルが書き終わった直後に
+    再開できる。それ以外の環境では poll_interval 秒ごとにスキャンする。
+    """
+
+    async def execute(self, params: Dict[str, Any]) -> OperationResult:
+        folder_path = params.get("folder_path", "")
+        pattern = params.get("pattern", "*")
+        timeout = params.get("timeout", 60)
+        stable_seconds = params.get("stable_seconds", 0.5)
+        include_existing = params.get("include_existing", True)
+        poll_interval = params.get("poll_interval", 1.0)
+        storage_key = params.get("storage_key", "")
+
+        error = self.validate_params(params, ["folder_path"])
+        if error:
+            return OperationResult(status="failure", data={}, error=error)
+
+        try:
+            folder_path = os.path.expanduser(folder_path)
+            if not os.path.isdir(folder_path):
+                return OperationResult(
+                    status="failure",
+                    data={},
+                    error=f"Folder does not exist: {folder_path}",
+                )
+
+            watcher = FileArrivalWatcher(
+                folder_path,
+                pattern,
+                stable_seconds=stable_seconds,
+                include_existing=include_existing,
+                poll_interval=poll_interval,
+            )
+            self.log(
+                f"Waiting for '{pattern}' in {folder_path} ({watcher.mode}, timeout: {timeout}s)"
+            )
+            start_time = time.time()
+            try:
+                file_path = await asyncio.to_thread(watcher.next, timeout)
+            finally:
+                watcher.close()
+
+            if not file_path:
+                return OperationResult(
+                    status="failure",
+                    data={"folder_path": folder_path, "pattern": pattern},
+                    error=f"No file matching '{pattern}' appeared within {timeout} seconds",
+                )
+
+            if storage_key:
+                self.set_storage(storage_key, file_path)
+                self.log(f"Stored file path as '{storage_key}'")
+
+            return OperationResult(
+                status="success",
+                data={
+                    "file_path": file_path,
+                    "elapsed_seconds": time.time() - start_time,
+                    "watch_mode": watcher.mode,
+                },
+            )
+        except Exception as e:
+            return OperationResult(
+                status="failure", data={}, error=f"Failed to wait for file: {str(e)}"
+            )
+
+
 class RandomWaitOperation(BaseOperation):
     """ランダムな時間待機"""
 
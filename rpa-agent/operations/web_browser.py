@@ -2,15 +2,48 @@
 L_ウェブブラウザ カテゴリの操作
 """
 
-from typing import Any, Dict
+import asyncio
+import os
+import time
+import uuid
+from typing import Any, Dict, List
 
 from .base import BaseOperation, OperationResult
+from .browser_pool import (
+    BROWSER_POOL_KEY,
+    BROWSER_TYPES,
+    DEFAULT_MAX_USES,
+    BrowserConfig,
+    BrowserPool,
+    block_urls,
+    launch_driver,
+)
+from .csv_stream import normalize_rows, write_csv
+from .web_locator import (
+    LOCATOR_CACHE_KEY,
+    WAIT_CONDITIONS,
+    WAIT_STRATEGIES,
+    LocatorCache,
+    LocatorCacheRegistry,
+    wait_async,
+)
+from .web_scrape import (
+    DEFAULT_CONCURRENCY,
+    DEFAULT_RETRIES,
+    DEFAULT_RETRY_DELAY,
+    Scraper,
+    normalize_fields,
+    url_items,
+)
+from .web_scripts import (
+    EXTRACT_TABLE_SCRIPT,
+    FILL_FORM_SCRIPT,
+    WAIT_FOR_LOAD_SCRIPT,
+)
 
 # Selenium WebDriverをオプショナルでインポート
 try:
-    from selenium import webdriver
-    from selenium.webdriver.common.by import By
-    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.common.exceptions import TimeoutException, WebDriverException
     from selenium.webdriver.support.select import Select
     from selenium.webdriver.support.ui import WebDriverWait
 
@@ -18,9 +51,135 @@ try:
 except ImportError:
     SELENIUM_AVAILABLE = False
 
+# フォーム一括入力で指定できる操作
+FILL_ACTIONS = ("input", "select", "click", "check", "uncheck")
+
+# ページ遷移の途中でスクリプトを実行したときのエラーメッセージ（小文字）
+# これ以外のエラー（セレクタの誤り、閉じたウィンドウ、切れたセッションなど）は
+# 待っても直らないため、そのまま失敗にする
+PAGE_CHANGE_ERRORS = (
+    "document unloaded",
+    "execution context was destroyed",
+    "cannot find context with specified id",
+    "inspected target navigated",
+)
+
+# ネットワークが静まったとみなす、リソースの読み込みが途絶える時間（ミリ秒）
+NETWORK_IDLE_MS = 500
+
+# 表取得で「次へ」をたどるページ数の既定の上限
+DEFAULT_MAX_PAGES = 100
+
+# 応答に載せる行数の上限（全件は storage_key の変数か output_path の CSV に入る）
+RESULT_PREVIEW_ROWS = 100
+
+
+def is_page_change_error(error: Exception) -> bool:
+    """ページ遷移でスクリプトが中断されたことによるエラーか"""
+    message = (getattr(error, "msg", None) or str(error)).lower()
+    return any(pattern in message for pattern in PAGE_CHANGE_ERRORS)
+
+
+def locator_cache(op: BaseOperation, driver) -> LocatorCache:
+    """ブラウザの要素キャッシュ（実行リソースがない場合はその場限りのもの）"""
+    registry = op.run_resource(LOCATOR_CACHE_KEY, LocatorCacheRegistry)
+    return registry.get(driver) if registry else LocatorCache()
+
+
+def wait_until_loaded(driver, wait_time: float = 10, network_idle: bool = False):
+    """ページの読み込みを待つ
+
+    ブラウザの page_load_strategy が eager なら DOM の構築（interactive）まで、
+    none なら待たない（network_idle の指定がなければ）。network_idle=True なら、
+    続けて実行中の fetch・XHR がない状態が NETWORK_IDLE_MS の間続くまで待つ。
+    ページ内のイベントで待ち、スクリプトが中断された場合は readyState を
+    問い合わせて待つ。
+    """
+    capabilities = getattr(driver, "capabilities", None) or {}
+    strategy = capabilities.get("pageLoadStrategy", "normal")
+    if strategy == "none" and not network_idle:
+        return
+    states = ["interactive", "complete"] if strategy != "normal" else ["complete"]
+    deadline = time.monotonic() + wait_time
+    try:
+        loaded = wait_async(
+            driver,
+            WAIT_FOR_LOAD_SCRIPT,
+            (states, NETWORK_IDLE_MS if network_idle else 0),
+            wait_time,
+        )
+    except WebDriverException:
+        # ページ遷移でスクリプトが中断された場合など
+        loaded = None
+    if loaded is False:
+        raise TimeoutException(
+            f"Page did not finish loading within {wait_time} seconds"
+        )
+    if not loaded:
+        WebDriverWait(driver, max(0.0, deadline - time.monotonic())).until(
+            lambda d: d.execute_script("return document.readyState") in states
+        )
+
+
+def save_rows(
+    op: BaseOperation,
+    rows: List[Dict[str, Any]],
+    storage_key: str = "",
+    output_path: str = "",
+    encoding: str = "utf-8",
+) -> List[str]:
+    """取得した行（辞書）を変数・CSV に書き出し、列名の一覧を返す
+
+    列はすべての行のキーを最初に現れた順に並べる。CSV ではリストの値を
+    改行でつないだ1つのセルにする。
+    """
+    header: List[str] = []
+    for row in rows:
+        header.extend(key for key in row if key not in header)
+    if storage_key:
+        op.set_storage(storage_key, rows)
+        op.log(f"Stored {len(rows)} rows as '{storage_key}'")
+    if output_path:
+        output_path = os.path.expanduser(output_path)
+        _, values = normalize_rows(rows, header)
+        write_csv(
+            output_path,
+            header,
+            (
+                [
+                    "\n".join("" if v is None else str(v) for v in value)
+                    if isinstance(value, list)
+                    else value
+                    for value in row
+                ]
+                for row in values
+            ),
+            encoding,
+        )
+        op.log(f"Wrote {len(rows)} rows to CSV: {output_path}")
+    return header
+
+
+def invalidate_locators(op: BaseOperation, driver):
+    """ページ移動・更新・タブ切り替えの後に、ブラウザの要素キャッシュを捨てる"""
+    registry = op.run_resource(LOCATOR_CACHE_KEY, LocatorCacheRegistry)
+    if registry:
+        registry.invalidate(driver)
+
 
 class WebBrowserOpenOperation(BaseOperation):
-    """ブラウザを開く"""
+    """ブラウザを開く
+
+    use_pool=True（既定）の場合、閉じたブラウザを初期化して使い回すプールから
+    取り出すため、2回目以降は起動を待たない。warm_pool_size を指定すると、
+    同じ設定のブラウザをその数だけ裏で起動しておく。
+
+    page_load_strategy に eager を指定すると DOM の構築まで、none なら
+    待たずにページ移動を終える。block_resources（image・font・media）と
+    blocked_urls（"*" を含む URL パターン）で不要な読み込みを止められる。
+    wait_for_selector を指定すると、ページの読み込み完了ではなくその要素が
+    現れた時点で次に進む。
+    """
 
     async def execute(self, params: Dict[str, Any]) -> OperationResult:
         url = params.get("url", "")
@@ -28,6 +187,17 @@ class WebBrowserOpenOperation(BaseOperation):
         headless = params.get("headless", False)
         window_size = params.get("window_size", {"width": 1280, "height": 720})
         reference_id = params.get("reference_id", "")
+        use_pool = params.get("use_pool", True)
+        warm_pool_size = params.get("warm_pool_size", 0)
+        max_uses = params.get("max_uses", DEFAULT_MAX_USES)
+        page_load_strategy = params.get("page_load_strategy", "normal")
+        block_resources = params.get("block_resources") or []
+        blocked_urls = params.get("blocked_urls") or []
+        disable_extensions = params.get("disable_extensions", False)
+        disable_gpu = params.get("disable_gpu", False)
+        wait_for_selector = params.get("wait_for_selector", "")
+        selector_type = params.get("selector_type", "css")
+        wait_time = params.get("wait_time", 10)
 
         error = self.validate_params(params, ["url"])
         if error:
@@ -40,38 +210,71 @@ class WebBrowserOpenOperation(BaseOperation):
                 error="Web browser support not available. Install selenium.",
             )
 
+        if browser_type not in BROWSER_TYPES:
+            return OperationResult(
+                status="failure",
+                data={},
+                error=f"Unsupported browser type: {browser_type}",
+            )
+
         try:
-            # ブラウザドライバーを初期化
-            if browser_type == "chrome":
-                options = webdriver.ChromeOptions()
-                if headless:
-                    options.add_argument("--headless")
-                options.add_argument(
-                    f'--window-size={window_size["width"]},{window_size["height"]}'
-                )
-                driver = webdriver.Chrome(options=options)
-            elif browser_type == "firefox":
-                options = webdriver.FirefoxOptions()
-                if headless:
-                    options.add_argument("--headless")
-                driver = webdriver.Firefox(options=options)
-                driver.set_window_size(window_size["width"], window_size["height"])
-            else:
+            config = BrowserConfig(
+                browser_type,
+                bool(headless),
+                page_load_strategy,
+                tuple(block_resources),
+                bool(disable_extensions),
+                bool(disable_gpu),
+            )
+            if blocked_urls and not config.reusable:
                 return OperationResult(
                     status="failure",
                     data={},
-                    error=f"Unsupported browser type: {browser_type}",
+                    error="blocked_urls is only supported in Chrome",
                 )
+            # 参照IDがない場合もプールの貸し出し先を区別できるようにする
+            lease_id = reference_id or f"_unnamed_{uuid.uuid4().hex}"
+
+            # ブラウザドライバーを取得（プールがあれば起動済みのものを使う）
+            pool = self.run_resource(BROWSER_POOL_KEY, BrowserPool) if use_pool else None
+            if pool:
+                pool.max_uses = max_uses
+                pool.set_warm_size(config, warm_pool_size)
+                driver, reused = await asyncio.to_thread(pool.acquire, lease_id, config)
+            else:
+                driver = await asyncio.to_thread(launch_driver, config)
+                reused = False
 
-            # URLを開く
-            driver.get(url)
+            try:
+                driver.set_window_size(window_size["width"], window_size["height"])
+                block_urls(driver, config, blocked_urls)
+
+                # URLを開く
+                driver.get(url)
+            except Exception:
+                if pool:
+                    pool.release(lease_id, quit=True)
+                else:
+                    driver.quit()
+                raise
+
+            invalidate_locators(self, driver)
 
             # 参照IDでブラウザインスタンスを保存
             if reference_id:
                 self.set_storage(f"browser_{reference_id}", driver)
                 self.log(f"Browser saved with reference ID: {reference_id}")
 
-            self.log(f"Opened {url} in {browser_type}")
+            # 次のステップで使う要素が現れるまで待つ
+            if wait_for_selector:
+                locator_cache(self, driver).find(
+                    driver, selector_type, wait_for_selector, "presence", wait_time
+                )
+
+            self.log(
+                f"Opened {url} in {browser_type}"
+                + (" (reused pooled browser)" if reused else "")
+            )
 
             return OperationResult(
                 status="success",
@@ -80,6 +283,8 @@ class WebBrowserOpenOperation(BaseOperation):
                     "browser_type": browser_type,
                     "reference_id": reference_id,
                     "title": driver.title,
+                    "reused": reused,
+                    "page_load_strategy": page_load_strategy,
                 },
             )
         except Exception as e:
@@ -89,10 +294,15 @@ class WebBrowserOpenOperation(BaseOperation):
 
 
 class WebBrowserCloseOperation(BaseOperation):
-    """ブラウザを閉じる"""
+    """ブラウザを閉じる
+
+    プールから取り出したブラウザは終了せずに初期化してプールに戻す
+    （quit=True なら終了する）。
+    """
 
     async def execute(self, params: Dict[str, Any]) -> OperationResult:
         reference_id = params.get("reference_id", "")
+        quit_browser = params.get("quit", False)
 
         error = self.validate_params(params, ["reference_id"])
         if error:
@@ -108,16 +318,28 @@ class WebBrowserCloseOperation(BaseOperation):
                     error=f"Browser with reference ID '{reference_id}' not found",
                 )
 
-            # ブラウザを閉じる
-            driver.quit()
+            # ブラウザを閉じる（プールのものは返却する）
+            invalidate_locators(self, driver)
+            pool = self.run_resource(BROWSER_POOL_KEY, BrowserPool)
+            if pool and pool.owns(reference_id, driver):
+                returned = await asyncio.to_thread(
+                    pool.release, reference_id, quit_browser
+                )
+            else:
+                driver.quit()
+                returned = False
 
             # ストレージから削除
             self.delete_storage(f"browser_{reference_id}")
 
-            self.log(f"Closed browser with reference ID: {reference_id}")
+            self.log(
+                f"Closed browser with reference ID: {reference_id}"
+                + (" (returned to pool)" if returned else "")
+            )
 
             return OperationResult(
-                status="success", data={"reference_id": reference_id}
+                status="success",
+                data={"reference_id": reference_id, "returned_to_pool": returned},
             )
         except Exception as e:
             return OperationResult(
@@ -126,12 +348,22 @@ class WebBrowserCloseOperation(BaseOperation):
 
 
 class WebBrowserNavigateOperation(BaseOperation):
-    """ページ遷移"""
+    """ページ遷移
+
+    wait_for_selector を指定すると、ページの読み込み完了を待たず、その要素が
+    現れた時点で終える（見つけた要素は次のステップで使い回される）。
+    wait_for_network_idle=True なら、読み込み後の XHR・fetch などが
+    落ち着くまで待つ。
+    """
 
     async def execute(self, params: Dict[str, Any]) -> OperationResult:
         reference_id = params.get("reference_id", "")
         url = params.get("url", "")
         wait_for_load = params.get("wait_for_load", True)
+        wait_for_network_idle = params.get("wait_for_network_idle", False)
+        wait_for_selector = params.get("wait_for_selector", "")
+        selector_type = params.get("selector_type", "css")
+        wait_time = params.get("wait_time", 10)
 
         error = self.validate_params(params, ["reference_id", "url"])
         if error:
@@ -149,13 +381,15 @@ class WebBrowserNavigateOperation(BaseOperation):
 
             # URLに遷移
             driver.get(url)
+            invalidate_locators(self, driver)
 
-            # ページ読み込み待機
-            if wait_for_load:
-                WebDriverWait(driver, 10).until(
-                    lambda d: d.execute_script("return document.readyState")
-                    == "complete"
+            # ページ読み込み待機（要素の指定があればその要素が現れるまで）
+            if wait_for_selector:
+                locator_cache(self, driver).find(
+                    driver, selector_type, wait_for_selector, "presence", wait_time
                 )
+            elif wait_for_load or wait_for_network_idle:
+                wait_until_loaded(driver, wait_time, wait_for_network_idle)
 
             self.log(f"Navigated to {url}")
 
@@ -198,24 +432,15 @@ class WebBrowserClickOperation(BaseOperation):
                     error=f"Browser with reference ID '{reference_id}' not found",
                 )
 
-            # セレクタタイプに応じてBy設定
-            by_type = {
-                "css": By.CSS_SELECTOR,
-                "xpath": By.XPATH,
-                "id": By.ID,
-                "name": By.NAME,
-                "class": By.CLASS_NAME,
-                "tag": By.TAG_NAME,
-                "link_text": By.LINK_TEXT,
-                "partial_link_text": By.PARTIAL_LINK_TEXT,
-            }.get(selector_type, By.CSS_SELECTOR)
-
-            # 要素を待機して取得
-            wait = WebDriverWait(driver, wait_time)
-            element = wait.until(EC.element_to_be_clickable((by_type, selector)))
-
-            # クリック
-            element.click()
+            # 要素を待機してクリック（同じページで見つけた要素は使い回す）
+            locator_cache(self, driver).run(
+                driver,
+                selector_type,
+                selector,
+                lambda element: element.click(),
+                "clickable",
+                wait_time,
+            )
 
             self.log(f"Clicked element: {selector}")
 
@@ -254,26 +479,18 @@ class WebBrowserInputTextOperation(BaseOperation):
                     error=f"Browser with reference ID '{reference_id}' not found",
                 )
 
-            # セレクタタイプに応じてBy設定
-            by_type = {
-                "css": By.CSS_SELECTOR,
-                "xpath": By.XPATH,
-                "id": By.ID,
-                "name": By.NAME,
-                "class": By.CLASS_NAME,
-                "tag": By.TAG_NAME,
-            }.get(selector_type, By.CSS_SELECTOR)
-
-            # 要素を待機して取得
-            wait = WebDriverWait(driver, wait_time)
-            element = wait.until(EC.presence_of_element_located((by_type, selector)))
-
-            # 既存のテキストをクリア
-            if clear_before:
-                element.clear()
+            def input_text(element):
+                # 既存のテキストをクリア
+                if clear_before:
+                    element.clear()
+
+                # テキストを入力
+                element.send_keys(text)
 
-            # テキストを入力
-            element.send_keys(text)
+            # 要素を待機して入力（同じページで見つけた要素は使い回す）
+            locator_cache(self, driver).run(
+                driver, selector_type, selector, input_text, "presence", wait_time
+            )
 
             self.log(f"Input text to element: {selector}")
 
@@ -313,30 +530,22 @@ class WebBrowserSelectDropdownOperation(BaseOperation):
                     error=f"Browser with reference ID '{reference_id}' not found",
                 )
 
-            # セレクタタイプに応じてBy設定
-            by_type = {
-                "css": By.CSS_SELECTOR,
-                "xpath": By.XPATH,
-                "id": By.ID,
-                "name": By.NAME,
-                "class": By.CLASS_NAME,
-                "tag": By.TAG_NAME,
-            }.get(selector_type, By.CSS_SELECTOR)
-
-            # 要素を待機して取得
-            wait = WebDriverWait(driver, wait_time)
-            element = wait.until(EC.presence_of_element_located((by_type, selector)))
-
-            # Select要素として操作
-            select = Select(element)
-
-            # 選択方法に応じて選択
-            if select_by == "value":
-                select.select_by_value(select_value)
-            elif select_by == "text":
-                select.select_by_visible_text(select_value)
-            elif select_by == "index":
-                select.select_by_index(int(select_value))
+            def select_option(element):
+                # Select要素として操作
+                select = Select(element)
+
+                # 選択方法に応じて選択
+                if select_by == "value":
+                    select.select_by_value(select_value)
+                elif select_by == "text":
+                    select.select_by_visible_text(select_value)
+                elif select_by == "index":
+                    select.select_by_index(int(select_value))
+
+            # 要素を待機して選択（同じページで見つけた要素は使い回す）
+            locator_cache(self, driver).run(
+                driver, selector_type, selector, select_option, "presence", wait_time
+            )
 
             self.log(f"Selected dropdown option: {select_value}")
 
@@ -354,6 +563,187 @@ class WebBrowserSelectDropdownOperation(BaseOperation):
             )
 
 
+class WebBrowserFillFormOperation(BaseOperation):
+    """フォーム一括入力
+
+    items の各項目（selector, action, value）を1回のスクリプト実行でまとめて
+    操作し、WebDriver との通信を項目数によらず数回に抑える。スクリプトで
+    扱えない項目（ファイル選択、contenteditable、まだ表示されていない要素、
+    native=True を指定した項目）だけ、通常の操作と同じく要素を待って
+    WebDriver で入力する。
+
+    action は input・select・click・check・uncheck。select の選び方は
+    選択の操作と同じく by（value・text・index）で指定する。click の後は
+    ページが変わってもよいよう、次の項目から新しくスクリプトを実行する。
+    """
+
+    async def execute(self, params: Dict[str, Any]) -> OperationResult:
+        reference_id = params.get("reference_id", "")
+        raw_items = params.get("items", [])
+        clear_before = params.get("clear_before", True)
+        stop_on_error = params.get("stop_on_error", True)
+        wait_time = params.get("wait_time", 10)
+
+        error = self.validate_params(params, ["reference_id", "items"])
+        if error:
+            return OperationResult(status="failure", data={}, error=error)
+
+        try:
+            items = self._normalize_items(raw_items, clear_before)
+
+            # ブラウザインスタンスを取得
+            driver = self.get_storage(f"browser_{reference_id}")
+            if not driver:
+                return OperationResult(
+                    status="failure",
+                    data={},
+                    error=f"Browser with reference ID '{reference_id}' not found",
+                )
+
+            results = [
+                {
+                    "index": i,
+                    "selector": item["selector"],
+                    "action": item["action"],
+                    "status": "skipped",
+                    "method": None,
+                    "error": None,
+                }
+                for i, item in enumerate(items)
+            ]
+            script_calls = 0
+            index = 0
+            stopped = False
+            while index < len(items) and not stopped:
+                outcome = driver.execute_script(
+                    FILL_FORM_SCRIPT, items, index, stop_on_error
+                )
+                script_calls += 1
+                for done in outcome["results"]:
+                    result = results[done["index"]]
+                    result["method"] = "script"
+                    result["status"] = "failure" if done["error"] else "success"
+                    result["error"] = done["error"]
+                    stopped = stopped or bool(done["error"] and stop_on_error)
+                index = outcome["next"]
+                if stopped or not outcome["native"]:
+                    continue
+
+                # スクリプトで扱えない項目は WebDriver で操作する
+                result = results[index]
+                result["method"] = "native"
+                try:
+                    self._native_action(
+                        driver, locator_cache(self, driver), items[index], wait_time
+                    )
+                    result["status"] = "success"
+                except Exception as e:
+                    result["status"] = "failure"
+                    result["error"] = str(e)
+                    stopped = stop_on_error
+                index += 1
+
+            failed = [result for result in results if result["status"] == "failure"]
+            succeeded = sum(1 for result in results if result["status"] == "success")
+            native = sum(1 for result in results if result["method"] == "native")
+            data = {
+                "items": results,
+                "succeeded": succeeded,
+                "failed": len(failed),
+                "script_calls": script_calls,
+                "native_items": native,
+            }
+            self.log(
+                f"Filled {succeeded}/{len(items)} form items "
+                f"({script_calls} script calls, {native} native)"
+            )
+
+            if failed:
+                first = failed[0]
+                message = (
+                    f"Item {first['index']} ({first['selector']}) failed: {first['error']}"
+                )
+                if stop_on_error:
+                    return OperationResult(status="failure", data=data, error=message)
+                return OperationResult(
+                    status="warning",
+                    data=data,
+                    error=f"{len(failed)} items failed and were skipped. {message}",
+                )
+            return OperationResult(status="success", data=data)
+        except Exception as e:
+            return OperationResult(
+                status="failure", data={}, error=f"Failed to fill form: {str(e)}"
+            )
+
+    @staticmethod
+    def _normalize_items(raw_items, clear_before: bool):
+        """項目を辞書のリストにそろえる（[selector, action, value] も受け付ける）"""
+        items = []
+        for raw in raw_items:
+            if isinstance(raw, dict):
+                item = dict(raw)
+            elif isinstance(raw, (list, tuple)) and 1 <= len(raw) <= 3:
+                item = dict(zip(("selector", "action", "value"), raw, strict=False))
+            else:
+                raise ValueError(f"Invalid form item: {raw}")
+            if not item.get("selector"):
+                raise ValueError(f"Missing selector in form item: {raw}")
+            action = item.get("action") or "input"
+            if action not in FILL_ACTIONS:
+                raise ValueError(
+                    f"Unknown action: {action} (expected one of {', '.join(FILL_ACTIONS)})"
+                )
+            value = item.get("value")
+            items.append(
+                {
+                    "selector": str(item["selector"]),
+                    "selector_type": item.get("selector_type") or "css",
+                    "action": action,
+                    "value": "" if value is None else str(value),
+                    "by": item.get("by") or "value",
+                    "clear_before": item.get("clear_before", clear_before),
+                    "native": bool(item.get("native", False)),
+                }
+            )
+        return items
+
+    @staticmethod
+    def _native_action(
+        driver, locators: LocatorCache, item: Dict[str, Any], wait_time: float
+    ):
+        action = item["action"]
+        condition = "clickable" if action == "click" else "presence"
+        locators.run(
+            driver,
+            item["selector_type"],
+            item["selector"],
+            lambda element: WebBrowserFillFormOperation._apply_native(element, item),
+            condition,
+            wait_time,
+        )
+
+    @staticmethod
+    def _apply_native(element, item: Dict[str, Any]):
+        action = item["action"]
+        if action == "click":
+            element.click()
+        elif action == "input":
+            if item["clear_before"]:
+                element.clear()
+            element.send_keys(item["value"])
+        elif action == "select":
+            select = Select(element)
+            if item["by"] == "text":
+                select.select_by_visible_text(item["value"])
+            elif item["by"] == "index":
+                select.select_by_index(int(item["value"]))
+            else:
+                select.select_by_value(item["value"])
+        elif element.is_selected() != (action == "check"):
+            element.click()
+
+
 class WebBrowserGetTextOperation(BaseOperation):
     """テキスト取得"""
 
@@ -378,22 +768,15 @@ class WebBrowserGetTextOperation(BaseOperation):
                     error=f"Browser with reference ID '{reference_id}' not found",
                 )
 
-            # セレクタタイプに応じてBy設定
-            by_type = {
-                "css": By.CSS_SELECTOR,
-                "xpath": By.XPATH,
-                "id": By.ID,
-                "name": By.NAME,
-                "class": By.CLASS_NAME,
-                "tag": By.TAG_NAME,
-            }.get(selector_type, By.CSS_SELECTOR)
-
-            # 要素を待機して取得
-            wait = WebDriverWait(driver, wait_time)
-            element = wait.until(EC.presence_of_element_located((by_type, selector)))
-
-            # テキストを取得
-            text = element.text
+            # 要素を待機してテキストを取得（同じページで見つけた要素は使い回す）
+            text = locator_cache(self, driver).run(
+                driver,
+                selector_type,
+                selector,
+                lambda element: element.text,
+                "presence",
+                wait_time,
+            )
 
             # ストレージに保存
             if storage_key:
@@ -413,7 +796,11 @@ class WebBrowserGetTextOperation(BaseOperation):
 
 
 class WebBrowserWaitForElementOperation(BaseOperation):
-    """要素待機"""
+    """要素待機
+
+    wait_strategy が observer（既定）なら、ページ内で DOM の変化を監視し、
+    条件を満たした時点で戻る。poll なら WebDriverWait で 0.5 秒ごとに調べる。
+    """
 
     async def execute(self, params: Dict[str, Any]) -> OperationResult:
         reference_id = params.get("reference_id", "")
@@ -423,6 +810,7 @@ class WebBrowserWaitForElementOperation(BaseOperation):
             "wait_condition", "presence"
         )  # presence, visible, clickable
         wait_time = params.get("wait_time", 30)
+        wait_strategy = params.get("wait_strategy", "observer")
 
         error = self.validate_params(params, ["reference_id", "selector"])
         if error:
@@ -438,31 +826,30 @@ class WebBrowserWaitForElementOperation(BaseOperation):
                     error=f"Browser with reference ID '{reference_id}' not found",
                 )
 
-            # セレクタタイプに応じてBy設定
-            by_type = {
-                "css": By.CSS_SELECTOR,
-                "xpath": By.XPATH,
-                "id": By.ID,
-                "name": By.NAME,
-                "class": By.CLASS_NAME,
-                "tag": By.TAG_NAME,
-            }.get(selector_type, By.CSS_SELECTOR)
-
-            # 待機条件を設定
-            wait = WebDriverWait(driver, wait_time)
-            if wait_condition == "presence":
-                wait.until(EC.presence_of_element_located((by_type, selector)))
-            elif wait_condition == "visible":
-                wait.until(EC.visibility_of_element_located((by_type, selector)))
-            elif wait_condition == "clickable":
-                wait.until(EC.element_to_be_clickable((by_type, selector)))
-            else:
+            if wait_condition not in WAIT_CONDITIONS:
                 return OperationResult(
                     status="failure",
                     data={},
                     error=f"Unknown wait condition: {wait_condition}",
                 )
 
+            if wait_strategy not in WAIT_STRATEGIES:
+                return OperationResult(
+                    status="failure",
+                    data={},
+                    error=f"Unknown wait strategy: {wait_strategy}",
+                )
+
+            # 条件を満たすまで待機（見つけた要素は後続の操作で使い回す）
+            locator_cache(self, driver).find(
+                driver,
+                selector_type,
+                selector,
+                wait_condition,
+                wait_time,
+                wait_strategy,
+            )
+
             self.log(f"Element found: {selector}")
 
             return OperationResult(
@@ -470,6 +857,7 @@ class WebBrowserWaitForElementOperation(BaseOperation):
                 data={
                     "selector": selector,
                     "wait_condition": wait_condition,
+                    "wait_strategy": wait_strategy,
                     "element_found": True,
                 },
             )
@@ -511,18 +899,17 @@ class WebBrowserScrollOperation(BaseOperation):
                 self.log(f"Scrolled {scroll_amount} pixels")
 
             elif scroll_type == "element" and selector:
-                # 特定の要素までスクロール
-                by_type = {
-                    "css": By.CSS_SELECTOR,
-                    "xpath": By.XPATH,
-                    "id": By.ID,
-                    "name": By.NAME,
-                    "class": By.CLASS_NAME,
-                    "tag": By.TAG_NAME,
-                }.get(selector_type, By.CSS_SELECTOR)
-
-                element = driver.find_element(by_type, selector)
-                driver.execute_script("arguments[0].scrollIntoView(true);", element)
+                # 特定の要素までスクロール（待たずに探す）
+                locator_cache(self, driver).run(
+                    driver,
+                    selector_type,
+                    selector,
+                    lambda element: driver.execute_script(
+                        "arguments[0].scrollIntoView(true);", element
+                    ),
+                    "presence",
+                    0,
+                )
                 self.log(f"Scrolled to element: {selector}")
 
             elif scroll_type == "bottom":
@@ -704,6 +1091,8 @@ class WebBrowserSwitchTabOperation(BaseOperation):
                     error="Either tab_index or tab_handle must be specified",
                 )
 
+            invalidate_locators(self, driver)
+
             self.log("Switched to tab")
 
             return OperationResult(
@@ -743,13 +1132,11 @@ class WebBrowserRefreshOperation(BaseOperation):
 
             # ページを更新
             driver.refresh()
+            invalidate_locators(self, driver)
 
             # ページ読み込み待機
             if wait_for_load:
-                WebDriverWait(driver, 10).until(
-                    lambda d: d.execute_script("return document.readyState")
-                    == "complete"
-                )
+                wait_until_loaded(driver)
 
             self.log("Page refreshed")
 
@@ -761,3 +1148,281 @@ class WebBrowserRefreshOperation(BaseOperation):
             return OperationResult(
                 status="failure", data={}, error=f"Failed to refresh page: {str(e)}"
             )
+
+
+class WebBrowserScrapeOperation(BaseOperation):
+    """URL一覧から一括取得
+
+    urls（または urls_key で指定した変数）の各ページを開き、fields の
+    セレクタで指定した項目の値を1行ずつ取り出す。concurrency 個のブラウザを
+    プールから借りて並列に取得し、失敗したページ（どの項目も見つからない
+    ページを含む）は retries 回までやり直す。ページの読み込みは wait_time 秒で
+    打ち切る。結果は入力と同じ順序で storage_key の変数（辞書のリスト）と
+    output_path の CSV に書き出す。
+
+    fields は {項目名: セレクタ} か {項目名: {selector, selector_type,
+    attribute, multiple}}。attribute は "text"（既定）・"html"・属性名。
+    urls の要素が辞書の場合は url_column の列を URL とし、ほかの列も
+    結果の行に残す。
+    """
+
+    async def execute(self, params: Dict[str, Any]) -> OperationResult:
+        urls = params.get("urls")
+        urls_key = params.get("urls_key", "")
+        url_column = params.get("url_column", "url")
+        fields = params.get("fields", {})
+        concurrency = params.get("concurrency", DEFAULT_CONCURRENCY)
+        retries = params.get("retries", DEFAULT_RETRIES)
+        retry_delay = params.get("retry_delay", DEFAULT_RETRY_DELAY)
+        browser_type = params.get("browser_type", "chrome")
+        headless = params.get("headless", True)
+        use_pool = params.get("use_pool", True)
+        page_load_strategy = params.get("page_load_strategy", "normal")
+        block_resources = params.get("block_resources") or []
+        blocked_urls = params.get("blocked_urls") or []
+        disable_extensions = params.get("disable_extensions", False)
+        disable_gpu = params.get("disable_gpu", False)
+        wait_for_selector = params.get("wait_for_selector", "")
+        selector_type = params.get("selector_type", "css")
+        wait_time = params.get("wait_time", 10)
+        storage_key = params.get("storage_key", "")
+        output_path = params.get("output_path", "")
+        encoding = params.get("encoding", "utf-8")
+
+        error = self.validate_params(params, ["fields"])
+        if error:
+            return OperationResult(status="failure", data={}, error=error)
+
+        if not SELENIUM_AVAILABLE:
+            return OperationResult(
+                status="failure",
+                data={},
+                error="Web browser support not available. Install selenium.",
+            )
+
+        try:
+            if urls_key:
+                urls = self.get_storage(urls_key)
+                if urls is None:
+                    raise ValueError(f"No data stored under key: {urls_key}")
+            elif not urls:
+                raise ValueError("Missing required parameter: urls")
+            items = url_items(urls, url_column)
+            config = BrowserConfig(
+                browser_type,
+                bool(headless),
+                page_load_strategy,
+                tuple(block_resources),
+                bool(disable_extensions),
+                bool(disable_gpu),
+            )
+            if blocked_urls and not config.reusable:
+                raise ValueError("blocked_urls is only supported in Chrome")
+
+            scraper = Scraper(
+                config,
+                normalize_fields(fields),
+                self.run_resource(BROWSER_POOL_KEY, BrowserPool) if use_pool else None,
+                blocked_urls,
+                wait_for_selector,
+                selector_type,
+                wait_time,
+                retries,
+                retry_delay,
+            )
+            started = time.monotonic()
+            results = await asyncio.to_thread(scraper.run, items, concurrency)
+            elapsed = time.monotonic() - started
+
+            rows = [result.row for result in results if result.row is not None]
+            failed = [
+                {"url": result.url, "error": result.error, "attempts": result.attempts}
+                for result in results
+                if result.row is None
+            ]
+            header = save_rows(self, rows, storage_key, output_path, encoding)
+
+            self.log(
+                f"Scraped {len(rows)}/{len(items)} pages in {elapsed:.1f}s "
+                f"({scraper.browsers} browsers)"
+            )
+
+            truncated = len(rows) > RESULT_PREVIEW_ROWS
+            data = {
+                "header": header,
+                "rows": rows[:RESULT_PREVIEW_ROWS] if truncated else rows,
+                "row_count": len(rows),
+                "truncated": truncated,
+                "failed": failed,
+                "browsers": scraper.browsers,
+                "elapsed_seconds": round(elapsed, 3),
+                "storage_key": storage_key,
+                "output_path": output_path,
+            }
+            if failed:
+                message = f"Failed to scrape {failed[0]['url']}: {failed[0]['error']}"
+                if not rows:
+                    return OperationResult(status="failure", data=data, error=message)
+                return OperationResult(
+                    status="warning",
+                    data=data,
+                    error=f"{len(failed)} pages failed and were skipped. {message}",
+                )
+            return OperationResult(status="success", data=data)
+        except Exception as e:
+            return OperationResult(
+                status="failure", data={}, error=f"Failed to scrape pages: {str(e)}"
+            )
+
+
+class WebBrowserExtractTableOperation(BaseOperation):
+    """表取得
+
+    selector の表（table 要素）を1回のスクリプト実行で列名と行に読み取り、
+    辞書のリストとして storage_key の変数と output_path の CSV に書き出す。
+    div などで組んだグリッドは row_selector（と cell_selector・
+    header_selector）で行とセルを指定する。
+
+    next_selector を指定すると、読み取りと同じスクリプトで「次へ」を
+    クリックし、表の内容が変わるのを待って次のページを読み取る。
+    「次へ」がない・無効になった、max_pages に達した、wait_time 秒待っても
+    表が変わらない、のいずれかで終える。
+    """
+
+    async def execute(self, params: Dict[str, Any]) -> OperationResult:
+        reference_id = params.get("reference_id", "")
+        selector = params.get("selector", "table")
+        selector_type = params.get("selector_type", "css")
+        row_selector = params.get("row_selector", "")
+        cell_selector = params.get("cell_selector", "")
+        header_selector = params.get("header_selector", "")
+        next_selector = params.get("next_selector", "")
+        next_selector_type = params.get("next_selector_type", "css")
+        max_pages = params.get("max_pages", DEFAULT_MAX_PAGES)
+        wait_time = params.get("wait_time", 10)
+        storage_key = params.get("storage_key", "")
+        output_path = params.get("output_path", "")
+        encoding = params.get("encoding", "utf-8")
+
+        error = self.validate_params(params, ["reference_id"])
+        if error:
+            return OperationResult(status="failure", data={}, error=error)
+
+        try:
+            # ブラウザインスタンスを取得
+            driver = self.get_storage(f"browser_{reference_id}")
+            if not driver:
+                return OperationResult(
+                    status="failure",
+                    data={},
+                    error=f"Browser with reference ID '{reference_id}' not found",
+                )
+
+            spec = {
+                "selector": selector or "table",
+                "selector_type": selector_type,
+                "row_selector": row_selector,
+                "cell_selector": cell_selector or ":scope > *",
+                "header_selector": header_selector,
+                "next_selector": next_selector,
+                "next_selector_type": next_selector_type,
+            }
+            max_pages = max(1, int(max_pages))
+
+            try:
+                page = self._read_page(driver, spec, None, max_pages > 1, wait_time)
+            except TimeoutException:
+                raise ValueError(f"Table not found: {selector}") from None
+            headers = page["headers"]
+            width = max([len(headers)] + [len(row) for row in page["rows"]])
+            pages = [page["rows"]]
+            stopped = "last_page"
+            while page["has_next"]:
+                if len(pages) >= max_pages:
+                    stopped = "max_pages"
+                    break
+                try:
+                    page = self._read_page(
+                        driver,
+                        spec,
+                        page["signature"],
+                        len(pages) + 1 < max_pages,
+                        wait_time,
+                    )
+                except TimeoutException:
+                    # クリックしても表が変わらない場合は最後のページとみなす
+                    stopped = "timeout"
+                    break
+                width = max([width] + [len(row) for row in page["rows"]])
+                pages.append(page["rows"])
+
+            # ページ移動で古くなった要素を使わないようにする
+            if len(pages) > 1:
+                invalidate_locators(self, driver)
+
+            columns = self._column_names(headers, width)
+            rows = [
+                dict(zip(columns, row + [""] * (width - len(row)), strict=True))
+                for page_rows in pages
+                for row in page_rows
+            ]
+            save_rows(self, rows, storage_key, output_path, encoding)
+
+            self.log(f"Extracted {len(rows)} rows from {len(pages)} pages: {selector}")
+
+            truncated = len(rows) > RESULT_PREVIEW_ROWS
+            data = {
+                "selector": selector,
+                "headers": columns,
+                "rows": rows[:RESULT_PREVIEW_ROWS] if truncated else rows,
+                "row_count": len(rows),
+                "truncated": truncated,
+                "pages": len(pages),
+                "stopped": stopped,
+                "storage_key": storage_key,
+                "output_path": output_path,
+            }
+            if stopped == "timeout":
+                return OperationResult(
+                    status="warning",
+                    data=data,
+                    error=f"Table did not change within {wait_time} seconds after "
+                    f"clicking next; stopped at page {len(pages)}",
+                )
+            return OperationResult(status="success", data=data)
+        except Exception as e:
+            return OperationResult(
+                status="failure", data={}, error=f"Failed to extract table: {str(e)}"
+            )
+
+    @staticmethod
+    def _read_page(driver, spec, previous, click_next: bool, wait_time: float):
+        """表が現れる（前のページから変わる）まで待って読み取る
+
+        ページ遷移で中断されたスクリプトは、読み込みを待つ間のものとして
+        やり直す。それ以外の WebDriver のエラーはそのまま送出する。
+        """
+
+        def read(d):
+            try:
+                return d.execute_script(EXTRACT_TABLE_SCRIPT, spec, previous, click_next)
+            except WebDriverException as e:
+                if is_page_change_error(e):
+                    return None
+                raise
+
+        return WebDriverWait(driver, wait_time).until(read)
+
+    @staticmethod
+    def _column_names(headers: List[str], width: int) -> List[str]:
+        """列名をそろえる（空の列名は「列n」、重複は「名前_2」のように番号を付ける）"""
+        columns: List[str] = []
+        for i in range(width):
+            name = (headers[i] if i < len(headers) else "") or f"列{i + 1}"
+            unique = name
+            n = 2
+            while unique in columns:
+                unique = f"{name}_{n}"
+                n += 1
+            columns.append(unique)
+        return columns
@@ -0,0 +1,239 @@
+"""
+ブラウザごとの要素の検索結果のキャッシュ
+
+同じページで同じセレクタの要素を続けて操作する場合（一覧のページ送りなど）、
+前回見つけた要素をそのまま使い、WebDriverWait による検索を省く。
+キャッシュは (selector_type, selector) をキーにブラウザごとに持ち、
+ページ移動・更新・タブ切り替えで捨てる。キャッシュした要素を使う前に、
+今のページでもセレクタの最初の要素かをスクリプト1回で確かめ、違えば
+検索し直す（同じページのまま一覧が並べ替わった場合など）。操作中に要素が
+StaleElementReferenceException になった場合も1回だけ検索し直す。
+
+要素の出現は、ページ内の MutationObserver が条件を満たした時点で返る
+execute_async_script で待つ（WebDriverWait の 0.5 秒ごとの問い合わせによる
+遅れをなくす）。スクリプトが使えない・ページ遷移で中断された場合は、
+残りの時間を WebDriverWait の問い合わせで待つ。
+"""
+
+import threading
+import time
+import weakref
+from typing import Any, Callable, Dict, Sequence, Tuple
+
+from .web_scripts import CACHED_ELEMENT_CHECK_SCRIPT, WAIT_FOR_ELEMENT_SCRIPT
+
+try:
+    from selenium.common.exceptions import (
+        StaleElementReferenceException,
+        TimeoutException,
+        WebDriverException,
+    )
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    SELENIUM_AVAILABLE = True
+except ImportError:
+    SELENIUM_AVAILABLE = False
+
+# OperationManager の実行リソースとして登録する際のキー
+LOCATOR_CACHE_KEY = "web_locator_cache"
+
+# selector_type と By の値（By.CSS_SELECTOR など）の対応
+SELECTOR_TYPES = {
+    "css": "css selector",
+    "xpath": "xpath",
+    "id": "id",
+    "name": "name",
+    "class": "class name",
+    "tag": "tag name",
+    "link_text": "link text",
+    "partial_link_text": "partial link text",
+}
+
+WAIT_CONDITIONS = ("presence", "visible", "clickable")
+
+# 要素の待ち方（observer: ページ内で変化を待つ、poll: WebDriverWait で問い合わせる）
+WAIT_STRATEGIES = ("observer", "poll")
+
+# execute_async_script 1回で待つ時間の上限（秒）
+# WebDriver の既定のスクリプトタイムアウト（30秒）を超えないよう分けて待つ
+ASYNC_WAIT_CHUNK = 10
+
+
+def by_type(selector_type: str) -> str:
+    """selector_type を By の値にする（不明な種類は CSS セレクタ）"""
+    return SELECTOR_TYPES.get(selector_type, SELECTOR_TYPES["css"])
+
+
+def wait_async(driver, script: str, args: Sequence[Any], wait_time: float) -> Any:
+    """ページ内で条件を待つスクリプトを実行し、その結果を返す
+
+    スクリプトは args に続けて待つ時間（ミリ秒）を受け取り、条件を満たせば
+    その値を、時間内に満たさなければ null を返すこと。
+    """
+    deadline = time.monotonic() + wait_time
+    while True:
+        remaining = max(0.0, deadline - time.monotonic())
+        chunk = min(remaining, ASYNC_WAIT_CHUNK)
+        result = driver.execute_async_script(script, *args, int(chunk * 1000))
+        if result or remaining <= ASYNC_WAIT_CHUNK:
+            return result
+
+
+def wait_for_element(
+    driver,
+    selector_type: str,
+    selector: str,
+    condition: str,
+    wait_time: float,
+    strategy: str = "observer",
+):
+    """条件を満たすまで要素を待って返す"""
+    locator = (by_type(selector_type), selector)
+    if condition == "visible":
+        expected = EC.visibility_of_element_located(locator)
+    elif condition == "clickable":
+        expected = EC.element_to_be_clickable(locator)
+    elif condition == "presence":
+        expected = EC.presence_of_element_located(locator)
+    else:
+        raise ValueError(f"Unknown wait condition: {condition}")
+    if strategy not in WAIT_STRATEGIES:
+        raise ValueError(
+            f"Unknown wait strategy: {strategy} (expected one of {', '.join(WAIT_STRATEGIES)})"
+        )
+
+    deadline = time.monotonic() + wait_time
+    if strategy == "observer":
+        element = _observe(driver, selector_type, selector, condition, wait_time)
+        if element is not None:
+            return element
+    return WebDriverWait(driver, max(0.0, deadline - time.monotonic())).until(expected)
+
+
+def _observe(
+    driver, selector_type: str, selector: str, condition: str, wait_time: float
+):
+    """MutationObserver で要素を待つ（ポーリングで待ち直す必要があれば None）"""
+    try:
+        element = wait_async(
+            driver,
+            WAIT_FOR_ELEMENT_SCRIPT,
+            (selector_type, selector, condition),
+            wait_time,
+        )
+    except WebDriverException:
+        # ページ遷移でスクリプトが中断された場合など
+        return None
+    if element is None:
+        raise TimeoutException(f"Condition '{condition}' not met: {selector}")
+    # 表示の判定はブラウザ側の簡易なものなので、WebDriver の判定で確かめる
+    try:
+        if _satisfies(element, condition):
+            return element
+    except StaleElementReferenceException:
+        pass
+    return None
+
+
+def _satisfies(element, condition: str) -> bool:
+    # presence は要素を使う時点で確かめられるため、ここでは通信しない
+    if condition == "visible":
+        return element.is_displayed()
+    if condition == "clickable":
+        return element.is_displayed() and element.is_enabled()
+    return True
+
+
+class LocatorCache:
+    """1つのブラウザで見つけた要素を保持する"""
+
+    def __init__(self):
+        self._elements: Dict[Tuple[str, str], Any] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def find(
+        self,
+        driver,
+        selector_type: str,
+        selector: str,
+        condition: str = "presence",
+        wait_time: float = 10,
+        strategy: str = "observer",
+    ):
+        """要素を返す
+
+        キャッシュした要素が今もセレクタの最初の要素で、条件を満たせば
+        検索しない。
+        """
+        key = (selector_type, selector)
+        element = self._elements.get(key)
+        if element is not None:
+            try:
+                if driver.execute_script(
+                    CACHED_ELEMENT_CHECK_SCRIPT, element, selector_type, selector
+                ) and _satisfies(element, condition):
+                    self.hits += 1
+                    return element
+            except StaleElementReferenceException:
+                pass
+            del self._elements[key]
+        self.misses += 1
+        element = wait_for_element(
+            driver, selector_type, selector, condition, wait_time, strategy
+        )
+        self._elements[key] = element
+        return element
+
+    def run(
+        self,
+        driver,
+        selector_type: str,
+        selector: str,
+        action: Callable[[Any], Any],
+        condition: str = "presence",
+        wait_time: float = 10,
+    ):
+        """要素に action を行う（要素が古くなっていたら1回だけ検索し直す）"""
+        element = self.find(driver, selector_type, selector, condition, wait_time)
+        try:
+            return action(element)
+        except StaleElementReferenceException:
+            self._elements.pop((selector_type, selector), None)
+            element = self.find(driver, selector_type, selector, condition, wait_time)
+            return action(element)
+
+    def invalidate(self):
+        self._elements.clear()
+
+
+class LocatorCacheRegistry:
+    """ブラウザ（WebDriver）ごとの LocatorCache
+
+    閉じたブラウザのキャッシュが残らないよう、WebDriver への弱参照で持つ。
+    実行終了時にはすべて捨てる（次の実行までにページが変わりうるため）。
+    """
+
+    def __init__(self):
+        self._caches: weakref.WeakKeyDictionary[Any, LocatorCache] = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+
+    def get(self, driver) -> LocatorCache:
+        with self._lock:
+            cache = self._caches.get(driver)
+            if cache is None:
+                cache = self._caches[driver] = LocatorCache()
+            return cache
+
+    def invalidate(self, driver):
+        with self._lock:
+            cache = self._caches.get(driver)
+            if cache is not None:
+                cache.invalidate()
+
+    def finish_run(self):
+        with self._lock:
+            self._caches.clear()
@@ -0,0 +1,235 @@
+"""
+URL の一覧からのページ一括取得
+
+URL をキューに入れ、concurrency 個のスレッドがそれぞれブラウザを1つ
+プールから借りて順に取り出す。ページごとの値の取り出しは
+EXTRACT_FIELDS_SCRIPT の1回の execute_script で行い、要素ごとに
+WebDriver と通信しない。
+
+Selenium の1つのセッションは同時に1つのコマンドしか処理できず、タブを
+増やしても並列にはならないため、並列化はブラウザ単位で行う。
+"""
+
+import contextlib
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .browser_pool import BrowserConfig, block_urls, driver_alive, launch_driver
+from .web_locator import SELECTOR_TYPES, wait_for_element
+from .web_scripts import EXTRACT_FIELDS_SCRIPT
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_RETRIES = 2
+
+# 再試行までの待ち時間（秒、試行回数に比例して延ばす）
+DEFAULT_RETRY_DELAY = 1.0
+
+# WebDriver のページ読み込みタイムアウトの既定値（秒）
+# 借りたブラウザの値を読めなかった場合は、返却時にこの値に戻す
+DEFAULT_PAGE_LOAD_TIMEOUT = 300
+
+
+class EmptyPageError(Exception):
+    """どの項目も見つからなかった（読み込みが終わっていない可能性がある）"""
+
+
+def normalize_fields(fields: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """抽出指定を EXTRACT_FIELDS_SCRIPT に渡す形にそろえる
+
+    fields は {項目名: セレクタ} か {項目名: {selector, selector_type,
+    attribute, multiple}}。attribute の既定は "text"。
+    """
+    if not isinstance(fields, dict) or not fields:
+        raise ValueError("fields must be a non-empty dict of {name: selector}")
+    normalized = []
+    for name, spec in fields.items():
+        if isinstance(spec, str):
+            spec = {"selector": spec}
+        if not isinstance(spec, dict) or not spec.get("selector"):
+            raise ValueError(f"Missing selector in field: {name}")
+        selector_type = spec.get("selector_type") or "css"
+        if selector_type not in SELECTOR_TYPES:
+            raise ValueError(
+                f"Unknown selector_type in field '{name}': {selector_type}"
+            )
+        normalized.append(
+            {
+                "name": str(name),
+                "selector": str(spec["selector"]),
+                "selector_type": selector_type,
+                "attribute": spec.get("attribute") or "text",
+                "multiple": bool(spec.get("multiple", False)),
+            }
+        )
+    return normalized
+
+
+def url_items(
+    items: Iterable[Any], url_column: str = "url"
+) -> List[Tuple[str, Dict[str, Any]]]:
+    """URL の一覧を (URL, 結果の行の初期値) のリストにする
+
+    辞書の行（CSV読み込みの結果など）は url_column の列を URL とし、
+    ほかの列も結果の行に残す。文字列の場合は {url_column: URL} から始める。
+    """
+    if isinstance(items, (str, bytes, dict)):
+        raise ValueError("urls must be a list of URLs or a list of dicts")
+    result = []
+    for item in items:
+        if isinstance(item, dict):
+            url = item.get(url_column)
+            base = dict(item)
+        else:
+            url = item
+            base = {url_column: item}
+        if not url:
+            raise ValueError(f"Missing URL in item: {item}")
+        result.append((str(url), base))
+    return result
+
+
+@dataclass
+class PageResult:
+    """1ページの取得結果"""
+
+    index: int
+    url: str
+    row: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    attempts: int = 0
+
+
+class Scraper:
+    """ブラウザを並列に使って、URL ごとに項目の値を取り出す"""
+
+    def __init__(
+        self,
+        config: BrowserConfig,
+        fields: List[Dict[str, Any]],
+        pool=None,
+        blocked_urls: Iterable[str] = (),
+        wait_for_selector: str = "",
+        selector_type: str = "css",
+        wait_time: float = 10,
+        retries: int = DEFAULT_RETRIES,
+        retry_delay: float = DEFAULT_RETRY_DELAY,
+    ):
+        self.config = config
+        self.fields = fields
+        self.pool = pool
+        self.blocked_urls = list(blocked_urls)
+        self.wait_for_selector = wait_for_selector
+        self.selector_type = selector_type
+        self.wait_time = wait_time
+        self.retries = max(0, int(retries))
+        self.retry_delay = retry_delay
+        self.browsers = 0
+        # 貸し出しごとの、借りた時点のページ読み込みタイムアウト（返却時に戻す）
+        self._page_load_timeouts: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def run(
+        self, items: List[Tuple[str, Dict[str, Any]]], concurrency: int
+    ) -> List[PageResult]:
+        """すべての URL を取得し、入力と同じ順序で結果を返す"""
+        pending: queue.SimpleQueue[int] = queue.SimpleQueue()
+        for index in range(len(items)):
+            pending.put(index)
+        results: List[Optional[PageResult]] = [None] * len(items)
+        workers = max(1, min(int(concurrency), len(items)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(self._work, items, pending, results)
+                for _ in range(workers)
+            ]
+            for future in futures:
+                future.result()
+        return results
+
+    def _work(self, items, pending, results):
+        """キューが空になるまで、1つのブラウザで URL を順に取得する"""
+        lease_id = f"_scrape_{uuid.uuid4().hex}"
+        driver = None
+        try:
+            while True:
+                try:
+                    index = pending.get_nowait()
+                except queue.Empty:
+                    return
+                url, base = items[index]
+                result = PageResult(index, url)
+                while result.row is None and result.attempts <= self.retries:
+                    if result.attempts:
+                        time.sleep(self.retry_delay * result.attempts)
+                    result.attempts += 1
+                    try:
+                        if driver is None:
+                            driver = self._acquire(lease_id)
+                        result.row = {**base, **self._scrape(driver, url)}
+                        result.error = None
+                    except Exception as e:
+                        result.error = str(e)
+                        # 落ちたブラウザは捨て、次の試行で借り直す
+                        if driver is not None and not driver_alive(driver):
+                            self._release(lease_id, driver, quit=True)
+                            driver = None
+                results[index] = result
+        finally:
+            if driver is not None:
+                self._release(lease_id, driver)
+
+    def _acquire(self, lease_id: str):
+        if self.pool:
+            driver, _ = self.pool.acquire(lease_id, self.config)
+        else:
+            driver = launch_driver(self.config)
+        with self._lock:
+            self.browsers += 1
+        try:
+            block_urls(driver, self.config, self.blocked_urls)
+            # 読み込みが終わらないページで wait_time を超えて待たないようにする
+            try:
+                original = driver.timeouts.page_load
+            except Exception:
+                original = DEFAULT_PAGE_LOAD_TIMEOUT
+            self._page_load_timeouts[lease_id] = original
+            driver.set_page_load_timeout(self.wait_time)
+        except Exception:
+            self._release(lease_id, driver, quit=True)
+            raise
+        return driver
+
+    def _release(self, lease_id: str, driver, quit: bool = False):
+        original = self._page_load_timeouts.pop(lease_id, None)
+        if self.pool:
+            if not quit and original is not None:
+                # プールに戻すブラウザは、ほかの操作のために元の値に戻す
+                try:
+                    driver.set_page_load_timeout(original)
+                except Exception:
+                    quit = True
+            self.pool.release(lease_id, quit=quit)
+        else:
+            with contextlib.suppress(Exception):
+                driver.quit()
+
+    def _scrape(self, driver, url: str) -> Dict[str, Any]:
+        driver.get(url)
+        if self.wait_for_selector:
+            wait_for_element(
+                driver,
+                self.selector_type,
+                self.wait_for_selector,
+                "presence",
+                self.wait_time,
+            )
+        row = driver.execute_script(EXTRACT_FIELDS_SCRIPT, self.fields)
+        # すべての項目が空なら、読み込み途中のページとみなしてやり直す
+        if not any(value not in (None, []) for value in row.values()):
+            raise EmptyPageError(f"No fields found on page: {url}")
+        return row
@@ -0,0 +1,590 @@
+"""
+ウェブブラウザ操作でページに注入する JavaScript
+
+execute_script に渡す関数本体で、引数は arguments[n] で受け取る。
+"""
+
+# 要素を探す関数（selector_type は web_browser の SELECTOR_TYPES と同じ名前）
+FIND_ELEMENT_JS = """
+function rpaFind(type, selector) {
+  switch (type) {
+    case "xpath":
+      return document.evaluate(
+        selector, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null
+      ).singleNodeValue;
+    case "id":
+      return document.getElementById(selector);
+    case "name":
+      return document.getElementsByName(selector)[0] || null;
+    case "class":
+      return document.getElementsByClassName(selector)[0] || null;
+    case "tag":
+      return document.getElementsByTagName(selector)[0] || null;
+    case "link_text":
+      return Array.from(document.links).find(
+        (a) => a.textContent.trim() === selector) || null;
+    case "partial_link_text":
+      return Array.from(document.links).find(
+        (a) => a.textContent.includes(selector)) || null;
+    default:
+      return document.querySelector(selector);
+  }
+}
+"""
+
+# 条件に合う要素をすべて探す関数
+FIND_ALL_ELEMENTS_JS = """
+function rpaFindAll(type, selector) {
+  switch (type) {
+    case "xpath": {
+      const snapshot = document.evaluate(
+        selector, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+      const nodes = [];
+      for (let i = 0; i < snapshot.snapshotLength; i++) {
+        nodes.push(snapshot.snapshotItem(i));
+      }
+      return nodes;
+    }
+    case "id": {
+      const el = document.getElementById(selector);
+      return el ? [el] : [];
+    }
+    case "name":
+      return Array.from(document.getElementsByName(selector));
+    case "class":
+      return Array.from(document.getElementsByClassName(selector));
+    case "tag":
+      return Array.from(document.getElementsByTagName(selector));
+    case "link_text":
+      return Array.from(document.links).filter(
+        (a) => a.textContent.trim() === selector);
+    case "partial_link_text":
+      return Array.from(document.links).filter(
+        (a) => a.textContent.includes(selector));
+    default:
+      return Array.from(document.querySelectorAll(selector));
+  }
+}
+"""
+
+# 要素から値を取り出す関数
+#
+# attribute が "text" なら表示されているテキスト（WebElement.text 相当）、
+# "html" なら innerHTML、それ以外は属性値。href・src はページの URL を基準に
+# 絶対 URL にする。
+ELEMENT_VALUE_JS = """
+function rpaValue(el, attribute) {
+  if (attribute === "text") {
+    return (el.innerText === undefined ? el.textContent : el.innerText).trim();
+  }
+  if (attribute === "html") {
+    return el.innerHTML;
+  }
+  if ((attribute === "href" || attribute === "src") && el.hasAttribute(attribute)) {
+    return el[attribute] || el.getAttribute(attribute);
+  }
+  if (attribute === "value" && "value" in el) {
+    return el.value;
+  }
+  return el.getAttribute(attribute);
+}
+"""
+
+# ページから項目ごとの値を取り出す
+#
+# arguments[0]: 項目のリスト（name, selector, selector_type, attribute, multiple）
+#
+# {項目名: 値} を返す。見つからない要素は null、multiple の項目は値のリスト。
+EXTRACT_FIELDS_SCRIPT = (
+    FIND_ELEMENT_JS
+    + FIND_ALL_ELEMENTS_JS
+    + ELEMENT_VALUE_JS
+    + """
+const fields = arguments[0];
+const row = {};
+for (const field of fields) {
+  if (field.multiple) {
+    row[field.name] = rpaFindAll(field.selector_type, field.selector)
+      .map((el) => rpaValue(el, field.attribute));
+  } else {
+    const el = rpaFind(field.selector_type, field.selector);
+    row[field.name] = el ? rpaValue(el, field.attribute) : null;
+  }
+}
+return row;
+"""
+)
+
+# 要素が条件を満たすまで待つ（execute_async_script 用）
+#
+# arguments[0]: selector_type
+# arguments[1]: selector
+# arguments[2]: 条件（presence・visible・clickable）
+# arguments[3]: 待つ時間（ミリ秒）
+#
+# MutationObserver で DOM・属性の変化のたびに調べ、条件を満たした時点で
+# 要素を返す。時間内に満たさなければ null。CSS のアニメーションなど DOM が
+# 変わらない変化にも追いつくよう、ページ内でも一定間隔で調べ直す。
+WAIT_FOR_ELEMENT_SCRIPT = (
+    FIND_ELEMENT_JS
+    + """
+const type = arguments[0];
+const selector = arguments[1];
+const condition = arguments[2];
+const timeoutMs = arguments[3];
+const done = arguments[arguments.length - 1];
+
+function isVisible(el) {
+  if (el.getClientRects().length === 0) {
+    return false;
+  }
+  const style = window.getComputedStyle(el);
+  return style.visibility !== "hidden" && style.opacity !== "0";
+}
+
+function check() {
+  const el = rpaFind(type, selector);
+  if (!el) {
+    return null;
+  }
+  if (condition === "visible" && !isVisible(el)) {
+    return null;
+  }
+  if (condition === "clickable" && (!isVisible(el) || el.disabled)) {
+    return null;
+  }
+  return el;
+}
+
+const found = check();
+if (found) {
+  done(found);
+} else {
+  let finished = false;
+  const observer = new MutationObserver(() => {
+    const el = check();
+    if (el) {
+      finish(el);
+    }
+  });
+  const interval = setInterval(() => {
+    const el = check();
+    if (el) {
+      finish(el);
+    }
+  }, 200);
+  const timer = setTimeout(() => finish(null), timeoutMs);
+  function finish(value) {
+    if (finished) {
+      return;
+    }
+    finished = true;
+    observer.disconnect();
+    clearInterval(interval);
+    clearTimeout(timer);
+    done(value);
+  }
+  observer.observe(document.documentElement, {
+    childList: true, subtree: true, attributes: true,
+  });
+}
+"""
+)
+
+# キャッシュした要素が、今のページでもセレクタの最初の要素かを調べる
+#
+# arguments[0]: 要素
+# arguments[1]: selector_type
+# arguments[2]: selector
+#
+# どのセレクタも検索し直した最初の要素と比べる（CSS でも、一致する別の
+# 要素が前に追加されていれば、wait_for_element が返す要素は変わるため）。
+CACHED_ELEMENT_CHECK_SCRIPT = (
+    FIND_ELEMENT_JS
+    + """
+const el = arguments[0];
+const type = arguments[1];
+const selector = arguments[2];
+if (!el || !el.isConnected) {
+  return false;
+}
+return rpaFind(type, selector) === el;
+"""
+)
+
+# ページの読み込みを待つ（execute_async_script 用）
+#
+# arguments[0]: 完了とみなす document.readyState のリスト
+# arguments[1]: ネットワークが静まったとみなす時間（ミリ秒、0 なら待たない）
+# arguments[2]: 待つ時間（ミリ秒）
+#
+# readystatechange で readyState を待ち、続けてネットワークが idle の時間だけ
+# 静まるのを待つ。fetch と XMLHttpRequest を包んで実行中のリクエスト数を
+# 数え（包むのはページごとに最初の1回だけ）、0 件の状態が idle の時間続けば
+# 完了とする。包む前に始まったリクエストは数えられないため、リソース（画像・
+# XHR・fetch など）の読み込み完了も PerformanceObserver で見て、そのたびに
+# 待ち直す。完了すれば true、時間内に終わらなければ false。
+WAIT_FOR_LOAD_SCRIPT = """
+const states = arguments[0];
+const idleMs = arguments[1];
+const timeoutMs = arguments[2];
+const done = arguments[arguments.length - 1];
+let finished = false;
+let idleTimer = null;
+let observer = null;
+let network = null;
+let restart = null;
+
+function trackNetwork() {
+  if (window.__rpaNetwork) {
+    return window.__rpaNetwork;
+  }
+  const net = { inflight: 0, listeners: new Set() };
+  const changed = () => net.listeners.forEach((listener) => listener());
+  const begin = () => {
+    net.inflight += 1;
+    changed();
+  };
+  const end = () => {
+    net.inflight = Math.max(0, net.inflight - 1);
+    changed();
+  };
+  const originalFetch = window.fetch;
+  if (originalFetch) {
+    window.fetch = function (...args) {
+      begin();
+      let promise;
+      try {
+        promise = originalFetch.apply(this, args);
+      } catch (e) {
+        end();
+        throw e;
+      }
+      return promise.then(
+        (response) => {
+          end();
+          return response;
+        },
+        (error) => {
+          end();
+          throw error;
+        });
+    };
+  }
+  if (window.XMLHttpRequest) {
+    const originalSend = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function (...args) {
+      begin();
+      this.addEventListener("loadend", end, { once: true });
+      try {
+        return originalSend.apply(this, args);
+      } catch (e) {
+        this.removeEventListener("loadend", end);
+        end();
+        throw e;
+      }
+    };
+  }
+  window.__rpaNetwork = net;
+  return net;
+}
+
+function finish(value) {
+  if (finished) {
+    return;
+  }
+  finished = true;
+  clearTimeout(timer);
+  clearTimeout(idleTimer);
+  if (observer) {
+    observer.disconnect();
+  }
+  if (network) {
+    network.listeners.delete(restart);
+  }
+  document.removeEventListener("readystatechange", onStateChange);
+  done(value);
+}
+
+function waitIdle() {
+  if (!idleMs) {
+    finish(true);
+    return;
+  }
+  network = trackNetwork();
+  // 実行中のリクエストがなくなってから idleMs 待つ（途中で始まれば待ち直す）
+  restart = () => {
+    clearTimeout(idleTimer);
+    idleTimer = null;
+    if (network.inflight === 0) {
+      idleTimer = setTimeout(() => finish(true), idleMs);
+    }
+  };
+  network.listeners.add(restart);
+  observer = new PerformanceObserver(restart);
+  observer.observe({ type: "resource" });
+  restart();
+}
+
+function onStateChange() {
+  if (states.includes(document.readyState)) {
+    document.removeEventListener("readystatechange", onStateChange);
+    waitIdle();
+  }
+}
+
+const timer = setTimeout(() => finish(false), timeoutMs);
+document.addEventListener("readystatechange", onStateChange);
+onStateChange();
+"""
+
+# フォームの項目をまとめて操作する
+#
+# arguments[0]: 項目のリスト（selector, selector_type, action, value, by,
+#               clear_before, native）
+# arguments[1]: 開始位置
+# arguments[2]: 失敗した時点で止めるか
+#
+# 値はプロトタイプのセッターで設定してから input・change イベントを送るため、
+# React などのフレームワークも変更を検知する。設定後に値が入ったかを確かめ、
+# 入っていなければエラーにする。スクリプトで扱えない項目（テキスト以外の
+# input（日付・数値・ファイル選択など）、表示されていない入力欄、
+# contenteditable、見つからない要素、native 指定）に来たらそこで止め、
+# {results, next, native: true} を返す。ページ遷移の可能性がある
+# click の後も、以降を新しいページで続けられるよう止める。
+FILL_FORM_SCRIPT = (
+    FIND_ELEMENT_JS
+    + """
+const items = arguments[0];
+const start = arguments[1];
+const stopOnError = arguments[2];
+const results = [];
+// セッターで値を入れてよい input の種類（日付・数値などは WebDriver で入力する）
+const TEXT_INPUT_TYPES = ["text", "search", "email", "url", "tel", "password"];
+
+function fire(el, type) {
+  el.dispatchEvent(new Event(type, { bubbles: true }));
+}
+
+function setValue(el, value) {
+  const proto = el instanceof HTMLTextAreaElement
+    ? HTMLTextAreaElement.prototype : HTMLInputElement.prototype;
+  Object.getOwnPropertyDescriptor(proto, "value").set.call(el, value);
+}
+
+function isTextField(el) {
+  return el instanceof HTMLTextAreaElement
+    || (el instanceof HTMLInputElement && TEXT_INPUT_TYPES.includes(el.type));
+}
+
+function isVisible(el) {
+  return el.getClientRects().length > 0
+    && window.getComputedStyle(el).visibility !== "hidden";
+}
+
+function findOption(el, by, value) {
+  const options = Array.from(el.options);
+  if (by === "text") {
+    return options.find((o) => o.text.trim() === value.trim());
+  }
+  if (by === "index") {
+    return options[parseInt(value, 10)];
+  }
+  return options.find((o) => o.value === value);
+}
+
+// 処理した場合はエラー（成功なら null）、スクリプトで扱えない場合は undefined
+function apply(el, item) {
+  if (el.disabled) {
+    return "Element is disabled";
+  }
+  switch (item.action) {
+    case "input": {
+      if (!isTextField(el) || !isVisible(el)) {
+        return undefined;
+      }
+      if (el.readOnly) {
+        return "Element is read-only";
+      }
+      const value = item.clear_before ? item.value : el.value + item.value;
+      el.focus();
+      setValue(el, value);
+      fire(el, "input");
+      fire(el, "change");
+      el.blur();
+      if (el.value !== value) {
+        return "Value was not accepted (expected " + JSON.stringify(value)
+          + ", got " + JSON.stringify(el.value) + ")";
+      }
+      return null;
+    }
+    case "select": {
+      if (!(el instanceof HTMLSelectElement)) {
+        return undefined;
+      }
+      const option = findOption(el, item.by, item.value);
+      if (!option) {
+        return "Option not found: " + item.value;
+      }
+      option.selected = true;
+      fire(el, "input");
+      fire(el, "change");
+      return null;
+    }
+    case "check":
+    case "uncheck": {
+      const checked = item.action === "check";
+      if (el.checked !== checked) {
+        el.click();
+      }
+      return el.checked === checked ? null : "Could not change checked state";
+    }
+    case "click":
+      el.click();
+      return null;
+  }
+  return undefined;
+}
+
+for (let i = start; i < items.length; i++) {
+  const item = items[i];
+  const el = item.native ? null : rpaFind(item.selector_type, item.selector);
+  if (!el) {
+    return { results: results, next: i, native: true };
+  }
+  let error;
+  try {
+    error = apply(el, item);
+  } catch (e) {
+    error = String(e);
+  }
+  if (error === undefined) {
+    return { results: results, next: i, native: true };
+  }
+  results.push({ index: i, error: error });
+  if ((error && stopOnError) || item.action === "click") {
+    return { results: results, next: i + 1, native: false };
+  }
+}
+return { results: results, next: items.length, native: false };
+"""
+)
+
+# 表（table 要素、または行・セルのセレクタで指定したグリッド）を読み取る
+#
+# arguments[0]: 表の指定（selector, selector_type, row_selector, cell_selector,
+#               header_selector, next_selector, next_selector_type）
+# arguments[1]: 前のページの signature（最初のページは null）
+# arguments[2]: 読み取った後に「次へ」をクリックするか
+#
+# 表がまだない、または前のページから変わっていない（読み込み中で行が空の
+# 場合を含む）ときは null を返すため、WebDriverWait でそのまま待てる。
+# table 要素の colspan・rowspan は値を複製して列をそろえる。
+EXTRACT_TABLE_SCRIPT = (
+    FIND_ELEMENT_JS
+    + ELEMENT_VALUE_JS
+    + """
+const spec = arguments[0];
+const previous = arguments[1];
+const clickNext = arguments[2];
+
+function isHeaderCell(cell) {
+  return cell.tagName === "TH" || cell.getAttribute("role") === "columnheader";
+}
+
+function tableRows(table) {
+  const rows = [];
+  const spans = [];
+  for (const tr of table.rows) {
+    const values = [];
+    let col = 0;
+    const carry = () => {
+      while (spans[col] && spans[col].left > 0) {
+        values[col] = spans[col].text;
+        spans[col].left--;
+        col++;
+      }
+    };
+    for (const td of tr.cells) {
+      carry();
+      const text = rpaValue(td, "text");
+      const rowSpan = Math.max(1, td.rowSpan || 1);
+      for (let k = 0; k < Math.max(1, td.colSpan || 1); k++) {
+        values[col] = text;
+        spans[col] = { text: text, left: rowSpan - 1 };
+        col++;
+      }
+    }
+    carry();
+    const cells = Array.from(tr.cells);
+    rows.push({
+      values: values,
+      header: tr.parentElement.tagName === "THEAD"
+        || (cells.length > 0 && cells.every(isHeaderCell)),
+    });
+  }
+  return rows;
+}
+
+function gridRows(container) {
+  const cellsOf = (row) => Array.from(row.querySelectorAll(spec.cell_selector));
+  const rows = [];
+  if (spec.header_selector) {
+    const header = container.querySelector(spec.header_selector);
+    if (header) {
+      rows.push({ values: cellsOf(header).map((c) => rpaValue(c, "text")), header: true });
+    }
+  }
+  for (const row of container.querySelectorAll(spec.row_selector)) {
+    const cells = cellsOf(row);
+    rows.push({
+      values: cells.map((c) => rpaValue(c, "text")),
+      header: !spec.header_selector && cells.length > 0 && cells.every(isHeaderCell),
+    });
+  }
+  return rows;
+}
+
+function isEnabled(el) {
+  return !el.disabled
+    && el.getAttribute("aria-disabled") !== "true"
+    && !el.closest(".disabled")
+    && el.getClientRects().length > 0;
+}
+
+const container = rpaFind(spec.selector_type, spec.selector);
+if (!container) {
+  return null;
+}
+const all = (container instanceof HTMLTableElement && !spec.row_selector)
+  ? tableRows(container) : gridRows(container);
+
+// 先頭の見出し行の最後の行を列名にし、途中で繰り返される同じ見出し行は除く
+let headers = [];
+let start = 0;
+while (start < all.length && all[start].header) {
+  headers = all[start].values;
+  start++;
+}
+const key = JSON.stringify(headers);
+const rows = all.slice(start)
+  .filter((row) => row.values.length > 0)
+  .filter((row) => !(row.header && JSON.stringify(row.values) === key))
+  .map((row) => row.values);
+
+const signature = JSON.stringify([rows.length, rows[0], rows[rows.length - 1]]);
+if (previous !== null && (rows.length === 0 || signature === previous)) {
+  return null;
+}
+
+let hasNext = false;
+if (spec.next_selector) {
+  const next = rpaFind(spec.next_selector_type, spec.next_selector);
+  hasNext = !!next && isEnabled(next);
+  if (hasNext && clickNext) {
+    next.click();
+  }
+}
+return { headers: headers, rows: rows, signature: signature, has_next: hasNext };
+"""
+)
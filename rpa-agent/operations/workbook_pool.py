@@ -0,0 +1,473 @@
+"""
+Excel ブックのセッション管理
+
+開いたブックを参照IDごとに保持し、複数のブックを同時に扱えるようにする。
+用途に応じて3つのモードで開く。
+
+- edit: 通常の読み書き（全セルをメモリに展開する）
+- read_only: 読み込み専用のストリーミング（行を読むたびに XML から取り出す）
+- write_only: 書き込み専用（行を追記するたびに一時ファイルへ書き出す）
+
+数百MBのブックを読むだけなら read_only、一から大量に出力するなら write_only
+を使うと、メモリ使用量がセル数に比例しなくなる。
+
+保存は一時ファイルに書いてからリネームするため、途中で失敗しても元の
+ファイルは壊れない。save_interval を指定したブックは、前回の保存から
+その秒数が経つまでの保存要求を1回にまとめる。autosave_interval を
+指定したブックは、変更があればその秒数ごとに自動で保存する。まとめた
+保存と自動保存の残りは、ファイルを読む操作の前（flush）と実行終了時
+（finish_run）に必ず書き出す。save_on_finish を指定したブックは、実行終了時に
+保存していない変更をすべて保存する（write_only のブックは1回しか保存できない
+ため、保存後に閉じる）。指定しない場合、保存していない変更は「保存」「閉じる」
+までメモリ上にだけ残る。
+
+1セルずつの書き込み（buffer_cell）はシートごとのバッファにためておき、
+そのシートを読む操作の前（sheet）、保存の前、バッファが
+DEFAULT_CELL_BUFFER_LIMIT 個に達したときに行・列の順にまとめて書き込む。
+"""
+
+import os
+import stat
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from .excel_range import write_cells
+from .tree_copy import PARTIAL_SUFFIX
+
+try:
+    from openpyxl import Workbook, load_workbook
+
+    OPENPYXL_AVAILABLE = True
+except ImportError:
+    OPENPYXL_AVAILABLE = False
+
+# OperationManager の実行リソースとして登録する際のキー
+WORKBOOK_POOL_KEY = "excel_workbook_pool"
+
+WORKBOOK_MODES = ("edit", "read_only", "write_only")
+
+# 同時に開いておくブック数の既定値（超えたら未変更のものを古い順に閉じる）
+DEFAULT_MAX_SESSIONS = 8
+
+# この秒数使われていない未変更のブックは実行終了時に閉じる
+DEFAULT_IDLE_TIMEOUT = 30 * 60
+
+# メモリ使用量の目安（edit モードで Cell オブジェクト1つあたりのバイト数）
+_BYTES_PER_CELL = 400
+_BYTES_PER_SHARED_STRING = 100
+
+# 1シートあたり、まとめて書き込むまでにためておくセル数の上限
+DEFAULT_CELL_BUFFER_LIMIT = 1000
+
+
+class WorkbookSession:
+    """開いているブック1つ分の状態"""
+
+    def __init__(
+        self,
+        reference_id: str,
+        file_path: str,
+        workbook,
+        mode: str,
+        save_interval: float = 0,
+        autosave_interval: float = 0,
+        save_on_finish: bool = False,
+    ):
+        self.reference_id = reference_id
+        self.file_path = file_path
+        self.workbook = workbook
+        self.mode = mode
+        self.save_interval = save_interval
+        self.autosave_interval = autosave_interval
+        self.save_on_finish = save_on_finish
+        self.opened_at = time.time()
+        self.last_used = time.monotonic()
+        # 保存していない変更があるか（書き込み操作が mark_dirty で立てる）
+        self.dirty = mode == "write_only"
+        # まとめるために後回しにした保存要求があるか
+        self.save_pending = False
+        self.last_saved: Optional[float] = None
+        self.save_count = 0
+        self.coalesced_saves = 0
+        # 最終行・最終列の検出結果
+        # {(シート名, "row", 列番号) または (シート名, "column", 行番号): 位置}
+        # 列番号・行番号の 0 はシート全体を表す
+        self.last_cells: Dict[Tuple[str, str, int], int] = {}
+        # まだシートに書き込んでいないセルの値 {シート名: {(行, 列): 値}}
+        self.pending_cells: Dict[str, Dict[Tuple[int, int], Any]] = {}
+        # write_only のシートに追記済みの行数 {シート名: 行数}
+        # （openpyxl の書き込み専用シートは行数を数えないため、ここで数える）
+        self.appended_rows: Dict[str, int] = {}
+        self.cell_buffer_limit = DEFAULT_CELL_BUFFER_LIMIT
+
+    @property
+    def read_only(self) -> bool:
+        return self.mode == "read_only"
+
+    @property
+    def write_only(self) -> bool:
+        return self.mode == "write_only"
+
+    def touch(self):
+        self.last_used = time.monotonic()
+
+    def mark_dirty(self):
+        self.dirty = True
+
+    def record_write(
+        self,
+        sheet_title: str,
+        min_row: int,
+        min_col: int,
+        max_row: int,
+        max_col: int,
+        filled: bool = False,
+    ):
+        """書き込んだ範囲に合わせて最終行・最終列のキャッシュを更新する
+
+        filled=True は範囲内の全セルに空でない値を書いたことを表し、キャッシュを
+        書き込んだ位置まで伸ばす。それ以外で最終位置以降にかかる書き込みは、
+        値を消した可能性があるためキャッシュを捨てる（次回検出し直す）。
+        """
+        for key, last in list(self.last_cells.items()):
+            title, axis, index = key
+            if title != sheet_title:
+                continue
+            if axis == "row":
+                covers, end = min_col <= index <= max_col, max_row
+            else:
+                covers, end = min_row <= index <= max_row, max_col
+            if not (index == 0 or covers) or end < last:
+                continue
+            if filled:
+                self.last_cells[key] = end
+            else:
+                del self.last_cells[key]
+
+    def sheet(self, sheet_name: Optional[str] = None, flush: bool = True):
+        """シートを取得（省略時はアクティブシート）
+
+        flush=True の場合、バッファにためたそのシートのセルを先に書き込む。
+        """
+        wb = self.workbook
+        if sheet_name:
+            ws = wb[sheet_name]
+        elif self.write_only:
+            # 書き込み専用ブックは最初はシートがないため、必要になったら作る
+            return wb.worksheets[0] if wb.worksheets else wb.create_sheet()
+        else:
+            ws = wb.active
+        if flush and ws.title in self.pending_cells:
+            self.flush_cells(ws.title)
+        return ws
+
+    def buffer_cell(self, ws, row: int, col: int, value: Any):
+        """セルへの書き込みをバッファにためる（上限に達したら書き込む）
+
+        セルに入れられない値（辞書など）は、保存時ではなくここで ValueError にする。
+        """
+        from openpyxl.cell.cell import Cell
+
+        # openpyxl と同じ変換を試し、書き込めない値をバッファに入れない
+        Cell(ws, row=row, column=col, value=value)
+        pending = self.pending_cells.setdefault(ws.title, {})
+        pending[(row, col)] = value
+        self.dirty = True
+        if len(pending) >= self.cell_buffer_limit:
+            self.flush_cells(ws.title)
+
+    def buffered_value(self, sheet_title: str, row: int, col: int, default: Any = None):
+        """バッファにためたセルの値（なければ default）"""
+        return self.pending_cells.get(sheet_title, {}).get((row, col), default)
+
+    def flush_cells(self, sheet_title: Optional[str] = None) -> int:
+        """バッファのセルを行・列の順に書き込み、セル数を返す（省略時は全シート）
+
+        書き込みに失敗した場合、そのシートのバッファは残す（同じ値の再書き込みは
+        結果を変えないため、再試行すれば残りのセルも書き込まれる）。
+        """
+        titles = [sheet_title] if sheet_title else list(self.pending_cells)
+        count = 0
+        for title in titles:
+            pending = self.pending_cells.get(title)
+            if pending:
+                count += write_cells(self.workbook[title], sorted(pending.items()))
+            self.pending_cells.pop(title, None)
+        return count
+
+    def estimated_memory(self) -> int:
+        """このブックが使っているメモリの目安（バイト）"""
+        if self.write_only:
+            return 0  # 追記した行はすぐ一時ファイルに書き出される
+        if self.read_only:
+            return len(getattr(self.workbook, "shared_strings", [])) * (
+                _BYTES_PER_SHARED_STRING
+            )
+        cells = sum(len(ws._cells) for ws in self.workbook.worksheets)
+        cells += sum(len(pending) for pending in self.pending_cells.values())
+        return cells * _BYTES_PER_CELL
+
+    def save(self, file_path: Optional[str] = None):
+        """ブックを保存する（一時ファイルに書いてからリネームする）"""
+        path = file_path or self.file_path
+        self.flush_cells()
+        _save_atomic(self.workbook, path)
+        self.save_count += 1
+        if not file_path or os.path.abspath(file_path) == os.path.abspath(
+            self.file_path
+        ):
+            self.dirty = False
+            self.save_pending = False
+            self.last_saved = time.monotonic()
+
+    def request_save(self, force: bool = False) -> str:
+        """自分のファイルへの保存を要求し、"saved"・"deferred"・"unchanged" を返す
+
+        変更がなくファイルもある場合は書かない。save_interval 秒以内に
+        保存済みの場合は後回しにする（flush・finish_run で書き出される）。
+        """
+        if self.write_only or force:
+            self.save()
+            return "saved"
+        if not self.dirty and os.path.exists(self.file_path):
+            self.save_pending = False
+            return "unchanged"
+        if self._within_interval(self.save_interval):
+            self.save_pending = True
+            self.coalesced_saves += 1
+            return "deferred"
+        self.save()
+        return "saved"
+
+    def _within_interval(self, interval: float) -> bool:
+        return (
+            bool(interval)
+            and self.last_saved is not None
+            and time.monotonic() - self.last_saved < interval
+        )
+
+    def save_due(self) -> bool:
+        """後回しにした保存・自動保存の時期が来ているか"""
+        if self.read_only or self.write_only:
+            return False
+        if self.save_pending:
+            return not self._within_interval(self.save_interval)
+        return (
+            self.dirty
+            and bool(self.autosave_interval)
+            and not self._within_interval(self.autosave_interval)
+        )
+
+    def flush(self) -> bool:
+        """後回しにした保存（自動保存の対象の変更を含む）を書き出す"""
+        if self.read_only or self.write_only:
+            return False
+        if self.save_pending or (self.dirty and self.autosave_interval):
+            self.save()
+            return True
+        return False
+
+    def finish(self) -> bool:
+        """実行終了時の保存（save_on_finish なら保存していない変更をすべて保存する）"""
+        if self.save_on_finish and self.dirty and not self.read_only:
+            self.save()
+            return True
+        return self.flush()
+
+    def close(self):
+        # read_only のブックはファイルを開いたままにしているため閉じる
+        if hasattr(self.workbook, "close"):
+            self.workbook.close()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "reference_id": self.reference_id,
+            "file_path": self.file_path,
+            "mode": self.mode,
+            "dirty": self.dirty,
+            "save_pending": self.save_pending,
+            "save_on_finish": self.save_on_finish,
+            "save_count": self.save_count,
+            "coalesced_saves": self.coalesced_saves,
+            "pending_cells": sum(
+                len(pending) for pending in self.pending_cells.values()
+            ),
+            "sheets": list(self.workbook.sheetnames),
+            "idle_seconds": round(time.monotonic() - self.last_used, 1),
+            "estimated_memory_bytes": self.estimated_memory(),
+        }
+
+
+class WorkbookPool:
+    """参照IDごとにブックのセッションを保持する
+
+    参照IDを省略した操作は、最後に使ったブックを対象にする。開いている数が
+    max_sessions を超えた場合と、idle_timeout 秒使われなかった場合は、
+    保存していない変更のないブックを古い順に閉じる。
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = DEFAULT_MAX_SESSIONS,
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+    ):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self._sessions: OrderedDict[str, WorkbookSession] = OrderedDict()
+        self._lock = threading.RLock()
+
+    def open(
+        self,
+        file_path: str,
+        reference_id: str = "",
+        mode: str = "edit",
+        create_if_not_exists: bool = False,
+        data_only: bool = False,
+        save_interval: float = 0,
+        autosave_interval: float = 0,
+        save_on_finish: bool = False,
+    ) -> WorkbookSession:
+        """ブックを開いてセッションを登録する（同じ参照IDのものは閉じて開き直す）"""
+        if mode not in WORKBOOK_MODES:
+            raise ValueError(f"Invalid mode: {mode} (use one of {WORKBOOK_MODES})")
+        reference_id = reference_id or os.path.abspath(file_path)
+
+        if mode == "write_only":
+            workbook = Workbook(write_only=True)
+        elif os.path.exists(file_path):
+            workbook = load_workbook(
+                file_path, read_only=mode == "read_only", data_only=data_only
+            )
+        elif create_if_not_exists and mode == "edit":
+            workbook = Workbook()
+            _save_atomic(workbook, file_path)
+        else:
+            raise FileNotFoundError(f"File does not exist: {file_path}")
+
+        session = WorkbookSession(
+            reference_id,
+            file_path,
+            workbook,
+            mode,
+            save_interval,
+            autosave_interval,
+            save_on_finish,
+        )
+        with self._lock:
+            previous = self._sessions.pop(reference_id, None)
+            if previous:
+                previous.close()
+            self._sessions[reference_id] = session
+            self._evict(keep=reference_id)
+        return session
+
+    def get(self, reference_id: str = "") -> Optional[WorkbookSession]:
+        """参照IDのセッション（省略時は最後に使ったもの）を返す
+
+        後回しにした保存・自動保存の時期が来ていれば、ここで書き出す。
+        """
+        with self._lock:
+            if reference_id:
+                session = self._sessions.get(reference_id)
+            else:
+                session = next(reversed(self._sessions.values()), None)
+            if session:
+                session.touch()
+                self._sessions.move_to_end(session.reference_id)
+                if session.save_due():
+                    session.save()
+            return session
+
+    def close(
+        self, reference_id: str = "", save: bool = False
+    ) -> Optional[WorkbookSession]:
+        """セッションを閉じる（save=True なら変更があれば保存してから）"""
+        with self._lock:
+            session = self.get(reference_id)
+            if session is None:
+                return None
+            # 保存に失敗した場合は変更を失わないよう開いたままにする
+            # 後回しにした保存要求は save=False でも書き出す
+            if session.save_pending or (
+                save and session.dirty and not session.read_only
+            ):
+                session.save()
+            del self._sessions[session.reference_id]
+            session.close()
+            return session
+
+    def sessions(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [session.to_dict() for session in self._sessions.values()]
+
+    def _evict(self, keep: str = ""):
+        """上限超過分と放置されたブックのうち、未変更のものを古い順に閉じる"""
+        now = time.monotonic()
+        for reference_id, session in list(self._sessions.items()):
+            if reference_id == keep or session.dirty:
+                continue
+            over_limit = len(self._sessions) > self.max_sessions
+            if over_limit or now - session.last_used > self.idle_timeout:
+                del self._sessions[reference_id]
+                session.close()
+
+    def flush(self, file_path: Optional[str] = None):
+        """後回しにした保存を書き出す（file_path 省略時はすべてのブック）"""
+        target = os.path.normcase(os.path.abspath(file_path)) if file_path else None
+        with self._lock:
+            for session in self._sessions.values():
+                path = os.path.normcase(os.path.abspath(session.file_path))
+                if target is None or path == target:
+                    session.flush()
+
+    def finish_run(self):
+        """実行終了時に保存を書き出し、放置されたブックを閉じる
+
+        ステップが失敗して終了した場合も呼ばれる。保存した write_only のブックは
+        それ以上書き込めないため閉じる。保存に失敗したブックは開いたままにし、
+        残りのブックの保存を続けてから最初のエラーを送出する。
+        """
+        error = None
+        with self._lock:
+            for reference_id, session in list(self._sessions.items()):
+                try:
+                    saved = session.finish()
+                except Exception as e:
+                    error = error or e
+                    continue
+                if saved and session.write_only:
+                    del self._sessions[reference_id]
+                    session.close()
+            self._evict()
+        if error:
+            raise error
+
+    def close_all(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+def _save_atomic(workbook, path: str):
+    """一時ファイルに保存してからリネームする（失敗しても元のファイルは残る）"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(
+        dir=directory, prefix=f".{os.path.basename(path)}.", suffix=PARTIAL_SUFFIX
+    )
+    os.close(fd)
+    try:
+        workbook.save(temp_path)
+        # mkstemp は 0600 で作るため、既存ファイルの権限に合わせる
+        if os.path.exists(path):
+            os.chmod(temp_path, stat.S_IMODE(os.stat(path).st_mode))
+        else:
+            os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
@@ -0,0 +1,184 @@
+"""
+ファイル書き込みのハンドルキャッシュと原子的な書き込み
+
+ループで1行ずつ追記するワークフローが、行ごとにファイルを開き閉じしないよう
+実行中は追記用のハンドルを開いたままにしてまとめて書き込む。
+"""
+
+import os
+import stat
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from .tree_copy import PARTIAL_SUFFIX
+
+# OperationManager の実行リソースとして登録する際のキー
+WRITE_CACHE_KEY = "file_write_cache"
+
+# 既定のフラッシュ閾値（未フラッシュの文字数）
+DEFAULT_FLUSH_THRESHOLD = 1024 * 1024
+
+# 同時に開いておくハンドルの上限（超えたら最も古いものを閉じる）
+DEFAULT_MAX_HANDLES = 64
+
+
+class _CachedHandle:
+    def __init__(self, path: str, encoding: str, buffer_size: int):
+        self.encoding = encoding
+        self.file = open(path, "a", encoding=encoding, buffering=buffer_size)
+        self.pending = 0
+
+
+class WriteHandleCache:
+    """実行中の追記ハンドルを保持するキャッシュ
+
+    未フラッシュ分が flush_threshold（append ごとに指定があればその値）を
+    超えたとき、明示的に flush されたとき、実行終了時（finish_run）に
+    ディスクへ書き出す。ループ本体の並列実行から
+    同時に呼ばれてもよいようにロックで保護している。
+    """
+
+    def __init__(
+        self,
+        flush_threshold: int = DEFAULT_FLUSH_THRESHOLD,
+        max_handles: int = DEFAULT_MAX_HANDLES,
+    ):
+        self.flush_threshold = flush_threshold
+        self.max_handles = max_handles
+        self._handles: OrderedDict[str, _CachedHandle] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(path: str) -> str:
+        return os.path.normcase(os.path.abspath(path))
+
+    def append(
+        self,
+        path: str,
+        content: str,
+        encoding: str = "utf-8",
+        flush_threshold: Optional[int] = None,
+    ):
+        """path に content を追記する（ディスクへの書き出しは遅延される）"""
+        if flush_threshold is None:
+            flush_threshold = self.flush_threshold
+        key = self._key(path)
+        with self._lock:
+            handle = self._handles.get(key)
+            if handle and handle.encoding != encoding:
+                self._close(key)
+                handle = None
+            if handle is None:
+                while len(self._handles) >= self.max_handles:
+                    self._close(next(iter(self._handles)))
+                handle = _CachedHandle(
+                    path, encoding, max(flush_threshold, DEFAULT_FLUSH_THRESHOLD)
+                )
+                self._handles[key] = handle
+            self._handles.move_to_end(key)
+
+            handle.file.write(content)
+            handle.pending += len(content)
+            if handle.pending >= flush_threshold:
+                handle.file.flush()
+                handle.pending = 0
+
+    def flush(self, path: Optional[str] = None):
+        """path（省略時はすべて）の未書き込み分を書き出す"""
+        with self._lock:
+            keys = [self._key(path)] if path else list(self._handles)
+            for key in keys:
+                handle = self._handles.get(key)
+                if handle:
+                    handle.file.flush()
+                    handle.pending = 0
+
+    def release(self, path: str):
+        """path のハンドルを書き出して閉じる（上書き・読み込みの前に呼ぶ）"""
+        with self._lock:
+            self._close(self._key(path))
+
+    def release_tree(self, path: str):
+        """path と、フォルダならその中のファイルのハンドルを書き出して閉じる
+
+        移動・名前変更・削除の後に、古いパスへの追記が移動先のファイルに
+        書き込まれないよう（Windows では開いたままだと操作自体が失敗する）、
+        その前に呼ぶ。
+        """
+        key = self._key(path)
+        prefix = key.rstrip(os.sep) + os.sep
+        with self._lock:
+            for cached in list(self._handles):
+                if cached == key or cached.startswith(prefix):
+                    self._close(cached)
+
+    def finish_run(self):
+        """実行終了時にすべて書き出して閉じる"""
+        with self._lock:
+            for key in list(self._handles):
+                self._close(key)
+
+    def _close(self, key: str):
+        handle = self._handles.pop(key, None)
+        if handle:
+            handle.file.close()
+
+
+def flush_pending_writes(agent, path: Optional[str] = None):
+    """保留中の書き込みを書き出す（ファイルを読む・コピーする操作の前に呼ぶ）
+
+    追記バッファのほか、保存を後回しにした Excel ブックなど、flush() を持つ
+    実行リソースをすべて書き出す。
+    """
+    for resource in list(getattr(agent, "run_resources", {}).values()):
+        flush = getattr(resource, "flush", None)
+        if flush:
+            flush(path)
+
+
+def release_pending_writes(agent, *paths: str):
+    """保留中の書き込みをすべて書き出し、paths（フォルダならその中）の追記
+    ハンドルを閉じる（ファイル・フォルダを移動・名前変更・削除する前に呼ぶ）
+    """
+    flush_pending_writes(agent)
+    for resource in list(getattr(agent, "run_resources", {}).values()):
+        release_tree = getattr(resource, "release_tree", None)
+        if release_tree:
+            for path in paths:
+                release_tree(path)
+
+
+def write_atomic(path: str, content: str, encoding: str = "utf-8"):
+    """一時ファイルに書いて fsync してからリネームする
+
+    ファイルを監視している他システムが書きかけの内容を読むことがない。
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(
+        dir=directory, prefix=f".{os.path.basename(path)}.", suffix=PARTIAL_SUFFIX
+    )
+    try:
+        with os.fdopen(fd, "w", encoding=encoding) as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp は 0600 で作るため、既存ファイルの権限に合わせる
+        if os.path.exists(path):
+            os.chmod(temp_path, stat.S_IMODE(os.stat(path).st_mode))
+        else:
+            os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    # リネーム自体も永続化する（Windows ではフォルダを開けないため省略）
+    if hasattr(os, "O_DIRECTORY"):
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
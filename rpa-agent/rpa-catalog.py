@@ -91,6 +91,7 @@ class RPAOperationSystem:
 
         # 待機・エラー
         "画像出現を待つ": "wait_for_image",
+        "ファイル出現を待つ": "wait_for_file",
         "続行確認": "continue_confirm",
         "タイマー付き続行確認（秒）": "timer_continue_confirm",
         "コマンド間待機時間を変更": "change_command_wait_time",
@@ -167,6 +168,7 @@ class RPAOperationSystem:
         "ファイル・フォルダ名の変更": "rename_file_folder",
         "ファイル・フォルダをコピー": "copy_file_folder",
         "ファイル・フォルダを削除": "delete_file_folder",
+        "ファイル・フォルダを同期": "sync_file_folder",
         "ファイル・フォルダを圧縮": "compress_file_folder",
         "ファイル・フォルダに解凍": "extract_file_folder",
         "参照ID": "reference_id",
@@ -176,6 +178,7 @@ class RPAOperationSystem:
         "ブックを覚える": "remember_workbook",
         "ブックを保存": "save_workbook",
         "ブックを閉じる": "close_workbook",
+        "セッション一覧": "list_workbook_sessions",
         "新規作成": "create_new",
         "移動・コピー": "move_or_copy",
         "名前取得": "get_name",
@@ -195,6 +198,11 @@ class RPAOperationSystem:
         "行ループ": "row_loop",
         "列ループ": "column_loop",
         "CSV読込ループ": "csv_read_loop",
+        "CSV読み込み": "csv_read",
+        "CSV書き込み": "csv_write",
+        "CSV追記": "csv_append",
+        "Excel→CSV変換": "excel_to_csv",
+        "CSV→Excel変換": "csv_to_excel",
 
         # スプレッドシート
         "URL取得": "get_url",
@@ -207,12 +215,15 @@ class RPAOperationSystem:
         "クリック": "click",
         "入力": "input",
         "選択": "select",
+        "フォーム一括入力": "fill_form",
         "読み取り": "read_text",
         "待機": "wait",
         "スクリーンショット": "screenshot",
         "JavaScript実行": "execute_javascript",
         "タブ切り替え": "switch_tab",
         "更新": "refresh",
+        "一括取得": "scrape_pages",
+        "表取得": "extract_table",
 
         # メール
         "送信": "send",
@@ -261,6 +272,7 @@ class RPAOperationSystem:
         # 待機・エラー
         "秒": "指定した秒数だけ処理を一時停止します。他の処理の完了を待つ際に使用します。",
         "画像出現を待つ": "指定した画像が画面上に表示されるまで待機します。タイムアウト設定も可能です。",
+        "ファイル出現を待つ": "指定したフォルダにファイルが届き、書き込みが終わるまで待機します。パターンで対象を絞り込めます。",
         "続行確認": "処理を一時停止し、ユーザーの確認を待ちます。メッセージ表示も可能です。",
         "タイマー付き続行確認（秒）": "指定秒数のカウントダウン付きで処理を一時停止し、ユーザーの確認を待ちます。",
         "コマンド間待機時間を変更": "各コマンド実行間のデフォルト待機時間を変更します。処理速度の調整に使用します。",
@@ -339,6 +351,7 @@ class RPAOperationSystem:
         "ファイル・フォルダ名の変更": "ファイルまたはフォルダの名前を動的に変更します。",
         "ファイル・フォルダをコピー": "ファイルまたはフォルダを別の場所に複製します。",
         "ファイル・フォルダを削除": "指定したファイルまたはフォルダを完全に削除します。",
+        "ファイル・フォルダを同期": "前回の同期以降に追加・変更されたファイルだけをコピー先に反映します。",
         "ファイル・フォルダを圧縮": "ファイルまたはフォルダをZIP形式で圧縮します。",
         "ファイル・フォルダに解凍": "ZIP形式の圧縮ファイルを指定場所に解凍します。",
         "参照ID": "ファイル名に変数の値を挿入して動的に名前を変更します。",
@@ -348,6 +361,7 @@ class RPAOperationSystem:
         "ブックを覚える": "現在アクティブなブックの参照を変数に記憶します。",
         "ブックを保存": "開いているブックを保存します。別名保存も可能です。",
         "ブックを閉じる": "開いているブックを閉じます。保存オプションの指定も可能です。",
+        "セッション一覧": "開いているブックの一覧と、それぞれのメモリ使用量の目安を取得します。",
         "新規作成": "新しいシートを作成します。",
         "移動・コピー": "シートを別の位置に移動またはコピーします。",
         "名前取得": "シート名の一覧を取得し、変数に格納します。",
@@ -363,11 +377,16 @@ class RPAOperationSystem:
         "位置を取得": "アクティブセルの位置（行番号、列番号）を取得します。",
         "最終行取得": "データが入力されている最終行の番号を取得します。",
         "最終列取得": "データが入力されている最終列の番号を取得します。",
-        "列計算": "列の合計、平均、最大、最小などの計算を実行します。",
+        "列計算": "列の合計、平均、最大、最小などの計算や、列どうしの計算式の結果をまとめて書き込みます。",
         "マクロ実行": "Excelファイル内のマクロを実行します。",
         "行ループ": "指定範囲の行を順次処理するループを実行します。",
         "列ループ": "指定範囲の列を順次処理するループを実行します。",
         "CSV読込ループ": "CSVファイルの各行を順次読み込んで処理します。",
+        "CSV読み込み": "CSVファイルを読み込み、行の一覧を変数に格納します。文字コードと区切り文字は自動判定できます。",
+        "CSV書き込み": "変数の表データをCSVファイルに書き込みます。",
+        "CSV追記": "CSVファイルの末尾に行を追記します。既存ファイルの文字コードと列順に合わせます。",
+        "Excel→CSV変換": "Excelのシートを変数を介さずにCSVファイルへ変換します。複数シートは並列に変換します。",
+        "CSV→Excel変換": "CSVファイルを変数を介さずにExcelのブックへ変換します。複数ファイルは1ファイル1シートにまとめます。",
 
         # スプレッドシート
         "URL取得": "スプレッドシートのURLを取得し、変数に格納します。",
@@ -379,12 +398,15 @@ class RPAOperationSystem:
         "クリック": "Web要素（ボタン、リンクなど）をクリックします。",
         "入力": "テキストボックスなどに文字を入力します。",
         "選択": "ドロップダウンリストから項目を選択します。",
+        "フォーム一括入力": "複数の入力欄・選択・クリックを1回の呼び出しでまとめて操作します。",
         "読み取り": "Web要素のテキストを読み取り、変数に格納します。",
         "待機": "指定した要素が表示されるまで待機します。",
         "スクリーンショット": "Webページのスクリーンショットを撮影します。",
         "JavaScript実行": "カスタムJavaScriptコードを実行します。",
         "タブ切り替え": "ブラウザのタブを切り替えます。",
         "更新": "現在のページを再読み込みします。",
+        "一括取得": "URL一覧の各ページから指定した項目を複数のブラウザで並列に取得し、表として変数やCSVに保存します。",
+        "表取得": "Webページの表を1回の呼び出しで列名と行に読み取ります。「次へ」をたどって全ページを取得し、変数やCSVに保存します。",
 
         # メール
         "送信": "メールを送信します。添付ファイルの指定も可能です。",
@@ -446,6 +468,7 @@ class RPAOperationSystem:
         self.operations["B_待機・終了・エラー"] = {
             "秒": WaitErrorOperations.pause(),
             "画像出現を待つ": WaitErrorOperations.search_screen_and_branch(),
+            "ファイル出現を待つ": WaitErrorOperations.wait_for_file(),
             "続行確認": WaitErrorOperations.pause_and_ask_to_proceed(),
             "タイマー付き続行確認（秒）": WaitErrorOperations.pause_and_countdown_to_proceed(),
             "コマンド間待機時間を変更": WaitErrorOperations.change_speed_for_command_execution(),
@@ -555,6 +578,7 @@ class RPAOperationSystem:
                 "削除": FileFolderOperations.delete(),
                 "参照ID": FileFolderOperations.RenameWithInsert.insert_reference(),
             },
+            "ファイル・フォルダを同期": FileFolderOperations.sync(),
         }
 
         # J. エクセル・CSV
@@ -564,6 +588,7 @@ class RPAOperationSystem:
                 "ブックを覚える": ExcelOperations.Workbook.remember(),
                 "ブックを保存": ExcelOperations.Workbook.save(),
                 "ブックを閉じる": ExcelOperations.Workbook.close(),
+                "セッション一覧": ExcelOperations.Workbook.sessions(),
             },
             "シート操作": {
                 "新規作成": ExcelOperations.Sheet.create(),
@@ -590,6 +615,13 @@ class RPAOperationSystem:
                 "列ループ": ExcelOperations.Cell.column_loop(),
                 "CSV読込ループ": ExcelOperations.Cell.csv_read_loop(),
             },
+            "CSV": {
+                "CSV読み込み": ExcelOperations.Csv.read(),
+                "CSV書き込み": ExcelOperations.Csv.write(),
+                "CSV追記": ExcelOperations.Csv.append(),
+                "Excel→CSV変換": ExcelOperations.Csv.excel_to_csv(),
+                "CSV→Excel変換": ExcelOperations.Csv.csv_to_excel(),
+            },
         }
 
         # K. スプレッドシート
@@ -627,12 +659,15 @@ class RPAOperationSystem:
             "クリック": WebBrowserOperations.create_operation("click"),
             "入力": WebBrowserOperations.create_operation("input"),
             "選択": WebBrowserOperations.create_operation("select"),
+            "フォーム一括入力": WebBrowserOperations.create_operation("fill_form"),
             "読み取り": WebBrowserOperations.create_operation("get_text"),
             "待機": WebBrowserOperations.create_operation("wait"),
             "スクリーンショット": WebBrowserOperations.create_operation("screenshot"),
             "JavaScript実行": WebBrowserOperations.create_operation("execute_js"),
             "タブ切り替え": WebBrowserOperations.create_operation("switch_tab"),
             "更新": WebBrowserOperations.create_operation("refresh"),
+            "一括取得": WebBrowserOperations.create_operation("scrape"),
+            "表取得": WebBrowserOperations.create_operation("extract_table"),
         }
 
         # M. メール
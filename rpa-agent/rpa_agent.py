@@ -9,10 +9,12 @@ Electronからの要求を受けて、Python側でRPA処理を実行
 2. 接続の確認 (ping)
 3. 操作の実行 (execute)
 4. 操作可能一覧の取得 (listOperations)
+5. ファイル到着トリガー (registerTrigger / removeTrigger / listTriggers)
 """
 
 import asyncio
 import json
+import multiprocessing
 import sys
 import threading
 import time
@@ -69,6 +71,8 @@ else:
             pass
 
 from operation_manager import OperationManager
+from operations.loop import resolve_placeholders
+from trigger_manager import FileTrigger, TriggerManager
 
 
 @dataclass
@@ -107,6 +111,9 @@ class RPAAgent:
         """初期化"""
         self.running = True
         self._operation_manager = None  # 遅延初期化
+        self._trigger_manager = None  # 遅延初期化
+        # 操作のワーカースレッドからも通知するため、出力を直列化する
+        self._send_lock = threading.Lock()
 
     def start(self):
         """エージェントを開始"""
@@ -166,13 +173,31 @@ class RPAAgent:
                     {"error": str(e), "traceback": traceback.format_exc()},
                 )
 
+        self.shutdown()
+
+    def shutdown(self):
+        """終了時にトリガーの監視を止め、実行リソースを書き出して閉じる"""
+        if self._trigger_manager is not None:
+            self._trigger_manager.stop_all()
+        if self._operation_manager is not None:
+            self._operation_manager.close_run_resources()
+
     @property
     def operation_manager(self):
         """OperationManagerの遅延初期化"""
         if self._operation_manager is None:
-            self._operation_manager = OperationManager()
+            self._operation_manager = OperationManager(
+                notifier=self.send_notification
+            )
         return self._operation_manager
 
+    @property
+    def trigger_manager(self):
+        """TriggerManagerの遅延初期化"""
+        if self._trigger_manager is None:
+            self._trigger_manager = TriggerManager(self.run_triggered_workflow)
+        return self._trigger_manager
+
     def handle_request(self, request: JsonRpcRequest):
         """リクエストを処理"""
         try:
@@ -192,6 +217,13 @@ class RPAAgent:
             elif request.method == "executeOperations":
                 # 6. 複数操作の一括実行（ワークフロー実行）
                 self.handle_execute_operations(request)
+            elif request.method == "registerTrigger":
+                # 7. ファイル到着トリガーの登録
+                self.handle_register_trigger(request)
+            elif request.method == "removeTrigger":
+                self.handle_remove_trigger(request)
+            elif request.method == "listTriggers":
+                self.handle_list_triggers(request)
             else:
                 self.send_error_response(
                     request.id, -32601, f"Method not found: {request.method}"
@@ -224,11 +256,15 @@ class RPAAgent:
             operation = params.get("operation")
             operation_params = params.get("params", {})
 
-            result = loop.run_until_complete(
-                self.operation_manager.execute_operation(
-                    category, subcategory, operation, operation_params
+            try:
+                result = loop.run_until_complete(
+                    self.operation_manager.execute_operation(
+                        category, subcategory, operation, operation_params
+                    )
                 )
-            )
+            finally:
+                # 単独実行も1回の実行として扱い、バッファを書き出す
+                self.operation_manager.finish_run()
 
             # 完了を通知
             self.send_notification("task.completed", {"result": result})
@@ -323,6 +359,97 @@ class RPAAgent:
             # イベントループをクリーンアップ
             loop.close()
 
+    def handle_register_trigger(self, request: JsonRpcRequest):
+        """ファイル到着トリガーを登録（ファイルが届いたら steps を実行）"""
+        params = request.params or {}
+        folder_path = params.get("folder_path")
+        if not folder_path:
+            self.send_error_response(request.id, -32602, "folder_path is required")
+            return
+
+        try:
+            trigger = self.trigger_manager.register(
+                FileTrigger(
+                    folder_path=os.path.expanduser(folder_path),
+                    pattern=params.get("pattern", "*"),
+                    steps=params.get("steps", []),
+                    trigger_id=params.get("trigger_id", ""),
+                    stable_seconds=params.get("stable_seconds", 0.5),
+                    include_existing=params.get("include_existing", False),
+                    poll_interval=params.get("poll_interval", 1.0),
+                    path_storage_key=params.get("path_storage_key", "trigger_file"),
+                )
+            )
+            self.send_response(request.id, {"trigger": trigger.to_dict()})
+        except Exception as e:
+            self.send_error_response(
+                request.id, -32000, f"Failed to register trigger: {str(e)}"
+            )
+
+    def handle_remove_trigger(self, request: JsonRpcRequest):
+        """ファイル到着トリガーを削除"""
+        params = request.params or {}
+        trigger_id = params.get("trigger_id", "")
+        removed = self.trigger_manager.remove(trigger_id)
+        self.send_response(request.id, {"removed": removed, "trigger_id": trigger_id})
+
+    def handle_list_triggers(self, request: JsonRpcRequest):
+        """登録済みトリガーの一覧を返す"""
+        self.send_response(request.id, {"triggers": self.trigger_manager.list()})
+
+    def run_triggered_workflow(self, trigger: FileTrigger, file_path: str):
+        """トリガー発火時にワークフローを実行（監視スレッドから呼ばれる）
+
+        届いたファイルのパスは path_storage_key に束縛され、steps の
+        パラメータからは "{{trigger_file}}" のように参照できる。
+        """
+        self.send_notification(
+            "trigger.fired",
+            {"trigger_id": trigger.trigger_id, "file_path": file_path},
+        )
+        if not trigger.steps:
+            return
+
+        loop = asyncio.new_event_loop()
+        scope = None
+        try:
+            asyncio.set_event_loop(loop)
+            scope = self.operation_manager.scoped(
+                {trigger.path_storage_key: file_path}, own_resources=True
+            )
+            steps = [
+                {
+                    **step,
+                    "params": resolve_placeholders(
+                        step.get("params", {}), scope.storage.get
+                    ),
+                }
+                for step in trigger.steps
+            ]
+            results = loop.run_until_complete(scope.execute_workflow_steps(steps))
+            self.send_notification(
+                "workflow.completed",
+                {
+                    "trigger_id": trigger.trigger_id,
+                    "file_path": file_path,
+                    "results": results,
+                },
+            )
+        except Exception as e:
+            self.send_notification(
+                "workflow.failed",
+                {
+                    "trigger_id": trigger.trigger_id,
+                    "file_path": file_path,
+                    "error": {"error": str(e), "traceback": traceback.format_exc()},
+                },
+            )
+        finally:
+            # このトリガーの実行で開いたブックやブラウザを残さない
+            if scope is not None:
+                scope.close_run_resources()
+            loop.close()
+
     def send_response(self, request_id: Any, result: Any):
         """レスポンスを送信"""
         response = JsonRpcResponse(id=request_id, result=result)
@@ -347,8 +474,9 @@ class RPAAgent:
         """JSONデータを標準出力に送信"""
         try:
             json_str = json.dumps(data, ensure_ascii=False)
-            sys.stdout.write(json_str + "\n")
-            sys.stdout.flush()
+            with self._send_lock:
+                sys.stdout.write(json_str + "\n")
+                sys.stdout.flush()
         except Exception as e:
             # エラーログ（通常は表示されない）
             sys.stderr.write(f"Failed to send JSON: {e}\n")
@@ -373,4 +501,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # 圧縮で使うプロセスプールが PyInstaller ビルドでも起動できるようにする
+    multiprocessing.freeze_support()
     main()
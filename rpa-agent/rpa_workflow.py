@@ -89,8 +89,8 @@ class RPAWorkflowBuilder:
         - E_記憶: 変数に保存、変数から読み込み
         - I_ファイル・フォルダ: フォルダ作成、ファイル書き込み、コピー、リネーム
         - J_Excel: Excel開く、セル書き込み、範囲書き込み、Excel保存、Excel閉じる
-        - K_CSV: CSV読み込み、CSV書き込み、CSV追記
-        - L_ウェブブラウザ: ブラウザ起動、要素入力、要素クリック
+        - K_CSV: CSV読み込み、CSV書き込み、CSV追記、CSV読込ループ、Excel→CSV変換、CSV→Excel変換
+        - L_ウェブブラウザ: ブラウザ起動、要素入力、要素クリック、フォーム一括入力、一括取得、表取得
         
         【注意事項】
         1. ステップIDは必ず"step-001", "step-002"の形式で連番にする
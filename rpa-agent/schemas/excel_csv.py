@@ -17,8 +17,12 @@ class ExcelOperations:
                     "file_path": "",
                     "reference_id": "",
                     "read_only": False,
+                    "write_only": False,
                     "password": "",
                     "update_links": False,
+                    "save_interval": 0,
+                    "autosave_interval": 0,
+                    "save_on_finish": False,
                 }
             )
 
@@ -38,6 +42,7 @@ class ExcelOperations:
                     "save_as": False,
                     "file_path": "",
                     "file_format": "xlsx",
+                    "force": False,
                 }
             )
 
@@ -48,6 +53,11 @@ class ExcelOperations:
                 specific_params={"reference_id": "", "save_changes": True}
             )
 
+        @staticmethod
+        def sessions() -> OperationTemplate:
+            """セッション一覧"""
+            return OperationTemplate(specific_params={"storage_key": ""})
+
     class Sheet:
         @staticmethod
         def create() -> OperationTemplate:
@@ -198,14 +208,26 @@ class ExcelOperations:
         def get_last_row() -> OperationTemplate:
             """最終行取得"""
             return OperationTemplate(
-                specific_params={"reference_id": "", "column": "A", "storage_key": ""}
+                specific_params={
+                    "reference_id": "",
+                    "sheet_name": "",
+                    "column": "A",
+                    "storage_key": "",
+                    "trust_dimension": True,
+                }
             )
 
         @staticmethod
         def get_last_column() -> OperationTemplate:
             """最終列取得"""
             return OperationTemplate(
-                specific_params={"reference_id": "", "row": 1, "storage_key": ""}
+                specific_params={
+                    "reference_id": "",
+                    "sheet_name": "",
+                    "row": 1,
+                    "storage_key": "",
+                    "trust_dimension": True,
+                }
             )
 
         @staticmethod
@@ -214,8 +236,11 @@ class ExcelOperations:
             return OperationTemplate(
                 specific_params={
                     "reference_id": "",
+                    "sheet_name": "",
                     "range": "A:A",
                     "operation": "sum",
+                    "expression": "",
+                    "output_cell": "",
                     "storage_key": "",
                 }
             )
@@ -234,9 +259,17 @@ class ExcelOperations:
             return OperationTemplate(
                 specific_params={
                     "reference_id": "",
+                    "sheet_name": "",
                     "start_row": 1,
                     "end_row": None,
-                    "row_storage_key": "",
+                    "start_column": "A",
+                    "end_column": None,
+                    "row_storage_key": "current_row",
+                    "row_number_storage_key": "",
+                    "column_storage_keys": {},
+                    "stop_at_empty_row": True,
+                    "prefetch_rows": 500,
+                    "iteration_error": "stop",
                     "loop_steps": [],
                 }
             )
@@ -247,9 +280,15 @@ class ExcelOperations:
             return OperationTemplate(
                 specific_params={
                     "reference_id": "",
+                    "sheet_name": "",
                     "start_column": "A",
                     "end_column": None,
-                    "column_storage_key": "",
+                    "start_row": 1,
+                    "end_row": None,
+                    "column_storage_key": "current_column",
+                    "column_letter_storage_key": "",
+                    "stop_at_empty_column": True,
+                    "iteration_error": "stop",
                     "loop_steps": [],
                 }
             )
@@ -260,10 +299,99 @@ class ExcelOperations:
             return OperationTemplate(
                 specific_params={
                     "file_path": "",
-                    "encoding": "utf-8",
-                    "delimiter": ",",
+                    "encoding": "auto",
+                    "delimiter": "auto",
                     "has_header": True,
+                    "start_row": 1,
+                    "max_rows": None,
+                    "chunk_size": 1,
+                    "row_storage_key": "current_row",
                     "row_storage_keys": {},
+                    "concurrency": 1,
+                    "iteration_error": "stop",
                     "loop_steps": [],
                 }
             )
+
+    class Csv:
+        @staticmethod
+        def read() -> OperationTemplate:
+            """CSV読み込み"""
+            return OperationTemplate(
+                specific_params={
+                    "file_path": "",
+                    "encoding": "auto",
+                    "delimiter": "auto",
+                    "has_header": True,
+                    "as_dict": True,
+                    "start_row": 1,
+                    "max_rows": None,
+                    "storage_key": "",
+                }
+            )
+
+        @staticmethod
+        def write() -> OperationTemplate:
+            """CSV書き込み"""
+            return OperationTemplate(
+                specific_params={
+                    "file_path": "",
+                    "data": [],
+                    "data_key": "",
+                    "header": [],
+                    "write_header": True,
+                    "encoding": "utf-8",
+                    "delimiter": ",",
+                    "quoting": "minimal",
+                }
+            )
+
+        @staticmethod
+        def append() -> OperationTemplate:
+            """CSV追記"""
+            return OperationTemplate(
+                specific_params={
+                    "file_path": "",
+                    "data": [],
+                    "data_key": "",
+                    "header": [],
+                    "has_header": True,
+                    "encoding": "auto",
+                    "delimiter": "auto",
+                    "quoting": "minimal",
+                }
+            )
+
+        @staticmethod
+        def excel_to_csv() -> OperationTemplate:
+            """Excel→CSV変換"""
+            return OperationTemplate(
+                common_params=CommonParams(timeout=300),
+                specific_params={
+                    "file_path": "",
+                    "output_path": "",
+                    "sheet_names": [],
+                    "encoding": "utf-8",
+                    "delimiter": ",",
+                    "quoting": "minimal",
+                    "date_format": "%Y-%m-%d",
+                    "datetime_format": "%Y-%m-%d %H:%M:%S",
+                    "max_workers": 4,
+                }
+            )
+
+        @staticmethod
+        def csv_to_excel() -> OperationTemplate:
+            """CSV→Excel変換"""
+            return OperationTemplate(
+                common_params=CommonParams(timeout=300),
+                specific_params={
+                    "file_path": "",
+                    "output_path": "",
+                    "sheet_name": "",
+                    "encoding": "auto",
+                    "delimiter": "auto",
+                    "convert_numbers": True,
+                    "date_format": "",
+                }
+            )
@@ -28,6 +28,8 @@ class FileOperations:
                 "destination_path": "",
                 "overwrite": False,
                 "create_directory": True,
+                "threads": 0,
+                "storage_profile": "ssd",
             }
         )
 
@@ -40,6 +42,15 @@ class FileOperations:
                 "encoding": "utf-8",
                 "storage_key": "",
                 "read_mode": "text",
+                "start_line": 1,
+                "line_count": None,
+                "offset": 0,
+                "length": 1048576,
+                "search": "",
+                "max_matches": 100,
+                "line_storage_key": "",
+                "loop_steps": [],
+                "iteration_error": "stop",
             }
         )
 
@@ -53,6 +64,7 @@ class FileOperations:
                 "encoding": "utf-8",
                 "write_mode": "overwrite",
                 "create_directory": True,
+                "flush_threshold": 1048576,
             }
         )
 
@@ -89,6 +101,8 @@ class FolderOperations:
                 "file_storage_key": "",
                 "path_storage_key": "",
                 "loop_steps": [],
+                "concurrency": 1,
+                "iteration_error": "stop",
             }
         )
 
@@ -112,6 +126,10 @@ class FileFolderOperations:
                 "destination_path": "",
                 "overwrite": False,
                 "copy_permissions": True,
+                "threads": 0,
+                "storage_profile": "ssd",
+                "progress_interval": 1000,
+                "resume": False,
             }
         )
 
@@ -122,6 +140,24 @@ class FileFolderOperations:
             specific_params={"target_path": "", "move_to_trash": True, "confirm": True}
         )
 
+    @staticmethod
+    def sync() -> OperationTemplate:
+        """ファイル・フォルダを同期"""
+        return OperationTemplate(
+            specific_params={
+                "source_path": "",
+                "destination_path": "",
+                "pattern": "*",
+                "mirror_deletions": False,
+                "use_hash": False,
+                "verify_destination": False,
+                "index_path": "",
+                "threads": 0,
+                "storage_profile": "ssd",
+                "storage_key": "",
+            }
+        )
+
     class Compression:
         @staticmethod
         def compress() -> OperationTemplate:
@@ -130,9 +166,11 @@ class FileFolderOperations:
                 specific_params={
                     "source_paths": [],
                     "archive_path": "",
-                    "compression_type": "zip",
+                    "compression_type": None,
                     "compression_level": 6,
                     "password": "",
+                    "workers": 0,
+                    "progress_interval": 100,
                 }
             )
 
@@ -146,6 +184,7 @@ class FileFolderOperations:
                     "password": "",
                     "create_folder": True,
                     "overwrite": False,
+                    "progress_interval": 100,
                 }
             )
 
@@ -257,7 +257,10 @@ class MemoryOperations:
                 "variable": "ファイル保存場所",  # 値やウィンドウを保持する変数名
                 "file_or_dir": "file",  # 任意設定項目（用途に応じて指定）
                 "date_check": "更新日時",  # 任意設定項目（用途に応じて指定）
-                "number": 1,  # 任意設定項目（用途に応じて指定）
+                "number": 1,  # 何番目に新しい（古い）ものを記憶するか
                 "path": "",  # 実行対象のパス。未設定では動かない
+                "pattern": "*",  # 対象にするファイル名のパターン
+                "order": "newest",  # newest/oldest - 新しい順か古い順か
+                "use_cache": False,  # True/False - フォルダ一覧をキャッシュして再利用するか
             }
         )
\ No newline at end of file
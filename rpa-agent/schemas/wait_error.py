@@ -31,6 +31,21 @@ class WaitErrorOperations:
             }
         )
 
+    @staticmethod
+    def wait_for_file() -> OperationTemplate:
+        """ファイル出現を待つ"""
+        return OperationTemplate(
+            specific_params={
+                "folder_path": "",  # 監視するフォルダ
+                "pattern": "*",  # 対象ファイル名のパターン（例: *.csv）
+                "timeout": 60,  # 待機する最大秒数
+                "stable_seconds": 0.5,  # サイズが変わらなくなるまで待つ秒数
+                "include_existing": True,  # 既にあるファイルも対象にする
+                "poll_interval": 1.0,  # inotify が使えない場合のスキャン間隔
+                "storage_key": "",  # 見つかったファイルのパスを記憶するキー
+            }
+        )
+
     @staticmethod
     def pause_and_ask_to_proceed() -> OperationTemplate:
         """続行確認"""
@@ -2,7 +2,7 @@
 L. ウェブブラウザ操作のスキーマ定義
 """
 
-from .base import OperationTemplate
+from .base import CommonParams, OperationTemplate
 
 
 class WebBrowserOperations:
@@ -17,13 +17,29 @@ class WebBrowserOperations:
                 "browser": "chrome",
                 "incognito": False,
                 "maximize": True,
+                "use_pool": True,
+                "warm_pool_size": 0,
+                "max_uses": 50,
+                "page_load_strategy": "normal",
+                "block_resources": [],
+                "blocked_urls": [],
+                "disable_extensions": False,
+                "disable_gpu": False,
+                "wait_for_selector": "",
+                "selector_type": "css",
+                "wait_time": 10,
             },
             "close": {
                 "target": "current",
+                "quit": False,
             },
             "navigate": {
                 "url": "",
                 "wait_for_load": True,
+                "wait_for_network_idle": False,
+                "wait_for_selector": "",
+                "selector_type": "css",
+                "wait_time": 10,
             },
             "click": {
                 "selector": "",
@@ -42,6 +58,12 @@ class WebBrowserOperations:
                 "value": "",
                 "by": "value",
             },
+            "fill_form": {
+                "items": [],
+                "clear_before": True,
+                "stop_on_error": True,
+                "wait_time": 10,
+            },
             "get_text": {
                 "selector": "",
                 "selector_type": "css",
@@ -52,6 +74,7 @@ class WebBrowserOperations:
                 "selector_type": "css",
                 "timeout": 30,
                 "condition": "visible",
+                "wait_strategy": "observer",
             },
             "scroll": {
                 "direction": "down",
@@ -76,6 +99,39 @@ class WebBrowserOperations:
                 "wait_for_load": True,
                 "hard_refresh": False,
             },
+            "scrape": {
+                "urls": [],
+                "urls_key": "",
+                "url_column": "url",
+                "fields": {},
+                "concurrency": 4,
+                "retries": 2,
+                "browser_type": "chrome",
+                "headless": True,
+                "page_load_strategy": "normal",
+                "block_resources": [],
+                "wait_for_selector": "",
+                "storage_key": "",
+                "output_path": "",
+            },
+            "extract_table": {
+                "selector": "table",
+                "selector_type": "css",
+                "row_selector": "",
+                "cell_selector": "",
+                "header_selector": "",
+                "next_selector": "",
+                "max_pages": 100,
+                "wait_time": 10,
+                "storage_key": "",
+                "output_path": "",
+            },
         }
 
+        # 多数のページを扱う操作は既定のタイムアウトを延ばす
+        if operation_type in ("scrape", "extract_table"):
+            return OperationTemplate(
+                common_params=CommonParams(timeout=1800),
+                specific_params=templates[operation_type],
+            )
         return OperationTemplate(specific_params=templates.get(operation_type, {}))
@@ -0,0 +1,42 @@
+"""テスト共通のフィクスチャ"""
+
+import re
+import zipfile
+
+import pytest
+
+
+@pytest.fixture
+def understated_workbook(tmp_path):
+    """dimension が実際より小さい（"A1" のまま）ブックを作る関数
+
+    一部のアプリが書き出すブックと同じく、<dimension ref> だけが実際の
+    範囲を表していない。
+    """
+    openpyxl = pytest.importorskip("openpyxl")
+
+    def make(rows, name="understated.xlsx", ref="A1"):
+        workbook = openpyxl.Workbook()
+        ws = workbook.active
+        for row in rows:
+            ws.append(row)
+        original = tmp_path / f"original_{name}"
+        workbook.save(original)
+
+        path = tmp_path / name
+        with (
+            zipfile.ZipFile(original) as src,
+            zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as dst,
+        ):
+            for item in src.infolist():
+                data = src.read(item.filename)
+                if item.filename.startswith("xl/worksheets/"):
+                    data = re.sub(
+                        rb'<dimension ref="[^"]*"',
+                        b'<dimension ref="' + ref.encode() + b'"',
+                        data,
+                    )
+                dst.writestr(item, data)
+        return path
+
+    return make
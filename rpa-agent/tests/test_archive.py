@@ -0,0 +1,111 @@
+"""ZIP / tar.gz の作成と展開のテスト"""
+
+import os
+import zipfile
+
+import pytest
+
+from operations.archive import (
+    _legacy_name,
+    archive_type,
+    create_tar,
+    create_zip,
+    extract_tar,
+    extract_zip,
+)
+
+
+@pytest.fixture
+def source(tmp_path):
+    root = tmp_path / "data"
+    (root / "sub").mkdir(parents=True)
+    (root / "a.txt").write_text("alpha\n" * 1000, encoding="utf-8")
+    (root / "sub" / "日本語.txt").write_text("ベータ", encoding="utf-8")
+    (root / "empty.bin").write_bytes(b"")
+    return root
+
+
+def read_tree(root):
+    files = {}
+    for directory, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(directory, name)
+            rel = os.path.relpath(path, root).replace(os.sep, "/")
+            with open(path, "rb") as f:
+                files[rel] = f.read()
+    return files
+
+
+def test_zip_round_trip(tmp_path, source):
+    archive = tmp_path / "out.zip"
+    create_zip([str(source)], str(archive), workers=2)
+
+    with zipfile.ZipFile(archive) as zf:
+        assert zf.testzip() is None
+
+    destination = tmp_path / "extracted"
+    extract_zip(str(archive), str(destination))
+    assert read_tree(destination / "data") == read_tree(source)
+
+
+@pytest.mark.parametrize("compress", [True, False])
+def test_tar_round_trip(tmp_path, source, compress):
+    archive = tmp_path / ("out.tar.gz" if compress else "out.tar")
+    create_tar([str(source)], str(archive), compress=compress, workers=2)
+
+    destination = tmp_path / "extracted"
+    extract_tar(str(archive), str(destination))
+    assert read_tree(destination / "data") == read_tree(source)
+
+
+def test_archive_inside_source_is_not_included(source):
+    archive = source / "self.zip"
+    create_zip([str(source)], str(archive), workers=1)
+
+    with zipfile.ZipFile(archive) as zf:
+        names = zf.namelist()
+    assert "data/a.txt" in names
+    assert "data/self.zip" not in names
+
+
+def test_tar_inside_source_is_not_included(tmp_path, source):
+    archive = source / "self.tar.gz"
+    create_tar([str(source)], str(archive), workers=1)
+
+    destination = tmp_path / "extracted"
+    extract_tar(str(archive), str(destination))
+    assert not (destination / "data" / "self.tar.gz").exists()
+
+
+def test_extract_refuses_to_overwrite(tmp_path, source):
+    archive = tmp_path / "out.zip"
+    create_zip([str(source)], str(archive), workers=1)
+    destination = tmp_path / "extracted"
+    extract_zip(str(archive), str(destination))
+
+    with pytest.raises(FileExistsError):
+        extract_zip(str(archive), str(destination))
+    extract_zip(str(archive), str(destination), overwrite=True)
+
+
+def test_extract_blocks_paths_outside_destination(tmp_path):
+    archive = tmp_path / "evil.zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("../escape.txt", "x")
+
+    with pytest.raises(ValueError):
+        extract_zip(str(archive), str(tmp_path / "extracted"))
+    assert not (tmp_path / "escape.txt").exists()
+
+
+@pytest.mark.parametrize("encoding", ["utf-8", "cp932"])
+def test_legacy_names_are_decoded(encoding):
+    name = "日本語/ファイル.txt"
+    assert _legacy_name(name.encode(encoding).decode("cp437")) == name
+
+
+def test_archive_type():
+    assert archive_type("a.zip") == "zip"
+    assert archive_type("a.TGZ") == "tar.gz"
+    assert archive_type("a.tar") == "tar"
+    assert archive_type("a.zip", "gz") == "tar.gz"
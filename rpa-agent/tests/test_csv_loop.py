@@ -0,0 +1,89 @@
+"""CSV読込ループのテスト"""
+
+import asyncio
+
+import pytest
+
+from operation_manager import OperationManager
+from operations.csv_file import CSVReadLoopOperation
+from operations.excel import WORKBOOK_POOL_KEY, ExcelOpenOperation
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "items.csv"
+    path.write_text("id,name\n1,a\n2,b\n3,c\n4,d\n5,e\n", encoding="utf-8")
+    return path
+
+
+def test_concurrent_loop_binds_each_row(csv_path):
+    manager = OperationManager()
+
+    result = asyncio.run(
+        CSVReadLoopOperation(manager).execute(
+            {
+                "file_path": str(csv_path),
+                "row_storage_keys": {"name": "name"},
+                "concurrency": 3,
+                "loop_steps": [
+                    {
+                        "id": "store",
+                        "category": "E_記憶",
+                        "operation": "文字",
+                        "params": {"storage_key": "seen", "value": "{{name}}"},
+                    }
+                ],
+            }
+        )
+    )
+
+    assert result.status == "success", result.error
+    assert result.data["iterations"] == 5
+    assert result.data["succeeded"] == 5
+    # 反復ごとのスコープに書き込むため、共有ストレージは変わらない
+    assert "seen" not in manager.storage
+
+
+def test_loop_writing_workbook_runs_sequentially(tmp_path, csv_path):
+    openpyxl = pytest.importorskip("openpyxl")
+    workbook_path = tmp_path / "out.xlsx"
+    openpyxl.Workbook().save(workbook_path)
+    manager = OperationManager()
+    result = asyncio.run(
+        ExcelOpenOperation(manager).execute(
+            {"file_path": str(workbook_path), "reference_id": "out"}
+        )
+    )
+    assert result.status == "success", result.error
+
+    def scoped(*args, **kwargs):
+        pytest.fail("loop body sharing a workbook session ran concurrently")
+
+    manager.scoped = scoped
+    result = asyncio.run(
+        CSVReadLoopOperation(manager).execute(
+            {
+                "file_path": str(csv_path),
+                "row_storage_keys": {"id": "row_id", "name": "name"},
+                "concurrency": 4,
+                "loop_steps": [
+                    {
+                        "id": "write",
+                        "category": "J_Excel",
+                        "operation": "セル書き込み",
+                        "params": {
+                            "reference_id": "out",
+                            "cell": "A{{row_id}}",
+                            "value": "{{name}}",
+                        },
+                    }
+                ],
+            }
+        )
+    )
+
+    assert result.status == "success", result.error
+    session = manager.run_resources[WORKBOOK_POOL_KEY].get("out")
+    ws = session.sheet()
+    assert [ws.cell(row=row, column=1).value for row in range(1, 6)] == list("abcde")
+    manager.close_run_resources()
@@ -0,0 +1,121 @@
+"""Excel と CSV の相互変換のテスト"""
+
+from datetime import datetime
+
+import pytest
+
+openpyxl = pytest.importorskip("openpyxl")
+
+from openpyxl.styles import Font  # noqa: E402
+
+from operations.excel_convert import (  # noqa: E402
+    csv_to_workbook,
+    sheet_names,
+    sheet_output_path,
+    sheet_title,
+    sheet_to_csv,
+)
+
+
+@pytest.fixture
+def workbook_path(tmp_path):
+    workbook = openpyxl.Workbook()
+    ws = workbook.active
+    ws.title = "売上"
+    ws.append(["日付", "品名", "数量", "確定"])
+    ws.append([datetime(2024, 4, 1), "りんご, 青森", 3, True])
+    ws.append([datetime(2024, 4, 2, 9, 30), "みかん", 1.5, False])
+    # 書式だけの行は CSV に含めない
+    ws.cell(row=10, column=1).font = Font(bold=True)
+    workbook.create_sheet("空")
+    path = tmp_path / "book.xlsx"
+    workbook.save(path)
+    return path
+
+
+def test_sheet_to_csv(tmp_path, workbook_path):
+    output = tmp_path / "out" / "sales.csv"
+
+    result = sheet_to_csv(str(workbook_path), "売上", str(output))
+
+    assert result == {"sheet": "売上", "output_path": str(output), "rows": 3}
+    assert output.read_bytes().decode("utf-8").split("\r\n") == [
+        "日付,品名,数量,確定",
+        '2024-04-01,"りんご, 青森",3,TRUE',
+        "2024-04-02 09:30:00,みかん,1.5,FALSE",
+        "",
+    ]
+    assert list(output.parent.iterdir()) == [output]
+
+
+def test_sheet_to_csv_rejects_unknown_quoting(tmp_path, workbook_path):
+    with pytest.raises(ValueError):
+        sheet_to_csv(str(workbook_path), None, str(tmp_path / "a.csv"), quoting="bad")
+    assert not (tmp_path / "a.csv").exists()
+
+
+def test_csv_to_workbook(tmp_path):
+    utf8 = tmp_path / "utf8.csv"
+    utf8.write_text("code,qty,price,name\n00123,10,1.25,りんご\n", encoding="utf-8")
+    sjis = tmp_path / "sjis.csv"
+    sjis.write_bytes("名前;備考\n山田;テスト\n".encode("cp932"))
+    output = tmp_path / "out.xlsx"
+
+    results = csv_to_workbook(
+        [
+            {"file_path": str(utf8), "sheet_name": "utf8"},
+            {"file_path": str(sjis), "sheet_name": "a/b"},
+        ],
+        str(output),
+    )
+
+    assert [result["rows"] for result in results] == [2, 2]
+    assert results[1]["sheet"] == "a_b"
+    assert results[1]["delimiter"] == ";"
+
+    workbook = openpyxl.load_workbook(output)
+    assert [list(row) for row in workbook["utf8"].values] == [
+        ["code", "qty", "price", "name"],
+        ["00123", 10, 1.25, "りんご"],
+    ]
+    assert [list(row) for row in workbook["a_b"].values] == [
+        ["名前", "備考"],
+        ["山田", "テスト"],
+    ]
+
+
+def test_round_trip(tmp_path, workbook_path):
+    csv_path = tmp_path / "sales.csv"
+    sheet_to_csv(str(workbook_path), "売上", str(csv_path))
+    output = tmp_path / "back.xlsx"
+
+    csv_to_workbook(
+        [{"file_path": str(csv_path), "sheet_name": "売上"}],
+        str(output),
+        date_format="%Y-%m-%d",
+    )
+
+    ws = openpyxl.load_workbook(output)["売上"]
+    assert list(ws.values)[1] == (datetime(2024, 4, 1), "りんご, 青森", 3, "TRUE")
+
+
+def test_sheet_helpers(tmp_path, workbook_path):
+    assert sheet_names(str(workbook_path)) == ["売上", "空"]
+    assert sheet_title("a[1]:*?") == "a_1____"
+    assert sheet_title("x" * 40) == "x" * 31
+    assert sheet_output_path(str(tmp_path), "a/b") == str(tmp_path / "a_b.csv")
+    assert sheet_output_path("out_{sheet}.csv", "売上") == "out_売上.csv"
+
+
+def test_sheet_to_csv_exports_rows_past_understated_dimension(
+    tmp_path, understated_workbook
+):
+    path = understated_workbook([[row, f"v{row}"] for row in range(1, 21)])
+    output = tmp_path / "all.csv"
+
+    result = sheet_to_csv(str(path), None, str(output))
+
+    assert result["rows"] == 20
+    lines = output.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 20
+    assert lines[-1] == "20,v20"
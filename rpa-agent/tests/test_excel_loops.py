@@ -0,0 +1,97 @@
+"""Excel の行ループ・列ループのテスト"""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("openpyxl")
+
+from operation_manager import OperationManager  # noqa: E402
+from operations.excel import (  # noqa: E402
+    ExcelColumnLoopOperation,
+    ExcelOpenOperation,
+    ExcelRowLoopOperation,
+)
+
+STORE_ROW = {
+    "id": "store",
+    "category": "E_記憶",
+    "operation": "文字",
+    "params": {"storage_key": "last_value", "value": "{{current_row}}"},
+}
+
+
+def open_workbook(manager, path, read_only=True):
+    result = asyncio.run(
+        ExcelOpenOperation(manager).execute(
+            {"file_path": str(path), "reference_id": "book", "read_only": read_only}
+        )
+    )
+    assert result.status == "success", result.error
+
+
+def test_row_loop_reads_past_understated_dimension(understated_workbook):
+    path = understated_workbook([[row, f"v{row}"] for row in range(1, 21)])
+    manager = OperationManager()
+    open_workbook(manager, path)
+
+    result = asyncio.run(
+        ExcelRowLoopOperation(manager).execute(
+            {"reference_id": "book", "loop_steps": [STORE_ROW]}
+        )
+    )
+
+    assert result.status == "success", result.error
+    assert result.data["iterations"] == 20
+    assert manager.storage["current_row"] == [20, "v20"]
+    manager.close_run_resources()
+
+
+def test_row_loop_ignores_concurrency(understated_workbook):
+    # 本体は1つのブックを共有するため、concurrency を指定しても順番に実行する
+    path = understated_workbook([[row] for row in range(1, 6)], ref="A1:A5")
+    manager = OperationManager()
+    open_workbook(manager, path, read_only=False)
+    numbers = []
+
+    async def run_steps(steps):
+        numbers.append(manager.storage["row_number"])
+        return []
+
+    manager.run_steps = run_steps
+    result = asyncio.run(
+        ExcelRowLoopOperation(manager).execute(
+            {
+                "reference_id": "book",
+                "row_number_storage_key": "row_number",
+                "concurrency": 4,
+                "loop_steps": [STORE_ROW],
+            }
+        )
+    )
+
+    assert result.status == "success", result.error
+    assert numbers == [1, 2, 3, 4, 5]
+    manager.close_run_resources()
+
+
+def test_column_loop_reads_past_understated_dimension(understated_workbook):
+    path = understated_workbook([["a", "b", "c"], [1, 2, 3]])
+    manager = OperationManager()
+    open_workbook(manager, path)
+
+    result = asyncio.run(
+        ExcelColumnLoopOperation(manager).execute(
+            {
+                "reference_id": "book",
+                "column_letter_storage_key": "letter",
+                "loop_steps": [STORE_ROW],
+            }
+        )
+    )
+
+    assert result.status == "success", result.error
+    assert result.data["iterations"] == 3
+    assert manager.storage["letter"] == "C"
+    assert manager.storage["current_column"] == ["c", 3]
+    manager.close_run_resources()
@@ -0,0 +1,70 @@
+"""read_only のシートの範囲と最終行・最終列の検出のテスト"""
+
+import pytest
+
+openpyxl = pytest.importorskip("openpyxl")
+
+from openpyxl.styles import Font  # noqa: E402
+
+from operations.excel_range import (  # noqa: E402
+    find_last_column,
+    find_last_row,
+    iter_range_values,
+    parse_range,
+)
+
+ROWS = [[row, f"v{row}"] for row in range(1, 21)]
+
+
+def open_read_only(path):
+    return openpyxl.load_workbook(path, read_only=True).active
+
+
+@pytest.mark.parametrize("trust_dimension", [True, False])
+def test_last_cells_ignore_understated_dimension(understated_workbook, trust_dimension):
+    ws = open_read_only(understated_workbook(ROWS))
+    assert ws.max_row == 1
+
+    assert find_last_row(ws, 0, trust_dimension) == 20
+    assert find_last_row(ws, 2, trust_dimension) == 20
+    assert find_last_column(ws, 0, trust_dimension) == 2
+    assert find_last_column(ws, 20, trust_dimension) == 2
+
+
+def test_open_ended_range_reads_past_understated_dimension(understated_workbook):
+    ws = open_read_only(understated_workbook(ROWS))
+
+    rows = list(iter_range_values(ws, parse_range("A2:B")))
+
+    assert len(rows) == 19
+    assert rows[-1] == (20, "v20")
+
+
+def test_formatted_rows_after_data_are_not_counted(tmp_path):
+    workbook = openpyxl.Workbook()
+    ws = workbook.active
+    for row in ROWS:
+        ws.append(row)
+    for row in range(21, 31):
+        ws.cell(row=row, column=1).font = Font(bold=True)
+    ws.cell(row=3, column=5).font = Font(bold=True)
+    path = tmp_path / "formatted.xlsx"
+    workbook.save(path)
+
+    ws = open_read_only(path)
+    assert ws.max_row == 30
+
+    assert find_last_row(ws) == 20
+    assert find_last_column(ws) == 2
+
+
+def test_edit_mode_sheet(tmp_path):
+    workbook = openpyxl.Workbook()
+    ws = workbook.active
+    for row in ROWS:
+        ws.append(row)
+    ws.cell(row=25, column=1).font = Font(bold=True)
+
+    assert find_last_row(ws) == 20
+    assert find_last_row(ws, 2) == 20
+    assert find_last_column(ws, 5) == 2
@@ -0,0 +1,162 @@
+"""ループ本体の実行（LoopBodyRunner・フォルダループ）のテスト"""
+
+import asyncio
+import threading
+import time
+from collections import ChainMap
+from types import SimpleNamespace
+
+import pytest
+
+from operation_manager import OperationManager
+from operations.file_folder import FolderLoopOperation
+from operations.loop import LoopBodyRunner, resolve_placeholders
+
+COPY_STEP = {
+    "id": "copy",
+    "category": "I_ファイル・フォルダ",
+    "operation": "ファイル・フォルダをコピー",
+    "params": {
+        "source_path": "{{current_path}}",
+        "destination_path": "{{output}}/{{current_file}}",
+    },
+}
+
+RAISE_STEP = {
+    "id": "raise",
+    "category": "B_待機・終了・エラー",
+    "operation": "エラー発生",
+    "params": {"error_message": "bad {{current_file}}"},
+}
+
+
+@pytest.fixture
+def folder(tmp_path):
+    source = tmp_path / "in"
+    source.mkdir()
+    for name in ("a.txt", "b.txt", "c.txt", "skip.csv"):
+        (source / name).write_text(name, encoding="utf-8")
+    (tmp_path / "out").mkdir()
+    return tmp_path
+
+
+def run_folder_loop(manager, folder, loop_steps, **params):
+    manager.storage["output"] = str(folder / "out")
+    return asyncio.run(
+        FolderLoopOperation(manager).execute(
+            {
+                "folder_path": str(folder / "in"),
+                "pattern": "*.txt",
+                "loop_steps": loop_steps,
+                **params,
+            }
+        )
+    )
+
+
+def test_resolve_placeholders():
+    variables = {"row": [1, 2], "name": "a", "count": 3}
+
+    resolved = resolve_placeholders(
+        {"value": "{{ row }}", "path": "out/{{name}}_{{count}}.txt", "other": "{{x}}"},
+        variables.get,
+    )
+
+    # 文字列全体が1つのプレースホルダーなら型を保ち、未定義の変数は残す
+    assert resolved == {"value": [1, 2], "path": "out/a_3.txt", "other": "{{x}}"}
+
+
+@pytest.mark.parametrize("concurrency", [1, 3])
+def test_folder_loop_runs_body_per_file(folder, concurrency):
+    manager = OperationManager()
+
+    result = run_folder_loop(manager, folder, [COPY_STEP], concurrency=concurrency)
+
+    assert result.status == "success", result.error
+    assert result.data["iterations"] == 3
+    assert result.data["succeeded"] == 3
+    assert sorted(p.name for p in (folder / "out").iterdir()) == [
+        "a.txt",
+        "b.txt",
+        "c.txt",
+    ]
+    # 並列実行では反復ごとのスコープに束縛するため、共有ストレージは変わらない
+    assert ("current_file" in manager.storage) == (concurrency == 1)
+
+
+def test_folder_loop_stops_at_first_failure(folder):
+    result = run_folder_loop(OperationManager(), folder, [RAISE_STEP])
+
+    assert result.status == "failure"
+    assert result.data["iterations"] == 1
+    assert result.data["stopped"]
+    assert result.data["errors"][0]["step_id"] == "raise"
+    assert "bad " in result.data["errors"][0]["error"]
+
+
+@pytest.mark.parametrize("concurrency", [1, 2])
+def test_folder_loop_skips_failed_files(folder, concurrency):
+    result = run_folder_loop(
+        OperationManager(),
+        folder,
+        [RAISE_STEP],
+        iteration_error="skip",
+        concurrency=concurrency,
+    )
+
+    assert result.status == "warning"
+    assert result.data["iterations"] == 3
+    assert result.data["failed"] == 3
+    assert not result.data["stopped"]
+    assert sorted(e["error"] for e in result.data["errors"]) == [
+        "bad a.txt",
+        "bad b.txt",
+        "bad c.txt",
+    ]
+
+
+class RecordingAgent:
+    """本体の同時実行数を記録する OperationManager の代わり"""
+
+    def __init__(self):
+        self.storage = {}
+        self.running = 0
+        self.max_running = 0
+        self.seen = []
+        self._lock = threading.Lock()
+
+    def scoped(self, variables):
+        return SimpleNamespace(
+            storage=ChainMap(dict(variables), self.storage), run_steps=self.run_steps
+        )
+
+    async def run_steps(self, steps):
+        with self._lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+            self.seen.append(steps[0]["params"]["value"])
+        time.sleep(0.02)
+        with self._lock:
+            self.running -= 1
+        return [{"id": "step", "status": "completed", "result": {"status": "success"}}]
+
+
+def test_concurrency_is_bounded():
+    agent = RecordingAgent()
+    runner = LoopBodyRunner(
+        agent,
+        [{"id": "step", "category": "E_記憶", "params": {"value": "{{n}}"}}],
+        concurrency=3,
+    )
+
+    summary = asyncio.run(runner.run({"n": n} for n in range(10)))
+
+    assert summary["iterations"] == summary["succeeded"] == 10
+    assert 1 < agent.max_running <= 3
+    assert sorted(agent.seen) == list(range(10))
+
+
+def test_validate_rejects_unknown_policy():
+    runner = LoopBodyRunner(OperationManager(), [COPY_STEP], iteration_error="ignore")
+
+    assert "Unknown iteration_error" in runner.validate()
@@ -0,0 +1,127 @@
+"""インデックスを使ったフォルダ同期のテスト"""
+
+import os
+
+import pytest
+
+from operations.sync_index import SyncIndex, sync_folder
+
+
+@pytest.fixture
+def folders(tmp_path):
+    source = tmp_path / "src"
+    (source / "sub").mkdir(parents=True)
+    (source / "a.txt").write_text("a", encoding="utf-8")
+    (source / "sub" / "b.csv").write_text("b", encoding="utf-8")
+    return source, tmp_path / "dst", str(tmp_path / "index.sqlite3")
+
+
+def test_first_sync_adds_everything(folders):
+    source, dest, index_path = folders
+
+    result = sync_folder(str(source), str(dest), index_path)
+
+    assert result.added == ["a.txt", "sub/b.csv"]
+    assert (dest / "sub" / "b.csv").read_text(encoding="utf-8") == "b"
+
+
+def test_second_sync_only_touches_changes(folders):
+    source, dest, index_path = folders
+    sync_folder(str(source), str(dest), index_path)
+
+    (source / "a.txt").write_text("changed", encoding="utf-8")
+    (source / "new.txt").write_text("new", encoding="utf-8")
+    result = sync_folder(str(source), str(dest), index_path)
+
+    assert result.added == ["new.txt"]
+    assert result.updated == ["a.txt"]
+    assert result.unchanged == 1
+    assert (dest / "a.txt").read_text(encoding="utf-8") == "changed"
+
+
+def test_deletions_are_mirrored_only_when_requested(folders):
+    source, dest, index_path = folders
+    sync_folder(str(source), str(dest), index_path)
+    os.remove(source / "sub" / "b.csv")
+
+    result = sync_folder(str(source), str(dest), index_path)
+    assert result.deleted == []
+    assert (dest / "sub" / "b.csv").exists()
+
+    # インデックスから外れたファイルは、もう一度同期しても削除されない
+    result = sync_folder(str(source), str(dest), index_path, mirror_deletions=True)
+    assert result.deleted == []
+
+    (source / "a.txt").unlink()
+    result = sync_folder(str(source), str(dest), index_path, mirror_deletions=True)
+    assert result.deleted == ["a.txt"]
+    assert not (dest / "a.txt").exists()
+
+
+def test_pattern_limits_files_and_deletions(folders):
+    source, dest, index_path = folders
+    sync_folder(str(source), str(dest), index_path)
+
+    result = sync_folder(
+        str(source), str(dest), index_path, pattern="*.csv", mirror_deletions=True
+    )
+
+    assert result.deleted == []
+    assert result.unchanged == 1
+    assert (dest / "a.txt").exists()
+
+
+def test_touched_file_with_same_content_is_not_copied(folders):
+    source, dest, index_path = folders
+    sync_folder(str(source), str(dest), index_path, use_hash=True)
+
+    st = os.stat(source / "a.txt")
+    os.utime(source / "a.txt", ns=(st.st_atime_ns, st.st_mtime_ns + 5 * 10**9))
+    result = sync_folder(str(source), str(dest), index_path, use_hash=True)
+
+    assert result.updated == []
+    assert result.unchanged == 2
+
+
+def test_missing_destination_is_restored_with_verify(folders):
+    source, dest, index_path = folders
+    sync_folder(str(source), str(dest), index_path)
+    os.remove(dest / "a.txt")
+
+    result = sync_folder(str(source), str(dest), index_path, verify_destination=True)
+
+    assert result.updated == ["a.txt"]
+    assert (dest / "a.txt").exists()
+
+
+def test_symlinked_folder_is_not_followed(folders):
+    source, dest, index_path = folders
+    os.symlink(source, source / "sub" / "loop")
+
+    result = sync_folder(str(source), str(dest), index_path)
+
+    assert result.errors == []
+    assert result.added == ["a.txt", "sub/b.csv"]
+
+
+def test_partial_files_are_ignored(folders):
+    source, dest, index_path = folders
+    (source / "c.txt.rpa-partial").write_text("half", encoding="utf-8")
+
+    result = sync_folder(str(source), str(dest), index_path)
+
+    assert "c.txt.rpa-partial" not in result.added
+
+
+def test_index_is_kept_per_folder_pair(folders, tmp_path):
+    source, dest, index_path = folders
+    sync_folder(str(source), str(dest), index_path)
+
+    result = sync_folder(str(source), str(tmp_path / "other"), index_path)
+    assert result.added == ["a.txt", "sub/b.csv"]
+
+    index = SyncIndex(index_path)
+    try:
+        assert set(index.load(str(source), str(dest))) == {"a.txt", "sub/b.csv"}
+    finally:
+        index.close()
@@ -0,0 +1,158 @@
+"""フォルダツリーの並列コピーと移動のテスト"""
+
+import errno
+import os
+
+import pytest
+
+from operations import tree_copy
+from operations.tree_copy import (
+    PARTIAL_SUFFIX,
+    TreeCopier,
+    is_up_to_date,
+    move_path,
+)
+
+
+@pytest.fixture
+def source(tmp_path):
+    root = tmp_path / "src"
+    (root / "a" / "b").mkdir(parents=True)
+    (root / "top.txt").write_text("top", encoding="utf-8")
+    (root / "a" / "one.txt").write_text("one", encoding="utf-8")
+    (root / "a" / "b" / "two.bin").write_bytes(os.urandom(100_000))
+    return root
+
+
+def read_tree(root):
+    files = {}
+    for directory, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(directory, name)
+            with open(path, "rb") as f:
+                files[os.path.relpath(path, root)] = f.read()
+    return files
+
+
+def test_copy_tree(tmp_path, source):
+    stats = TreeCopier(max_workers=2).copy_tree(str(source), str(tmp_path / "dst"))
+
+    assert stats.errors == []
+    assert stats.files_copied == 3
+    assert stats.directories == 3
+    assert read_tree(tmp_path / "dst") == read_tree(source)
+    assert not list((tmp_path / "dst").rglob("*" + PARTIAL_SUFFIX))
+
+
+def test_resume_skips_up_to_date_files(tmp_path, source):
+    TreeCopier().copy_tree(str(source), str(tmp_path / "dst"))
+    (source / "top.txt").write_text("changed", encoding="utf-8")
+
+    stats = TreeCopier(resume=True).copy_tree(str(source), str(tmp_path / "dst"))
+
+    assert stats.files_copied == 1
+    assert stats.files_skipped == 2
+    assert (tmp_path / "dst" / "top.txt").read_text(encoding="utf-8") == "changed"
+
+
+def test_same_second_mtime_is_checked_by_content(tmp_path):
+    src = tmp_path / "src.txt"
+    dst = tmp_path / "dst.txt"
+    src.write_text("hello", encoding="utf-8")
+    dst.write_text("HELLO", encoding="utf-8")
+    mtime_ns = os.stat(src).st_mtime_ns // 10**9 * 10**9
+    os.utime(src, ns=(mtime_ns, mtime_ns + 1))
+    os.utime(dst, ns=(mtime_ns, mtime_ns + 2))
+
+    assert not is_up_to_date(str(src), os.stat(src), str(dst))
+    dst.write_text("hello", encoding="utf-8")
+    os.utime(dst, ns=(mtime_ns, mtime_ns + 2))
+    assert is_up_to_date(str(src), os.stat(src), str(dst))
+
+
+def test_symlinked_folder_is_copied_as_link(tmp_path, source):
+    os.symlink(source, source / "a" / "loop")
+
+    stats = TreeCopier().copy_tree(str(source), str(tmp_path / "dst"))
+
+    assert stats.errors == []
+    assert os.path.islink(tmp_path / "dst" / "a" / "loop")
+
+
+def test_unreadable_folder_is_recorded_and_copy_continues(
+    tmp_path, source, monkeypatch
+):
+    scandir = os.scandir
+    blocked = str(source / "a" / "b")
+
+    def fake_scandir(path):
+        if path == blocked:
+            raise PermissionError(errno.EACCES, "Permission denied", path)
+        return scandir(path)
+
+    monkeypatch.setattr(tree_copy.os, "scandir", fake_scandir)
+    stats = TreeCopier().copy_tree(str(source), str(tmp_path / "dst"))
+
+    assert [error["path"] for error in stats.errors] == [blocked]
+    assert (tmp_path / "dst" / "a" / "one.txt").exists()
+    assert (tmp_path / "dst" / "top.txt").exists()
+
+
+def test_failed_copy_removes_partial_file(tmp_path, monkeypatch):
+    src = tmp_path / "src.txt"
+    src.write_text("data", encoding="utf-8")
+
+    def fail(src_path, dst_path):
+        with open(dst_path, "wb") as f:
+            f.write(b"half")
+        raise OSError(errno.ENOSPC, "No space left on device")
+
+    monkeypatch.setattr(tree_copy, "copy_file_fast", fail)
+    with pytest.raises(OSError):
+        TreeCopier().copy_file(str(src), str(tmp_path / "dst.txt"))
+
+    assert os.listdir(tmp_path) == ["src.txt"]
+
+
+def cross_device_replace(src, dst):
+    raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+
+def _copy_without_replace(self, src, dst, src_stat=None):
+    # os.replace を EXDEV にするとファイル単位のコピーの最後のリネームも
+    # 失敗するため、ファイルのコピーは直接書き込みに差し替える
+    with open(src, "rb") as f_src, open(dst, "wb") as f_dst:
+        data = f_src.read()
+        f_dst.write(data)
+    return len(data)
+
+
+def test_move_across_devices_copies_then_removes(tmp_path, source, monkeypatch):
+    expected = read_tree(source)
+    monkeypatch.setattr(tree_copy.os, "replace", cross_device_replace)
+    monkeypatch.setattr(tree_copy.TreeCopier, "copy_file", _copy_without_replace)
+    (tmp_path / "dst").mkdir()
+
+    moved = move_path(str(source), str(tmp_path / "dst"), TreeCopier())
+
+    assert moved == str(tmp_path / "dst" / "src")
+    assert not source.exists()
+    assert read_tree(moved) == expected
+
+
+def test_move_keeps_source_when_copy_fails(tmp_path, source, monkeypatch):
+    scandir = os.scandir
+    blocked = str(source / "a")
+
+    def fake_scandir(path):
+        if path == blocked:
+            raise PermissionError(errno.EACCES, "Permission denied", path)
+        return scandir(path)
+
+    monkeypatch.setattr(tree_copy.os, "replace", cross_device_replace)
+    monkeypatch.setattr(tree_copy.os, "scandir", fake_scandir)
+    monkeypatch.setattr(tree_copy.TreeCopier, "copy_file", _copy_without_replace)
+
+    with pytest.raises(OSError, match="source was kept"):
+        move_path(str(source), str(tmp_path / "dst"), TreeCopier())
+    assert (source / "a" / "one.txt").exists()
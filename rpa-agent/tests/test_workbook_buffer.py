@@ -0,0 +1,69 @@
+"""WorkbookSession のセル書き込みバッファのテスト"""
+
+import pytest
+
+openpyxl = pytest.importorskip("openpyxl")
+
+from operations.workbook_pool import WorkbookSession  # noqa: E402
+
+
+@pytest.fixture
+def session(tmp_path):
+    workbook = openpyxl.Workbook()
+    return WorkbookSession("book", str(tmp_path / "book.xlsx"), workbook, "edit")
+
+
+def test_buffered_cells_are_written_on_save(session):
+    ws = session.sheet()
+    session.buffer_cell(ws, 2, 1, "b")
+    session.buffer_cell(ws, 1, 1, "a")
+    session.buffer_cell(ws, 1, 1, "a2")
+
+    assert session.buffered_value(ws.title, 1, 1) == "a2"
+    assert ws._cells == {}
+
+    session.save()
+
+    assert session.pending_cells == {}
+    saved = openpyxl.load_workbook(session.file_path).active
+    assert [row[0].value for row in saved.iter_rows()] == ["a2", "b"]
+
+
+def test_buffer_flushes_at_limit(session):
+    ws = session.sheet()
+    session.cell_buffer_limit = 3
+    for row in range(1, 4):
+        session.buffer_cell(ws, row, 1, row)
+
+    assert session.pending_cells == {}
+    assert ws.cell(3, 1).value == 3
+
+
+def test_unstorable_value_is_rejected_before_buffering(session):
+    ws = session.sheet()
+    with pytest.raises(ValueError):
+        session.buffer_cell(ws, 1, 1, {"a": 1})
+    assert session.buffered_value(ws.title, 1, 1) is None
+
+
+def test_failed_flush_keeps_buffer(session):
+    ws = session.sheet()
+    session.buffer_cell(ws, 1, 1, "keep")
+    # buffer_cell の検証を通らない値を直接入れ、書き込みを失敗させる
+    session.pending_cells[ws.title][(2, 1)] = {"bad": 1}
+
+    with pytest.raises(ValueError):
+        session.save()
+    assert (1, 1) in session.pending_cells[ws.title]
+
+    del session.pending_cells[ws.title][(2, 1)]
+    session.save()
+    assert openpyxl.load_workbook(session.file_path).active["A1"].value == "keep"
+
+
+def test_sheet_access_flushes_that_sheet(session):
+    ws = session.sheet()
+    session.buffer_cell(ws, 1, 1, "x")
+
+    assert session.sheet(ws.title)["A1"].value == "x"
+    assert ws.title not in session.pending_cells
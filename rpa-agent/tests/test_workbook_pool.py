@@ -0,0 +1,94 @@
+"""WorkbookPool の実行終了時の保存のテスト"""
+
+import os
+
+import pytest
+
+openpyxl = pytest.importorskip("openpyxl")
+
+from operations.workbook_pool import WorkbookPool  # noqa: E402
+
+
+@pytest.fixture
+def book_path(tmp_path):
+    path = tmp_path / "book.xlsx"
+    openpyxl.Workbook().save(path)
+    return str(path)
+
+
+def saved_value(path, cell="A1"):
+    return openpyxl.load_workbook(path).active[cell].value
+
+
+def test_finish_run_saves_dirty_sessions_when_requested(book_path):
+    pool = WorkbookPool()
+    session = pool.open(book_path, "book", save_on_finish=True)
+    session.sheet()["A1"] = "changed"
+    session.mark_dirty()
+
+    pool.finish_run()
+
+    assert saved_value(book_path) == "changed"
+    assert not session.dirty
+    assert pool.get("book") is session
+    assert os.listdir(os.path.dirname(book_path)) == ["book.xlsx"]
+
+
+def test_finish_run_keeps_unsaved_changes_by_default(book_path):
+    pool = WorkbookPool()
+    session = pool.open(book_path, "book")
+    session.sheet()["A1"] = "changed"
+    session.mark_dirty()
+
+    pool.finish_run()
+
+    assert saved_value(book_path) is None
+    assert session.dirty
+
+
+def test_finish_run_flushes_deferred_saves(book_path):
+    pool = WorkbookPool()
+    session = pool.open(book_path, "book", save_interval=3600)
+    session.sheet()["A1"] = "first"
+    session.mark_dirty()
+    assert session.request_save() == "saved"
+    session.sheet()["A1"] = "second"
+    session.mark_dirty()
+    assert session.request_save() == "deferred"
+
+    pool.finish_run()
+
+    assert saved_value(book_path) == "second"
+
+
+def test_finish_run_saves_and_closes_write_only_sessions(tmp_path):
+    path = str(tmp_path / "out.xlsx")
+    pool = WorkbookPool()
+    session = pool.open(path, "out", mode="write_only", save_on_finish=True)
+    session.sheet().append(["a", 1])
+
+    pool.finish_run()
+
+    assert saved_value(path, "B1") == 1
+    assert pool.get("out") is None
+    # 閉じたブックを次の実行終了時に保存し直さない
+    pool.finish_run()
+
+
+def test_finish_run_keeps_session_open_when_save_fails(tmp_path, book_path):
+    pool = WorkbookPool()
+    failing = pool.open(book_path, "failing", save_on_finish=True)
+    failing.file_path = str(tmp_path / "missing" / "book.xlsx")
+    failing.mark_dirty()
+    other_path = str(tmp_path / "other.xlsx")
+    openpyxl.Workbook().save(other_path)
+    other = pool.open(other_path, "other", save_on_finish=True)
+    other.sheet()["A1"] = "saved"
+    other.mark_dirty()
+
+    with pytest.raises(FileNotFoundError):
+        pool.finish_run()
+
+    assert saved_value(other_path) == "saved"
+    assert pool.get("failing") is failing
+    assert failing.dirty
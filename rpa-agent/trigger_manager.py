@@ -0,0 +1,132 @@
+"""
+ファイル到着トリガーの管理を担当するモジュール
+
+フォルダを監視し、パターンに一致するファイルが書き込み終わったら登録された
+ワークフローを実行する。Linux では inotify を使うため、待機中はディスクを
+読まない。
+"""
+
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from operations.file_watch import FileArrivalWatcher
+
+
+@dataclass
+class FileTrigger:
+    """ファイル到着トリガーの定義"""
+
+    folder_path: str
+    pattern: str = "*"
+    steps: List[Dict[str, Any]] = field(default_factory=list)
+    trigger_id: str = ""
+    stable_seconds: float = 0.5
+    include_existing: bool = False
+    poll_interval: float = 1.0
+    path_storage_key: str = "trigger_file"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trigger_id": self.trigger_id,
+            "folder_path": self.folder_path,
+            "pattern": self.pattern,
+            "steps": len(self.steps),
+            "stable_seconds": self.stable_seconds,
+            "path_storage_key": self.path_storage_key,
+        }
+
+
+class TriggerManager:
+    """トリガーごとに監視スレッドを動かし、ファイル到着時に on_fire を呼ぶ
+
+    1つのトリガーのワークフローは監視スレッド上で順番に実行されるため、
+    同じトリガーのワークフローが重なって動くことはない。実行中に届いた
+    ファイルはイベントとして溜まり、終了後に順に処理される。
+    """
+
+    def __init__(self, on_fire: Callable[[FileTrigger, str], None]):
+        self.on_fire = on_fire
+        self._triggers: Dict[str, FileTrigger] = {}
+        self._stops: Dict[str, threading.Event] = {}
+        self._watch_modes: Dict[str, str] = {}
+        self._threads: Dict[str, threading.Thread] = {}
+        self._lock = threading.Lock()
+
+    def register(self, trigger: FileTrigger) -> FileTrigger:
+        """トリガーを登録して監視を開始する"""
+        trigger.trigger_id = trigger.trigger_id or str(uuid.uuid4())
+        # 監視の開始に失敗した場合（フォルダがない等）は登録前に例外にする
+        watcher = FileArrivalWatcher(
+            trigger.folder_path,
+            trigger.pattern,
+            stable_seconds=trigger.stable_seconds,
+            include_existing=trigger.include_existing,
+            poll_interval=trigger.poll_interval,
+        )
+
+        with self._lock:
+            if trigger.trigger_id in self._triggers:
+                watcher.close()
+                raise ValueError(f"Trigger already exists: {trigger.trigger_id}")
+            stop = threading.Event()
+            self._triggers[trigger.trigger_id] = trigger
+            self._stops[trigger.trigger_id] = stop
+            self._watch_modes[trigger.trigger_id] = watcher.mode
+            thread = threading.Thread(
+                target=self._watch, args=(trigger, watcher, stop), daemon=True
+            )
+            self._threads[trigger.trigger_id] = thread
+
+        thread.start()
+        return trigger
+
+    def remove(self, trigger_id: str) -> bool:
+        """トリガーを削除して監視を止める"""
+        with self._lock:
+            stop = self._stops.pop(trigger_id, None)
+            self._triggers.pop(trigger_id, None)
+            self._watch_modes.pop(trigger_id, None)
+            self._threads.pop(trigger_id, None)
+        if stop is None:
+            return False
+        stop.set()
+        return True
+
+    def list(self) -> List[Dict[str, Any]]:
+        """登録済みトリガーの一覧"""
+        with self._lock:
+            return [
+                {**trigger.to_dict(), "watch_mode": self._watch_modes[trigger_id]}
+                for trigger_id, trigger in self._triggers.items()
+            ]
+
+    def stop_all(self, timeout: float = 5.0):
+        """すべてのトリガーを止め、実行中のワークフローの終了を待つ
+
+        timeout 秒を過ぎても終わらない監視スレッドは待たずに戻る。
+        """
+        with self._lock:
+            threads = list(self._threads.values())
+        for trigger_id in list(self._triggers):
+            self.remove(trigger_id)
+        deadline = time.monotonic() + timeout
+        for thread in threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+
+    def _watch(
+        self,
+        trigger: FileTrigger,
+        watcher: FileArrivalWatcher,
+        stop: threading.Event,
+    ):
+        try:
+            while not stop.is_set():
+                # 停止要求に気づけるよう、短いタイムアウトで待つ
+                file_path: Optional[str] = watcher.next(timeout=0.5)
+                if file_path and not stop.is_set():
+                    self.on_fire(trigger, file_path)
+        finally:
+            watcher.close()